@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("texts", "normalize", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str], normalize: bool):
+        self.texts = texts
+        self.normalize = normalize
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+def _percentile(samples, q: float) -> float:
+    return float(np.percentile(np.fromiter(samples, dtype=np.float64), q)) if samples else 0.0
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a SentenceTransformer.
+
+    Callers on any thread use ``encode`` exactly like ``model.encode``. Their
+    texts are queued, and a single inference thread drains the queue into batches
+    of up to ``max_batch_size`` texts, waiting at most ``max_wait_ms`` after the
+    first request of a batch for more to arrive. Each batch is one forward pass;
+    the rows are then handed back to the waiting callers.
+    """
+
+    def __init__(self, model, max_batch_size: int = 64, max_wait_ms: float = 5.0, stats_window: int = 1024):
+        """
+        Args:
+            model: Object exposing a SentenceTransformer-compatible ``encode``
+            max_batch_size (int): Maximum number of texts per forward pass
+            max_wait_ms (float): Longest time a batch stays open for more requests
+            stats_window (int): Number of recent batches kept for latency percentiles
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._counters = {"requests": 0, "texts": 0, "batches": 0}
+        self._batch_sizes: deque = deque(maxlen=stats_window)
+        self._queue_wait_ms: deque = deque(maxlen=stats_window)
+        self._encode_ms: deque = deque(maxlen=stats_window)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._thread.start()
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: Optional[int] = None,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """
+        Encode through the shared batch queue; blocks the calling thread until done.
+
+        ``batch_size`` is accepted for interface compatibility and ignored: the
+        batcher decides the batch size.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return self.model.encode([], normalize_embeddings=normalize_embeddings)
+
+        self._ensure_started()
+        request = _Request(texts, normalize_embeddings)
+        self._queue.put(request)
+        result = request.future.result()
+        return result[0] if single else result
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        count = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        while count < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch, then let the run loop see the stop signal
+                self._queue.put(None)
+                break
+            batch.append(request)
+            count += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            texts = [text for request in batch for text in request.texts]
+            started = time.perf_counter()
+            try:
+                vectors = np.asarray(self.model.encode(texts, batch_size=self.max_batch_size), dtype=np.float32)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for request in batch:
+                rows = vectors[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                if request.normalize:
+                    rows = rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+                request.future.set_result(rows)
+
+            with self._stats_lock:
+                self._counters["requests"] += len(batch)
+                self._counters["texts"] += len(texts)
+                self._counters["batches"] += 1
+                self._batch_sizes.append(len(texts))
+                self._encode_ms.append((finished - started) * 1000)
+                self._queue_wait_ms.extend((started - request.enqueued_at) * 1000 for request in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput and latency figures for tuning the batch window"""
+        with self._stats_lock:
+            counters = dict(self._counters)
+            batch_sizes = list(self._batch_sizes)
+            queue_wait = list(self._queue_wait_ms)
+            encode = list(self._encode_ms)
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            **counters,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize(),
+            "mean_batch_size": float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+            "texts_per_second": counters["texts"] / uptime if uptime else 0.0,
+            "queue_wait_ms_p50": _percentile(queue_wait, 50),
+            "queue_wait_ms_p95": _percentile(queue_wait, 95),
+            "encode_ms_p50": _percentile(encode, 50),
+            "encode_ms_p95": _percentile(encode, 95),
+        }
+
+    def close(self):
+        """Stop the inference thread after the queued requests are served"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,356 @@
+"""
+Benchmarks for the AI service hot paths.
+
+Suites:
+
+- ``extract``: PDF/DOCX text extraction over generated resumes of growing size
+- ``encode``: embedding one text per call against one batched call
+- ``score``: cosine scoring of a profile against 1xN job vectors, from the
+  Apizhai job recommendation dataset padded to each corpus size
+- ``http``: end-to-end ``/parse-resume/``, ``/suggest-skills/`` and
+  ``/job-match-score/`` under concurrent load, against the service started in
+  a subprocess and pointed at the local mock OpenAI server (mock_openai.py)
+
+Results (p50/p95/p99 latency, throughput and peak RSS) are printed as JSON and
+written to ``--out``, so runs can be compared over time. Every request in the
+``http`` suite has unique content, so the LLM, embedding and single-flight
+caches do not hide the cost being measured.
+
+    python benchmark.py extract encode score http --out bench.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(HERE, "..", "AI Models", "Apizhai Model", "job_recommendation_dataset.jsonl")
+SUITES = ("extract", "encode", "score", "http")
+
+RESUME_PAGE = """Experience
+Senior Software Engineer, Example GmbH, Berlin (2019 - present)
+- Built and operated Python and FastAPI services on AWS handling {n} requests per second
+- Led the migration of batch jobs to Docker and Kubernetes, cutting costs by {p} percent
+- Mentored engineers and introduced CI/CD with GitHub Actions
+Software Engineer, Sample AG, Munich (2015 - 2019)
+- Developed React and TypeScript front ends backed by PostgreSQL and Redis
+- Wrote data pipelines with Pandas and Airflow for reporting
+Skills
+Python, FastAPI, Django, Docker, Kubernetes, AWS, PostgreSQL, Redis, React, TypeScript
+"""
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """Latency percentiles in milliseconds"""
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    fn()  # warm-up, not measured
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def resume_text(pages: int, seed: int = 0) -> List[str]:
+    """Text of each page of a generated resume"""
+    return [f"Jane Doe {seed}\njane.doe{seed}@example.com\nPage {page + 1}\n" + RESUME_PAGE.format(n=page + seed, p=page % 50)
+            for page in range(pages)]
+
+
+def make_pdf(pages: int, seed: int = 0) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    for text in resume_text(pages, seed):
+        doc.new_page().insert_text((50, 72), text, fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_docx(pages: int, seed: int = 0) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for text in resume_text(pages, seed):
+        for line in text.splitlines():
+            document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def load_dataset(path: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def bench_extract(args) -> Dict[str, Any]:
+    from main import extract_text_from_pdf, extract_text_from_docx
+    from resume_parser import ResumeParser
+
+    parser = ResumeParser()
+    results = {}
+    for pages in args.pages:
+        pdf, docx_bytes = make_pdf(pages), make_docx(pages)
+        results[f"{pages}_pages"] = {
+            "pdf_bytes": len(pdf),
+            "docx_bytes": len(docx_bytes),
+            "main.extract_text_from_pdf": summarize(timed(lambda: extract_text_from_pdf(pdf), args.repeat)),
+            "main.extract_text_from_docx": summarize(timed(lambda: extract_text_from_docx(docx_bytes), args.repeat)),
+            "ResumeParser.extract_text_from_pdf_bytes": summarize(
+                timed(lambda: parser.extract_text_from_pdf_bytes(pdf), args.repeat)),
+            "ResumeParser.extract_text_from_docx_bytes": summarize(
+                timed(lambda: parser.extract_text_from_docx_bytes(docx_bytes), args.repeat)),
+        }
+    return results
+
+
+def load_encoder(args):
+    from model_loader import LazyEncoder
+
+    encoder = LazyEncoder(args.model, backend=args.backend)
+    encoder.load()
+    return encoder
+
+
+def bench_encode(args) -> Dict[str, Any]:
+    texts = [record["resume"] for record in load_dataset(args.dataset)]
+    encoder = load_encoder(args)
+    results = {"model": args.model, "backend": args.backend, "texts": len(texts)}
+
+    single = timed(lambda: [encoder.encode(text) for text in texts], args.repeat)
+    batched = timed(lambda: encoder.encode(texts, batch_size=args.batch_size), args.repeat)
+    results["single"] = {**summarize([s / len(texts) for s in single]), "texts_per_second": round(len(texts) / np.median(single), 1)}
+    results["batched"] = {**summarize([s / len(texts) for s in batched]), "texts_per_second": round(len(texts) / np.median(batched), 1),
+                          "batch_size": args.batch_size}
+    results["note"] = "latencies are per text"
+    return results
+
+
+def bench_score(args) -> Dict[str, Any]:
+    from main import rank_jobs
+
+    records = load_dataset(args.dataset)
+    encoder = load_encoder(args)
+    titles = sorted({record["job"] for record in records})
+    job_vectors = np.asarray(encoder.encode(titles, normalize_embeddings=True), dtype=np.float32)
+    queries = np.asarray(encoder.encode([record["resume"] for record in records], normalize_embeddings=True),
+                         dtype=np.float32)
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in args.jobs:
+        # Pad the real titles with random unit vectors to reach the corpus size
+        filler = rng.standard_normal((max(0, size - len(titles)), job_vectors.shape[1])).astype(np.float32)
+        filler /= np.linalg.norm(filler, axis=1, keepdims=True)
+        matrix = np.vstack([job_vectors, filler])[:size]
+        query_iter = iter(queries[i % len(queries)] for i in range(args.repeat + 1))
+        results[f"{size}_jobs"] = {
+            "all": summarize(timed(lambda: rank_jobs(next(query_iter), matrix), args.repeat)),
+        }
+        query_iter = iter(queries[i % len(queries)] for i in range(args.repeat + 1))
+        results[f"{size}_jobs"]["top_10"] = summarize(timed(lambda: rank_jobs(next(query_iter), matrix, 10), args.repeat))
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_process(command: List[str], port: int, env: Dict[str, str], timeout: float = 120) -> subprocess.Popen:
+    """Start a server and wait until its port accepts connections"""
+    process = subprocess.Popen(command, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{command[0]} exited: {process.stderr.read().decode()[-2000:]}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def process_peak_rss_mb(pid: int):
+    """Peak RSS (VmHWM) of a running process, where /proc is available"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+async def load_test(client, make_request: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Run ``requests`` requests with at most ``concurrency`` in flight"""
+    latencies, errors = [], {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(index)
+                ok = response.status_code < 400
+                status = response.status_code
+            except Exception as e:
+                ok, status = False, type(e).__name__
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        **(summarize(latencies) if latencies else {"count": 0}),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "seconds": round(elapsed, 3),
+        "concurrency": concurrency,
+    }
+
+
+async def run_http_load(args, base_url: str) -> Dict[str, Any]:
+    import httpx
+
+    records = load_dataset(args.dataset)
+    pdfs = [make_pdf(args.upload_pages, seed) for seed in range(min(args.requests, 50))]
+
+    def profile(index):
+        record = records[index % len(records)]
+        return {"fullName": f"Candidate {index}", "skills": ["Python", "Docker"], "experience": f"{index % 15} years",
+                "resumeText": f"{record['resume']} Candidate reference {index}."}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        requests = {
+            "/parse-resume/": lambda i: client.post(
+                # Vary the file so content-addressed caches miss; reuse a PDF only with a unique suffix
+                "/parse-resume/", files={"file": (f"resume-{i}.pdf", pdfs[i % len(pdfs)] + f"%{i}".encode(), "application/pdf")}),
+            "/suggest-skills/": lambda i: client.post("/suggest-skills/", json=profile(i)),
+            "/job-match-score/": lambda i: client.post(
+                "/job-match-score/", json=profile(i),
+                params={"job_description": f"{records[(i * 7) % len(records)]['job']} position {i}"}),
+        }
+        results = {}
+        for path in args.endpoints:
+            # A short warm-up loads the embedding model and opens connections
+            await load_test(client, lambda i: requests[path](args.requests + i), min(4, args.concurrency), args.concurrency)
+            results[path] = await load_test(client, requests[path], args.requests, args.concurrency)
+        return results
+
+
+def bench_http(args) -> Dict[str, Any]:
+    mock_port, service_port = free_port(), free_port()
+    env = dict(os.environ)
+    mock = start_process([sys.executable, "mock_openai.py", "--port", str(mock_port),
+                          "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms)],
+                         mock_port, env)
+    service = None
+    try:
+        env.update({"OPENAI_BASE_URL": f"http://127.0.0.1:{mock_port}/v1", "OPENAI_API_KEY": "mock"})
+        service = start_process([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                                 "--port", str(service_port), "--log-level", "warning"], service_port, env)
+        results = asyncio.run(run_http_load(args, f"http://127.0.0.1:{service_port}"))
+        results["llm_latency_ms"] = args.llm_latency_ms
+        results["service_peak_rss_mb"] = process_peak_rss_mb(service.pid)
+        return results
+    finally:
+        for process in (service, mock):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(args) -> Dict[str, Any]:
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key != "suites"},
+        },
+        "results": {},
+    }
+    runners = {"extract": bench_extract, "encode": bench_encode, "score": bench_score, "http": bench_http}
+    for suite in args.suites:
+        started = time.perf_counter()
+        report["results"][suite] = runners[suite](args)
+        report["results"][suite]["suite_seconds"] = round(time.perf_counter() - started, 3)
+        # Peak RSS of this process so far; suites run in order, so it only grows
+        report["results"][suite]["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the AI service hot paths and emit JSON results")
+    parser.add_argument("suites", nargs="*", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--repeat", type=int, default=20, help="Measured repetitions per case")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20, 60], help="Generated document sizes")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "torch"))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1000, 10000, 100000], help="Job corpus sizes")
+    parser.add_argument("--endpoints", nargs="+", default=["/parse-resume/", "/suggest-skills/", "/job-match-score/"])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--upload-pages", type=int, default=2)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    report = main(args)
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
@@ -0,0 +1,352 @@
+"""
+Bulk resume ingestion.
+
+Takes a directory or ZIP archive of PDF/DOCX resumes, extracts text in a
+process pool, parses it with the LLM under a concurrency bound and streams one
+JSON line per resume to an output file. The output file doubles as the
+checkpoint: resumes already recorded there are skipped when a run is restarted.
+
+    python bulk_ingest.py resumes.zip --out parsed.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import zipfile
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from extraction import extract_docx_text, extract_pdf_text
+
+RESUME_EXTENSIONS = (".pdf", ".docx")
+
+# Largest single file read out of an archive; protects workers from zip bombs
+MAX_FILE_BYTES = 20 * 1024 * 1024
+
+# (archive path or None, path of the file or archive member)
+ResumeRef = Tuple[Optional[str], str]
+
+
+def _is_resume(name: str) -> bool:
+    base = os.path.basename(name)
+    return name.lower().endswith(RESUME_EXTENSIONS) and not base.startswith((".", "~$"))
+
+
+def iter_resumes(source: str) -> Iterator[Tuple[str, ResumeRef]]:
+    """
+    List the resumes in a directory (recursively) or ZIP archive, in a stable order.
+
+    Yields:
+        (source id, reference) pairs; the id is the path relative to ``source``
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if _is_resume(name):
+                    yield os.path.relpath(path, source), (None, path)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in sorted(archive.infolist(), key=lambda i: i.filename):
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or not _is_resume(info.filename):
+                    continue
+                yield info.filename, (source, info.filename)
+    else:
+        raise ValueError(f"{source} is neither a directory nor a ZIP archive")
+
+
+def extract_resume(ref: ResumeRef, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """Extract the text of one resume; runs inside an extraction worker process"""
+    archive_path, name = ref
+    if archive_path is None:
+        source = name
+    else:
+        with zipfile.ZipFile(archive_path) as archive:
+            info = archive.getinfo(name)
+            if info.file_size > MAX_FILE_BYTES:
+                raise ValueError(f"File is larger than {MAX_FILE_BYTES} bytes")
+            source = archive.read(info)
+    if name.lower().endswith(".pdf"):
+        return extract_pdf_text(source, max_pages=max_pages, max_chars=max_chars)
+    return extract_docx_text(source, max_chars=max_chars)
+
+
+def load_checkpoint(output_path: str, retry_errors: bool = False) -> Set[str]:
+    """
+    Source ids already recorded in an output file.
+
+    A line torn by an interrupted run is ignored, and failed resumes are only
+    counted as done when ``retry_errors`` is false.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok" or not retry_errors:
+                done.add(record["source"])
+    return done
+
+
+def _open_output(output_path: str):
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    out = open(output_path, "a+", encoding="utf-8")
+    # Terminate a torn last line so the next record starts on a line of its own
+    if out.tell() > 0:
+        out.seek(out.tell() - 1)
+        if out.read(1) != "\n":
+            out.write("\n")
+    return out
+
+
+class IngestStats:
+    """Progress counters for an ingestion run"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.discovered = 0
+        self.skipped = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.extract_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.errors: Counter = Counter()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        processed = self.succeeded + self.failed
+        return {
+            "discovered": self.discovered,
+            "skipped": self.skipped,
+            "processed": processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "resumes_per_second": round(processed / elapsed, 3) if elapsed else 0.0,
+            "mean_extract_ms": round(self.extract_seconds / processed * 1000, 1) if processed else 0.0,
+            "mean_llm_ms": round(self.llm_seconds / self.succeeded * 1000, 1) if self.succeeded else 0.0,
+            "errors": dict(self.errors.most_common()),
+        }
+
+
+class IngestJobStore:
+    """
+    Ingestion job ownership and status shared by every worker on a host.
+
+    The worker running a job holds an exclusive lock on ``<job id>.lock`` for
+    the whole run, so no two workers append to the same output file, and
+    publishes its progress to ``<job id>.status.json``. Any worker can then
+    report the job, and cancel it through a ``<job id>.cancel`` marker that
+    the owner checks while it runs. A job whose status says running but whose
+    lock is free lost its worker, and is reported as interrupted.
+
+    The directory is created on the first write, so constructing a store at
+    import time leaves the filesystem untouched.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # job id -> lock file held by this process
+        self._held: Dict[str, Any] = {}
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def _writable_path(self, job_id: str, suffix: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return self._path(job_id, suffix)
+
+    def acquire(self, job_id: str) -> bool:
+        """Take ownership of a job; False if another worker or this one already holds it"""
+        import fcntl
+
+        if job_id in self._held:
+            return False
+        handle = open(self._writable_path(job_id, "lock"), "a")
+        try:
+            # POSIX record locks, unlike flock, are not inherited by the extraction
+            # processes forked while the job runs, so they end with this process
+            fcntl.lockf(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._held[job_id] = handle
+        return True
+
+    def release(self, job_id: str):
+        handle = self._held.pop(job_id, None)
+        if handle is not None:
+            handle.close()
+
+    def is_owned(self, job_id: str) -> bool:
+        """Whether some worker holds the job's lock"""
+        if job_id in self._held:
+            # Probing our own POSIX lock would release it
+            return True
+        if not self.acquire(job_id):
+            return True
+        self.release(job_id)
+        return False
+
+    def write_status(self, job_id: str, status: Dict[str, Any]):
+        path = self._writable_path(job_id, "status.json")
+        with open(f"{path}.{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def read_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id, "status.json"), encoding="utf-8") as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if status.get("status") == "running" and not self.is_owned(job_id):
+            status["status"] = "interrupted"
+        return status
+
+    def request_cancel(self, job_id: str):
+        open(self._writable_path(job_id, "cancel"), "w").close()
+
+    def pop_cancel(self, job_id: str) -> bool:
+        """Whether cancellation was requested, clearing the request"""
+        try:
+            os.remove(self._path(job_id, "cancel"))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+async def ingest(source: str, output_path: str, parse: Callable[[str], Awaitable[Dict[str, Any]]],
+                 run_extract: Callable[..., Awaitable[str]], extract_concurrency: int = 4,
+                 llm_concurrency: int = 8, max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                 retry_errors: bool = False, stats: Optional[IngestStats] = None) -> IngestStats:
+    """
+    Ingest every resume under ``source`` into a JSONL file.
+
+    Args:
+        source (str): Directory or ZIP archive
+        output_path (str): JSONL file appended to, one record per resume
+        parse (Callable): Coroutine function turning resume text into structured data
+        run_extract (Callable): Coroutine function ``run(fn, *args)`` executing ``fn`` in a process pool
+        extract_concurrency (int): Resumes being extracted at once
+        llm_concurrency (int): Resumes being parsed by the LLM at once
+        max_pages (int, optional): PDF page budget per resume
+        max_chars (int, optional): Character budget per resume
+        retry_errors (bool): Process resumes that failed in an earlier run again
+        stats (IngestStats, optional): Counters to update, e.g. for progress polling
+
+    Returns:
+        IngestStats: Counters for the run; see ``summary``
+    """
+    stats = stats or IngestStats()
+    done = load_checkpoint(output_path, retry_errors)
+    extract_slots = asyncio.Semaphore(extract_concurrency)
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    # Enough workers to keep both stages busy at once
+    queue: "asyncio.Queue[Optional[Tuple[str, ResumeRef]]]" = asyncio.Queue(maxsize=extract_concurrency + llm_concurrency)
+    worker_count = extract_concurrency + llm_concurrency
+
+    out = _open_output(output_path)
+
+    def write(record: Dict[str, Any]):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    async def process(source_id: str, ref: ResumeRef):
+        record: Dict[str, Any] = {"source": source_id}
+        try:
+            started = time.perf_counter()
+            async with extract_slots:
+                try:
+                    text = await run_extract(extract_resume, ref, max_pages, max_chars)
+                finally:
+                    stats.extract_seconds += time.perf_counter() - started
+            if not text.strip():
+                raise ValueError("No text could be extracted")
+
+            started = time.perf_counter()
+            async with llm_slots:
+                data = await parse(text)
+            stats.llm_seconds += time.perf_counter() - started
+
+            record.update(status="ok", chars=len(text), data=data)
+            stats.succeeded += 1
+        except Exception as e:
+            record.update(status="error", error=str(e), errorType=type(e).__name__)
+            stats.failed += 1
+            stats.errors[type(e).__name__] += 1
+        write(record)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await process(*item)
+
+    def discover():
+        # Runs in a thread: walking a large tree or archive index should not stall the loop
+        items = []
+        for source_id, ref in iter_resumes(source):
+            stats.discovered += 1
+            if source_id in done:
+                stats.skipped += 1
+            else:
+                items.append((source_id, ref))
+        return items
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(worker_count)]
+    try:
+        for item in await asyncio.to_thread(discover):
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        out.close()
+        stats.finished_at = time.time()
+    return stats
+
+
+async def _main(args):
+    from executors import BoundedExecutor
+    from resume_parser import ResumeParser
+
+    resume_parser = ResumeParser(model=args.model, mode=args.mode)
+    pool = BoundedExecutor("ingest-extract", kind="process", max_workers=args.extract_workers)
+    try:
+        stats = await ingest(
+            args.source, args.out, resume_parser.parse_with_gpt, pool.run,
+            extract_concurrency=args.extract_workers, llm_concurrency=args.llm_concurrency,
+            max_pages=args.max_pages, max_chars=args.max_chars, retry_errors=args.retry_errors,
+        )
+    finally:
+        pool.shutdown()
+        await resume_parser.llm.aclose()
+    print(json.dumps(stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse a directory or ZIP archive of resumes into JSONL")
+    parser.add_argument("source", help="Directory or ZIP archive of PDF/DOCX resumes")
+    parser.add_argument("--out", default="parsed_resumes.jsonl", help="JSONL output, also used as the checkpoint")
+    parser.add_argument("--model", default="gpt-4")
+    parser.add_argument("--mode", default=os.getenv("RESUME_PARSE_MODE", "llm"), choices=["llm", "hybrid", "offline"],
+                        help="hybrid/offline extract contact fields locally; offline never calls the LLM")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--llm-concurrency", type=int, default=int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+    parser.add_argument("--max-pages", type=int, default=60)
+    parser.add_argument("--max-chars", type=int, default=200000)
+    parser.add_argument("--retry-errors", action="store_true", help="Process resumes that failed before again")
+    asyncio.run(_main(parser.parse_args()))
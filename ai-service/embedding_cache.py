@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a process-local lock only
+    fcntl = None
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a cache key"""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Content address for an embedding: hash of (model name, normalized text)"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only on-disk embedding store shared by every worker on the host.
+
+    Vectors live in a raw ``vectors.bin`` matrix that is read through a memory map;
+    ``index.jsonl`` maps each key to its row. Both files are only ever appended to,
+    under an exclusive file lock, so readers in other processes simply pick up the
+    new index lines the next time they miss.
+    """
+
+    def __init__(self, directory: str, dim: int, dtype: str = "float32"):
+        self.directory = directory
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = self.dim * self.dtype.itemsize
+        os.makedirs(directory, exist_ok=True)
+
+        self.vectors_path = os.path.join(directory, "vectors.bin")
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.lock_path = os.path.join(directory, ".lock")
+        self._check_meta()
+
+        self._rows: Dict[str, int] = {}
+        self._index_offset = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        for path in (self.vectors_path, self.index_path):
+            open(path, "ab").close()
+        self._refresh_index()
+
+    def _check_meta(self):
+        meta_path = os.path.join(self.directory, "meta.json")
+        meta = {"dim": self.dim, "dtype": self.dtype.name}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(
+                    f"Embedding cache at {self.directory} was built with {existing}, expected {meta}"
+                )
+        else:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+
+    def _file_lock(self):
+        handle = open(self.lock_path, "a")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _refresh_index(self):
+        """Read index lines appended (possibly by other workers) since the last refresh"""
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written line; pick it up next time
+                self._index_offset += len(line)
+                entry = json.loads(line)
+                self._rows[entry["key"]] = entry["row"]
+
+    def _matrix(self) -> np.memmap:
+        rows = os.path.getsize(self.vectors_path) // self.row_bytes
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            if key not in self._rows:
+                self._refresh_index()
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            return np.asarray(self._matrix()[row], dtype=np.float32)
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                self._refresh_index()
+                new_items = [(k, v) for k, v in items.items() if k not in self._rows]
+                if not new_items:
+                    return
+                with open(self.vectors_path, "r+b") as vectors:
+                    # Drop a torn row left by a writer that died mid-append
+                    first_row = os.path.getsize(self.vectors_path) // self.row_bytes
+                    vectors.truncate(first_row * self.row_bytes)
+                    vectors.seek(first_row * self.row_bytes)
+                    block = np.stack([v for _, v in new_items]).astype(self.dtype, copy=False)
+                    vectors.write(block.tobytes())
+                    vectors.flush()
+                    os.fsync(vectors.fileno())
+                # The index is written after the vectors so readers never see a row that is not on disk yet
+                lines = []
+                for offset, (key, _) in enumerate(new_items):
+                    lines.append(json.dumps({"key": key, "row": first_row + offset}) + "\n")
+                with open(self.index_path, "a") as index:
+                    index.write("".join(lines))
+                self._refresh_index()
+            finally:
+                handle.close()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache in front of a SentenceTransformer ``encode`` call.
+
+    Lookups go memory LRU -> disk store -> model; only the misses of a call are
+    encoded, in one batch.
+    """
+
+    def __init__(self, model, model_name: str, max_memory_items: int = 10000,
+                 cache_dir: Optional[str] = None, dtype: str = "float32"):
+        """
+        Args:
+            model: Object exposing a SentenceTransformer-compatible ``encode``
+            model_name (str): Name mixed into every cache key
+            max_memory_items (int): Capacity of the in-memory LRU tier
+            cache_dir (str, optional): Directory for the persistent tier; disabled if None
+            dtype (str): Storage dtype of the persistent tier ('float32' or 'float16')
+        """
+        self.model = model
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[DiskEmbeddingStore] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        # Reopen an existing store right away so a restarted worker hits it on its first call
+        meta_path = os.path.join(cache_dir, "meta.json") if cache_dir else None
+        if meta_path and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self._disk_store(json.load(f)["dim"])
+
+    def _disk_store(self, dim: int) -> Optional[DiskEmbeddingStore]:
+        if self.cache_dir and self._disk is None:
+            self._disk = DiskEmbeddingStore(self.cache_dir, dim, self.dtype)
+        return self._disk
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def encode(self, sentences: Union[str, List[str]], normalize_embeddings: bool = False,
+               batch_size: int = 32) -> np.ndarray:
+        """
+        Encode one text or a list of texts, reusing cached embeddings where possible.
+
+        Args:
+            sentences (Union[str, List[str]]): Text or texts to embed
+            normalize_embeddings (bool): Return L2-normalized vectors
+            batch_size (int): Batch size for the model call on cache misses
+
+        Returns:
+            np.ndarray: A vector for a single text, otherwise a (len(sentences), dim) matrix
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        keys = [cache_key(self.model_name, text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._memory.get(key)
+                if cached is not None:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    vectors[i] = cached
+
+        pending = [i for i, v in enumerate(vectors) if v is None]
+        if pending and self._disk is not None:
+            still_pending = []
+            for i in pending:
+                stored = self._disk.get(keys[i])
+                if stored is None:
+                    still_pending.append(i)
+                    continue
+                vectors[i] = stored
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._remember(keys[i], stored)
+            pending = still_pending
+
+        if pending:
+            # Duplicate texts within one call are encoded once
+            unique = list(OrderedDict((keys[i], texts[i]) for i in pending).items())
+            encoded = np.asarray(
+                self.model.encode([text for _, text in unique], batch_size=batch_size),
+                dtype=np.float32,
+            )
+            fresh = {key: encoded[j] for j, (key, _) in enumerate(unique)}
+            with self._lock:
+                self._counters["misses"] += len(pending)
+                for key, vector in fresh.items():
+                    self._remember(key, vector)
+            disk = self._disk_store(encoded.shape[1])
+            if disk is not None:
+                disk.put_many(fresh)
+            for i in pending:
+                vectors[i] = fresh[keys[i]]
+
+        result = np.stack(vectors)
+        if normalize_embeddings:
+            norms = np.linalg.norm(result, axis=1, keepdims=True)
+            result = result / np.maximum(norms, 1e-12)
+        return result[0] if single else result
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Hit/miss counters and tier sizes, for sizing the cache"""
+        with self._lock:
+            counters = dict(self._counters)
+            memory_items = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_items": memory_items,
+            "memory_capacity": self.max_memory_items,
+            "disk_items": len(self._disk) if self._disk is not None else 0,
+        }
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+class BoundedExecutor:
+    """
+    A thread or process pool with an async front door.
+
+    ``run`` awaits a semaphore before submitting, so at most ``max_concurrency``
+    jobs are handed to the pool at once and the rest wait on the event loop
+    (counted as ``queued``) instead of piling up inside the executor. A job
+    keeps its permit until the pool has finished it, even if its caller was
+    cancelled while it ran.
+
+    A process pool whose worker died (a crash in a native parser, an OOM kill)
+    is broken for good; it is replaced, and only the jobs it was running fail.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        """
+        Args:
+            name (str): Pool name used in metrics
+            kind (str): 'thread' or 'process'
+            max_workers (int, optional): Pool size; defaults to the CPU count
+            max_concurrency (int, optional): In-flight cap; defaults to ``max_workers``
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}' for pool '{name}'")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.max_workers
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queued = 0
+
+    @property
+    def executor(self) -> Executor:
+        # Pools are created on first use so importing the service stays cheap
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=f"{self.name}-pool")
+            return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in the pool without blocking the event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._queued += 1
+        self._max_queued = max(self._max_queued, self._queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        self._running += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        executor = self.executor
+        try:
+            try:
+                future = executor.submit(call)
+            except BrokenProcessPool:
+                # Broken by an earlier job; this one never ran, so it gets a fresh pool
+                self._replace_broken(executor)
+                executor = self.executor
+                future = executor.submit(call)
+        except BaseException:
+            self._finished(None)
+            raise
+        # The permit is held until the pool is done with the job, not until the caller stops
+        # waiting: a cancelled caller must not let another job into a pool that is still busy
+        future.add_done_callback(lambda done: self._release_soon(loop, done, executor))
+        return await asyncio.wrap_future(future)
+
+    def _replace_broken(self, broken: Executor):
+        """Drop a broken pool so the next job starts a new one"""
+        with self._lock:
+            if self._executor is not broken:
+                # Already replaced by another job that failed with it
+                return
+            self._executor = None
+        broken.shutdown(wait=False)
+
+    def _release_soon(self, loop: asyncio.AbstractEventLoop, future: Future, executor: Executor):
+        # Done callbacks run in the pool's thread; the semaphore belongs to the event loop
+        try:
+            loop.call_soon_threadsafe(self._finished, future, executor)
+        except RuntimeError:
+            # The loop is closed, and its semaphore with it
+            pass
+
+    def _finished(self, future: Optional[Future], executor: Optional[Executor] = None):
+        if future is not None and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._replace_broken(executor)
+        self._running -= 1
+        if future is None or future.cancelled() or future.exception() is not None:
+            self._failed += 1
+        else:
+            self._completed += 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self._queued,
+            "max_queued": self._max_queued,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+        }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def pool_from_env(name: str, default_kind: str, default_workers: Optional[int] = None) -> BoundedExecutor:
+    """
+    Build a pool configured by ``<NAME>_POOL_KIND``, ``<NAME>_POOL_WORKERS`` and
+    ``<NAME>_POOL_CONCURRENCY`` environment variables.
+    """
+    prefix = name.upper()
+    return BoundedExecutor(
+        name,
+        kind=os.getenv(f"{prefix}_POOL_KIND", default_kind),
+        max_workers=_env_int(f"{prefix}_POOL_WORKERS") or default_workers,
+        max_concurrency=_env_int(f"{prefix}_POOL_CONCURRENCY"),
+    )
+
+
+class ExecutionLayer:
+    """Named pools for the different kinds of blocking work in the service"""
+
+    def __init__(self, pools: Dict[str, BoundedExecutor]):
+        self.pools = pools
+
+    def __getitem__(self, name: str) -> BoundedExecutor:
+        return self.pools[name]
+
+    async def run(self, pool: str, fn: Callable, *args, **kwargs) -> Any:
+        return await self.pools[pool].run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+
+
+def default_execution_layer(embed_workers: int = 2) -> ExecutionLayer:
+    """
+    Pools used by the AI service:
+
+    - ``extract``: PDF/DOCX parsing, CPU-bound, process pool by default
+    - ``embed``: SentenceTransformer inference (releases the GIL). Keep it small when
+      threads run the model directly; make it wide when they only wait on the
+      micro-batcher.
+
+    LLM calls are natively async (see ``llm_client``) and need no pool.
+    """
+    return ExecutionLayer({
+        "extract": pool_from_env("extract", "process"),
+        "embed": pool_from_env("embed", "thread", default_workers=embed_workers),
+    })
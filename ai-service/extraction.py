@@ -0,0 +1,167 @@
+"""
+Text extraction for resume files.
+
+Kept free of the web framework and the embedding model so it can be imported
+cheaply inside extraction worker processes. PyMuPDF and python-docx are
+imported on first use.
+
+Sources may be raw bytes or a file path. Text is produced page by page (PDF)
+or block by block (DOCX) and joined once, and extraction stops as soon as the
+page or character budget is reached. Each PDF page ends with a form feed so
+later stages can tell running headers and footers from body text.
+"""
+import asyncio
+from io import BytesIO
+from typing import Awaitable, Callable, Iterator, List, Optional, Union
+
+Source = Union[bytes, str]
+
+# Pages handed to one worker when a large PDF is extracted in parallel
+PDF_CHUNK_PAGES = 8
+
+
+def _open_pdf(source: Source):
+    import fitz  # PyMuPDF
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _take(blocks: Iterator[str], max_chars: Optional[int]) -> str:
+    """Join text blocks, stopping once ``max_chars`` characters have been collected"""
+    parts: List[str] = []
+    total = 0
+    for block in blocks:
+        if max_chars is not None and total + len(block) >= max_chars:
+            parts.append(block[:max_chars - total])
+            break
+        parts.append(block)
+        total += len(block)
+    return "".join(parts)
+
+
+def pdf_page_count(source: Source) -> int:
+    """Number of pages in a PDF"""
+    try:
+        with _open_pdf(source) as doc:
+            return doc.page_count
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+
+def iter_pdf_pages(source: Source, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of pages ``start`` to ``stop`` one page at a time, each ending in a form feed"""
+    with _open_pdf(source) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for number in range(start, stop):
+            yield doc.load_page(number).get_text() + "\f"
+
+
+def extract_pdf_pages(source: Source, start: int, stop: int, max_chars: Optional[int] = None) -> str:
+    """Extract one page range; the unit of work for parallel extraction"""
+    try:
+        return _take(iter_pdf_pages(source, start, stop), max_chars)
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+
+def extract_pdf_text(source: Source, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """Extract text from a PDF, stopping at the page or character budget"""
+    try:
+        return _take(iter_pdf_pages(source, 0, max_pages), max_chars)
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+
+async def extract_pdf_text_parallel(run: Callable[..., Awaitable[str]], source: Source,
+                                    max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                                    chunk_pages: int = PDF_CHUNK_PAGES) -> str:
+    """
+    Extract a large PDF by fanning page ranges out to a worker pool.
+
+    Args:
+        run: Coroutine function ``run(fn, *args)`` executing ``fn`` in a pool
+        source: PDF bytes or path
+        max_pages: Page budget
+        max_chars: Character budget; chunks still queued once it is met are cancelled
+        chunk_pages: Pages per unit of work
+
+    Returns:
+        str: Extracted text in page order
+    """
+    page_count = await run(pdf_page_count, source)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    if page_count <= chunk_pages:
+        return await run(extract_pdf_pages, source, 0, page_count, max_chars)
+
+    tasks = [
+        asyncio.ensure_future(run(extract_pdf_pages, source, start, min(start + chunk_pages, page_count), max_chars))
+        for start in range(0, page_count, chunk_pages)
+    ]
+    try:
+        parts: List[str] = []
+        total = 0
+        for task in tasks:
+            text = await task
+            if max_chars is not None and total + len(text) >= max_chars:
+                parts.append(text[:max_chars - total])
+                break
+            parts.append(text)
+            total += len(text)
+        return "".join(parts)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _iter_table_text(table) -> Iterator[str]:
+    for row in table.rows:
+        cells = []
+        seen = set()
+        for cell in row.cells:
+            # Merged cells are repeated by python-docx; keep each one once
+            if id(cell._tc) in seen:
+                continue
+            seen.add(id(cell._tc))
+            cells.append(" ".join(block.strip() for block in _iter_block_text(cell) if block.strip()))
+        yield " | ".join(cells) + "\n"
+
+
+def _iter_block_text(container) -> Iterator[str]:
+    """Paragraph and table text of a document body, cell or header, in document order"""
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    for child in container._element.iterchildren():
+        tag = child.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            yield Paragraph(child, container).text + "\n"
+        elif tag == "tbl":
+            yield from _iter_table_text(Table(child, container))
+
+
+def iter_docx_blocks(source: Source) -> Iterator[str]:
+    """Yield DOCX text: section headers, body paragraphs and tables, then footers"""
+    import docx
+
+    doc = docx.Document(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    # A section linked to the previous one has no header/footer of its own; skipping
+    # those also avoids python-docx creating empty definitions on access
+    headers = [s.header for s in doc.sections if not s.header.is_linked_to_previous]
+    footers = [s.footer for s in doc.sections if not s.footer.is_linked_to_previous]
+
+    for header in headers:
+        yield from _iter_block_text(header)
+    yield from _iter_block_text(doc._body)
+    for footer in footers:
+        yield from _iter_block_text(footer)
+
+
+def extract_docx_text(source: Source, max_chars: Optional[int] = None) -> str:
+    """Extract text from a DOCX file including tables, headers and footers"""
+    try:
+        return _take(iter_docx_blocks(source), max_chars)
+    except Exception as e:
+        raise ValueError(f"Error extracting text from DOCX: {str(e)}")
@@ -0,0 +1,578 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class JobIndex:
+    """
+    In-memory vector index over the job corpus.
+
+    Rows are L2-normalized so a dot product is the cosine similarity. With
+    ``quantize=True`` each row is stored as int8 plus one float32 scale, which is
+    about 4x smaller than float32. Removal swaps the last row into the freed slot,
+    so both add and remove are O(1) per job.
+
+    Exact search is one matrix-vector product. Approximate search uses an
+    inverted-file (IVF) layout: jobs are bucketed by their nearest k-means
+    centroid and a query only scans the ``n_probe`` closest buckets.
+    """
+
+    SCAN_CHUNK_ROWS = 8192
+
+    def __init__(self, dim: Optional[int] = None, quantize: bool = False):
+        """
+        Args:
+            dim (int, optional): Embedding dimension; taken from the first added vectors if None
+            quantize (bool): Store vectors as int8 with a per-row scale
+        """
+        self.dim = dim
+        self.quantize = quantize
+        self._dtype = np.int8 if quantize else np.float32
+        self._vectors = np.zeros((0, dim or 0), dtype=self._dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._titles: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lock = threading.RLock()
+        # Serializes writers of save/publish, which write outside _lock so searches are not held up
+        self._write_lock = threading.Lock()
+        # Set by open_published to the generation the index was read from
+        self.generation: Optional[str] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._rows
+
+    def _grow(self, needed: int):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=self._dtype)
+        vectors[:self._size] = self._vectors[:self._size]
+        scales = np.zeros(new_capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._vectors, self._scales, self._assignments = vectors, scales, assignments
+
+    def _encode_rows(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.quantize:
+            return vectors, np.ones(len(vectors), dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _decode_rows(self, start: int, stop: int) -> np.ndarray:
+        block = self._vectors[start:stop]
+        if not self.quantize:
+            return block
+        return block.astype(np.float32) * self._scales[start:stop, None]
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def add(self, job_ids: List[str], vectors: np.ndarray, titles: Optional[List[str]] = None):
+        """
+        Add jobs to the index, replacing any existing job with the same ID.
+
+        Args:
+            job_ids (List[str]): Job IDs
+            vectors (np.ndarray): (len(job_ids), dim) embeddings; normalized here
+            titles (List[str], optional): Job titles returned with search results
+        """
+        vectors = _normalize_rows(vectors)
+        titles = titles or [""] * len(job_ids)
+        if not (len(job_ids) == len(vectors) == len(titles)):
+            raise ValueError("job_ids, vectors and titles must have the same length")
+
+        encoded, scales = self._encode_rows(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._vectors = np.zeros((0, self.dim), dtype=self._dtype)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+            self._grow(self._size + len(job_ids))
+            for i, job_id in enumerate(job_ids):
+                row = self._rows.get(job_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(job_id)
+                    self._titles.append(titles[i])
+                    self._rows[job_id] = row
+                else:
+                    self._titles[row] = titles[i]
+                self._vectors[row] = encoded[i]
+                self._scales[row] = scales[i]
+                if self._centroids is not None:
+                    self._assignments[row] = self._assign(vectors[i:i + 1])[0]
+
+    def remove(self, job_ids: Iterable[str]) -> int:
+        """
+        Remove jobs from the index.
+
+        Returns:
+            int: Number of jobs that were present and removed
+        """
+        removed = 0
+        with self._lock:
+            for job_id in job_ids:
+                row = self._rows.pop(job_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._scales[row] = self._scales[last]
+                    self._assignments[row] = self._assignments[last]
+                    self._ids[row] = moved_id
+                    self._titles[row] = self._titles[last]
+                    self._rows[moved_id] = row
+                self._ids.pop()
+                self._titles.pop()
+                self._size -= 1
+                removed += 1
+        return removed
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """
+        Cluster the current vectors for approximate search.
+
+        Args:
+            n_lists (int, optional): Number of buckets; defaults to about sqrt(N)
+            iterations (int): k-means iterations
+            seed (int): Seed for centroid initialization
+        """
+        with self._lock:
+            if self._size == 0:
+                return
+            n_lists = min(n_lists or max(1, int(np.sqrt(self._size))), self._size)
+            data = self._decode_rows(0, self._size)
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(self._size, n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(data @ centroids.T, axis=1)
+                for c in range(n_lists):
+                    members = data[assignments == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize_rows(centroids)
+            self._centroids = centroids
+            self._assignments[:self._size] = self._assign(data)
+
+    def search(self, query: np.ndarray, k: int = 10, approximate: bool = False,
+               n_probe: int = 8) -> List[Tuple[str, str, float]]:
+        """
+        Find the jobs most similar to a query embedding.
+
+        Args:
+            query (np.ndarray): Query embedding; normalized here
+            k (int): Number of results
+            approximate (bool): Use the IVF buckets if they have been built
+            n_probe (int): Buckets scanned in approximate mode
+
+        Returns:
+            List[Tuple[str, str, float]]: (job_id, title, cosine similarity), best first
+        """
+        q = _normalize_rows(query)[0]
+        with self._lock:
+            if self._size == 0 or k < 1:
+                return []
+            if approximate and self._centroids is not None:
+                probes = _top_k(self._centroids @ q, min(n_probe, len(self._centroids)))
+                rows = np.flatnonzero(np.isin(self._assignments[:self._size], probes))
+                block = self._vectors[rows]
+                if self.quantize:
+                    scores = (block.astype(np.float32) @ q) * self._scales[rows]
+                else:
+                    scores = block @ q
+            elif not self.quantize:
+                rows = None
+                scores = self._vectors[:self._size] @ q
+            else:
+                # Dequantize in chunks so a scan never materializes the full float32 matrix
+                rows = None
+                scores = np.empty(self._size, dtype=np.float32)
+                for start in range(0, self._size, self.SCAN_CHUNK_ROWS):
+                    stop = min(start + self.SCAN_CHUNK_ROWS, self._size)
+                    scores[start:stop] = (self._vectors[start:stop].astype(np.float32) @ q) * self._scales[start:stop]
+
+            best = _top_k(scores, k)
+            positions = best if rows is None else rows[best]
+            return [(self._ids[p], self._titles[p], float(s)) for p, s in zip(positions, scores[best])]
+
+    def _snapshot(self) -> Dict[str, object]:
+        """Copies of the rows and metadata, taken under the lock so they can be written without it"""
+        with self._lock:
+            return {
+                "vectors": np.array(self._vectors[:self._size]),
+                "scales": np.array(self._scales[:self._size]),
+                "assignments": np.array(self._assignments[:self._size]),
+                "centroids": None if self._centroids is None else np.array(self._centroids),
+                "ids": list(self._ids),
+                "titles": list(self._titles),
+            }
+
+    def save(self, path: str):
+        """Write the index to a ``.npz`` file (atomically replaced)"""
+        snapshot = self._snapshot()
+        with self._write_lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    vectors=snapshot["vectors"],
+                    scales=snapshot["scales"],
+                    assignments=snapshot["assignments"],
+                    centroids=snapshot["centroids"] if snapshot["centroids"] is not None
+                    else np.zeros((0, self.dim or 0), np.float32),
+                    # Fixed-width unicode rather than object arrays, so loading never unpickles
+                    ids=np.array(snapshot["ids"], dtype=str),
+                    titles=np.array(snapshot["titles"], dtype=str),
+                    quantize=np.array(self.quantize),
+                )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "JobIndex":
+        """Load an index written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            vectors = data["vectors"]
+            index = cls(vectors.shape[1], quantize=bool(data["quantize"]))
+            index._vectors = vectors.copy()
+            index._scales = data["scales"].copy()
+            index._assignments = data["assignments"].copy()
+            index._size = len(vectors)
+            try:
+                index._ids = [str(i) for i in data["ids"]]
+                index._titles = [str(t) for t in data["titles"]]
+            except ValueError as e:
+                raise ValueError(f"{path} stores job ids as pickled objects, which are no longer loaded; "
+                                 f"index the jobs again (POST /jobs/index/) or rebuild it with `python job_index.py build`") from e
+            index._rows = {job_id: row for row, job_id in enumerate(index._ids)}
+            centroids = data["centroids"]
+            index._centroids = centroids.copy() if len(centroids) else None
+        return index
+
+    def publish(self, directory: str) -> str:
+        """
+        Write the index as a new generation under ``directory`` and make it current.
+
+        Each generation is a directory of ``.npy`` files that ``open_published``
+        can memory-map, so every process reading it shares one copy of the
+        vectors in the page cache. Callers publishing from several processes must
+        serialize, as ``SharedJobIndex`` does with a file lock.
+
+        Returns:
+            str: Name of the new generation
+        """
+        current = current_generation(directory)
+        generation = f"gen-{int(current.split('-')[1]) + 1 if current else 1:08d}"
+        path = os.path.join(directory, generation)
+        tmp_path = os.path.join(directory, f".{generation}.tmp")
+        os.makedirs(tmp_path)
+        snapshot = self._snapshot()
+        with self._write_lock:
+            np.save(os.path.join(tmp_path, "vectors.npy"), snapshot["vectors"])
+            np.save(os.path.join(tmp_path, "scales.npy"), snapshot["scales"])
+            np.save(os.path.join(tmp_path, "assignments.npy"), snapshot["assignments"])
+            if snapshot["centroids"] is not None:
+                np.save(os.path.join(tmp_path, "centroids.npy"), snapshot["centroids"])
+            with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "quantize": self.quantize,
+                           "ids": snapshot["ids"], "titles": snapshot["titles"]}, f)
+        os.rename(tmp_path, path)
+        with open(os.path.join(directory, "CURRENT.tmp"), "w") as f:
+            f.write(generation)
+        os.replace(os.path.join(directory, "CURRENT.tmp"), os.path.join(directory, "CURRENT"))
+        return generation
+
+    @classmethod
+    def open_published(cls, directory: str, generation: Optional[str] = None, mmap: bool = True) -> "JobIndex":
+        """
+        Open a generation written by ``publish``, by default the current one.
+
+        Args:
+            directory (str): Directory passed to ``publish``
+            generation (str, optional): Generation to open
+            mmap (bool): Map the vectors read-only instead of copying them into memory;
+                a mapped index can be searched but not modified
+
+        Returns:
+            JobIndex: The index; empty if nothing has been published
+        """
+        generation = generation or current_generation(directory)
+        if generation is None:
+            return cls()
+        path = os.path.join(directory, generation)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, name), mmap_mode="r" if mmap else None)
+
+        index = cls(meta["dim"], quantize=meta["quantize"])
+        index._ids = meta["ids"]
+        index._titles = meta["titles"]
+        index._rows = {job_id: row for row, job_id in enumerate(index._ids)}
+        index._size = len(index._ids)
+        # Empty arrays cannot be mapped, and an empty index needs none
+        if index._size:
+            index._vectors = array("vectors.npy")
+            index._scales = array("scales.npy")
+            index._assignments = array("assignments.npy")
+        if os.path.exists(os.path.join(path, "centroids.npy")):
+            index._centroids = np.load(os.path.join(path, "centroids.npy"))
+        index.generation = generation
+        return index
+
+    def stats(self) -> Dict[str, object]:
+        return {"jobs": self._size, "dim": self.dim, "quantize": self.quantize, "ivf": self._centroids is not None}
+
+
+def current_generation(directory: str) -> Optional[str]:
+    """Name of the generation last published to ``directory``, or None"""
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class SharedJobIndex:
+    """
+    Job index shared by all worker processes on a host.
+
+    The vectors live in memory-mapped generations written by
+    ``JobIndex.publish``, so N workers hold one copy of them in the page cache
+    instead of N. An update takes an exclusive file lock, applies the change to
+    a private copy of the latest generation and publishes it as a new one;
+    every worker switches to it the next time it checks ``CURRENT``, at most
+    ``check_interval`` seconds later. Generations are never modified in place,
+    so a search never sees a half-applied update. Each update rewrites the
+    whole index, which suits batched job syncs rather than per-job writes.
+    """
+
+    KEEP_GENERATIONS = 2
+
+    def __init__(self, directory: str, quantize: bool = False, check_interval: float = 1.0,
+                 seed_path: Optional[str] = None):
+        """
+        Args:
+            directory (str): Directory holding the published generations
+            quantize (bool): Store vectors as int8 if the index is created here
+            check_interval (float): Seconds between checks for a newer generation
+            seed_path (str, optional): ``.npz`` index published as the first generation
+                if the directory has none yet
+        """
+        self.directory = directory
+        self.quantize = quantize
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._index: Optional[JobIndex] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if current_generation(directory) is None:
+            with self._file_lock():
+                if current_generation(directory) is None:
+                    seed = JobIndex.load(seed_path) if seed_path and os.path.exists(seed_path) else JobIndex(quantize=quantize)
+                    seed.publish(directory)
+        self._current(force=True)
+
+    @property
+    def generation(self) -> Optional[str]:
+        return self._index.generation if self._index is not None else None
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize publishers across processes"""
+        import fcntl
+
+        with open(os.path.join(self.directory, "LOCK"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _current(self, force: bool = False) -> JobIndex:
+        """The index of the current generation, reopened if another process published since the last check"""
+        now = time.monotonic()
+        if not force and self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            self._checked_at = now
+            generation = current_generation(self.directory)
+            if self._index is None or generation != self.generation:
+                try:
+                    self._index = JobIndex.open_published(self.directory, generation)
+                except FileNotFoundError:
+                    # Pruned between reading CURRENT and opening it; a newer one is current now
+                    self._index = JobIndex.open_published(self.directory)
+                self.reloads += 1
+            return self._index
+
+    def _update(self, apply):
+        with self._file_lock():
+            latest = JobIndex.open_published(self.directory, mmap=False)
+            result = apply(latest)
+            latest.publish(self.directory)
+            self._prune()
+        self._current(force=True)
+        return result
+
+    def _prune(self):
+        generations = sorted(name for name in os.listdir(self.directory) if name.startswith("gen-"))
+        for name in generations[:-self.KEEP_GENERATIONS]:
+            # Workers that still map an old generation keep their pages until they switch
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._current())
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._current()
+
+    def add(self, job_ids: List[str], vectors: np.ndarray, titles: Optional[List[str]] = None):
+        """Add or replace jobs and publish a new generation; see ``JobIndex.add``"""
+        self._update(lambda index: index.add(job_ids, vectors, titles))
+
+    def remove(self, job_ids: Iterable[str]) -> int:
+        """Remove jobs and publish a new generation; see ``JobIndex.remove``"""
+        return self._update(lambda index: index.remove(list(job_ids)))
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """Recluster and publish a new generation; see ``JobIndex.build_ivf``"""
+        self._update(lambda index: index.build_ivf(n_lists, iterations, seed))
+
+    def search(self, query: np.ndarray, k: int = 10, approximate: bool = False,
+               n_probe: int = 8) -> List[Tuple[str, str, float]]:
+        return self._current().search(query, k, approximate, n_probe)
+
+    def save(self, path: str):
+        self._current().save(path)
+
+    def stats(self) -> Dict[str, object]:
+        return {**self._current().stats(), "generation": self.generation, "reloads": self.reloads}
+
+
+def load_job_dataset(path: str) -> List[Dict[str, str]]:
+    """
+    Read the Apizhai job recommendation dataset (JSONL of {"resume", "job"}).
+
+    Returns:
+        List[Dict[str, str]]: Records with ``resume`` and ``job`` keys
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def _benchmark(args):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(args.model)
+    records = load_job_dataset(args.dataset)
+    titles = sorted({r["job"] for r in records})
+    job_vectors = model.encode(titles, batch_size=64, normalize_embeddings=True)
+
+    index = JobIndex(job_vectors.shape[1], quantize=args.quantize)
+    index.add([f"job-{i}" for i in range(len(titles))], job_vectors, titles)
+    # Pad the real titles with random distractors to reach a production-sized corpus
+    rng = np.random.default_rng(0)
+    filler = max(0, args.size - len(titles))
+    for start in range(0, filler, 10000):
+        count = min(10000, filler - start)
+        index.add([f"synthetic-{start + i}" for i in range(count)],
+                  rng.standard_normal((count, index.dim)).astype(np.float32))
+    if args.approximate:
+        index.build_ivf()
+
+    queries = model.encode([r["resume"] for r in records], batch_size=64, normalize_embeddings=True)
+    latencies, correct = [], 0
+    for record, query in zip(records, queries):
+        start = time.perf_counter()
+        results = index.search(query, k=args.k, approximate=args.approximate)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += any(title == record["job"] for _, title, _ in results)
+
+    latencies = np.array(latencies)
+    print(json.dumps({
+        "jobs": len(index),
+        "quantize": args.quantize,
+        "approximate": args.approximate,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        f"hit_at_{args.k}": correct / len(records),
+    }, indent=2))
+
+
+def _build(args):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(args.model)
+    titles = sorted({r["job"] for r in load_job_dataset(args.dataset)})
+    vectors = model.encode(titles, batch_size=64, normalize_embeddings=True)
+    index = JobIndex(vectors.shape[1], quantize=args.quantize)
+    index.add(titles, vectors, titles)
+    if args.approximate:
+        index.build_ivf()
+    index.save(args.out)
+    print(f"Indexed {len(index)} jobs into {args.out}")
+
+
+if __name__ == "__main__":
+    default_dataset = os.path.join(os.path.dirname(__file__), "..", "AI Models", "Apizhai Model",
+                                   "job_recommendation_dataset.jsonl")
+    parser = argparse.ArgumentParser(description="Build or benchmark the job recommendation index")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("--dataset", default=default_dataset)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--out", default="job_index.npz")
+    parser.add_argument("--size", type=int, default=50000, help="Corpus size for the benchmark")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--approximate", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        _build(args)
+    else:
+        _benchmark(args)
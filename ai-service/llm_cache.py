@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def llm_cache_key(model: str, prompt_version: str, temperature: float, messages: List[Dict[str, str]]) -> str:
+    """
+    Cache key for a chat completion: hash of (model, prompt version, temperature,
+    whitespace-normalized messages).
+    """
+    normalized = [(m.get("role"), _WHITESPACE.sub(" ", m.get("content") or "").strip()) for m in messages]
+    payload = json.dumps([model, prompt_version, round(float(temperature), 3), normalized], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """
+    Persistent cache tier in a SQLite file, shared by every worker on the host.
+
+    Calls block on disk I/O; ``LLMResponseCache`` runs them in threads. Expired
+    and surplus rows are pruned every ``prune_every`` writes rather than on
+    each one, so the table may briefly exceed ``max_items``.
+    """
+
+    def __init__(self, path: str, max_items: int = 100000, prune_every: int = 100):
+        self.path = path
+        self.max_items = max_items
+        self.prune_every = prune_every
+        self._writes = 0
+        self._count: Optional[int] = None
+        self._count_lock = threading.Lock()
+        self._local = threading.local()
+        self._inherited: List[threading.local] = []
+        os.register_at_fork(after_in_child=self._after_fork)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created_at)")
+
+    def _after_fork(self):
+        # SQLite connections must not cross fork(); closing the parent's could checkpoint
+        # its WAL from under it, so keep it referenced and open fresh ones in the child
+        self._inherited.append(self._local)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time()),
+            )
+        with self._count_lock:
+            self._writes += 1
+            due = self._writes % self.prune_every == 0 or self._count is None
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Delete expired rows, then the oldest rows beyond ``max_items``"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_items:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY created_at LIMIT ?)",
+                    (count - self.max_items,),
+                )
+                count = self.max_items
+        self._count = count
+
+    def __len__(self) -> int:
+        """Row count as of the last prune; does not touch the disk"""
+        return self._count or 0
+
+
+class LLMResponseCache:
+    """
+    TTL cache for LLM results with a size-bounded in-memory LRU tier and an
+    optional SQLite tier.
+
+    Values are stored as JSON text, so every hit hands the caller a fresh copy
+    it can mutate freely.
+    """
+
+    def __init__(self, max_items: int = 2048, ttl: float = 7 * 24 * 3600, path: Optional[str] = None,
+                 max_disk_items: int = 100000):
+        """
+        Args:
+            max_items (int): Capacity of the in-memory tier
+            ttl (float): Seconds an entry stays valid
+            path (str, optional): SQLite file for the persistent tier; disabled if None
+            max_disk_items (int): Capacity of the persistent tier
+        """
+        self.max_items = max_items
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = SQLiteCacheBackend(path, max_disk_items) if path else None
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """Build the cache from LLM_CACHE_* settings; returns None when LLM_CACHE_SIZE is 0"""
+        max_items = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+        if max_items <= 0:
+            return None
+        return cls(
+            max_items=max_items,
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            path=os.getenv("LLM_CACHE_PATH") or None,
+        )
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a cached result; the disk tier is read in a thread.
+
+        Returns:
+            Tuple[bool, Any]: (found, value)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return True, json.loads(entry[0])
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        if self._disk is not None:
+            stored = await asyncio.to_thread(self._disk.get, key)
+            if stored is not None and stored[1] > now:
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._remember(key, stored[0], stored[1])
+                return True, json.loads(stored[0])
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return False, None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable result; the disk tier is written in a thread"""
+        serialized = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, serialized, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, serialized, expires_at)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_items = len(self._memory)
+        lookups = counters["hits"] + counters["disk_hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": (counters["hits"] + counters["disk_hits"]) / lookups if lookups else 0.0,
+            "memory_items": memory_items,
+            "disk_items": len(self._disk) if self._disk is not None else 0,
+        }
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from llm_cache import LLMResponseCache, llm_cache_key
+from metrics import stage
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when an LLM request fails after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when an LLM request cannot complete before its deadline"""
+
+
+class LLMClient:
+    """
+    Async client for OpenAI-compatible chat completion APIs.
+
+    One instance is shared by the whole process: it keeps a pool of keep-alive
+    connections, caps in-flight requests with a semaphore and retries 429/5xx
+    responses with jittered exponential backoff until the request deadline.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://api.openai.com/v1",
+                 max_concurrency: int = 8, timeout: float = 60.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0, max_connections: int = 20,
+                 cache: Optional[LLMResponseCache] = None):
+        """
+        Args:
+            api_key (str, optional): Bearer token sent with every request
+            base_url (str): API root, e.g. a local stand-in server in tests
+            max_concurrency (int): Maximum number of requests in flight
+            timeout (float): Default overall deadline per call in seconds, retries included
+            max_retries (int): Retries after the first attempt
+            backoff_base (float): First backoff delay in seconds
+            backoff_max (float): Upper bound for a single backoff delay
+            max_connections (int): Size of the keep-alive connection pool
+            cache (LLMResponseCache, optional): Result cache used by ``chat_cached``
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0, "waiting": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        """Build a client from OPENAI_API_KEY, OPENAI_BASE_URL and LLM_* settings"""
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            cache=LLMResponseCache.from_env(),
+        )
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter spreads retries from a burst instead of synchronizing them
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def chat(self, messages: List[Dict[str, str]], model: str = "gpt-4",
+                   temperature: float = 0.7, max_tokens: Optional[int] = None,
+                   timeout: Optional[float] = None, **params) -> str:
+        """
+        Run a chat completion and return the message content.
+
+        Args:
+            messages (List[Dict[str, str]]): Chat messages
+            model (str): Model name
+            temperature (float): Sampling temperature
+            max_tokens (int, optional): Completion token limit
+            timeout (float, optional): Overall deadline in seconds, including retries
+
+        Returns:
+            str: Content of the first choice
+        """
+        client = self._http()
+        deadline = time.monotonic() + (timeout or self.timeout)
+        payload = {"model": model, "messages": messages, "temperature": temperature, **params}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+
+        self._counters["waiting"] += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self._counters["failures"] += 1
+            raise LLMTimeoutError("Timed out waiting for a free LLM slot")
+        finally:
+            self._counters["waiting"] -= 1
+
+        self._counters["in_flight"] += 1
+        try:
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMTimeoutError("LLM request deadline exceeded")
+                self._counters["requests"] += 1
+                retry_after = None
+                try:
+                    with stage("llm"):
+                        response = await client.post("/chat/completions", json=payload, timeout=remaining)
+                    if response.status_code < 400:
+                        try:
+                            return response.json()["choices"][0]["message"]["content"]
+                        except (ValueError, KeyError, IndexError, TypeError):
+                            raise LLMError("LLM API returned a malformed completion")
+                    error = LLMError(f"LLM API returned {response.status_code}: {response.text[:200]}",
+                                     status_code=response.status_code)
+                    retryable = response.status_code in RETRYABLE_STATUS
+                    retry_after = response.headers.get("retry-after")
+                except httpx.TimeoutException:
+                    error = LLMTimeoutError("LLM request timed out")
+                    retryable = True
+                except httpx.TransportError as e:
+                    error = LLMError(f"LLM connection error: {str(e)}")
+                    retryable = True
+
+                delay = self._backoff(attempt, retry_after)
+                if not retryable or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    raise error
+                attempt += 1
+                self._counters["retries"] += 1
+                await asyncio.sleep(delay)
+        except LLMError:
+            self._counters["failures"] += 1
+            raise
+        finally:
+            self._counters["in_flight"] -= 1
+            self._semaphore.release()
+
+    async def chat_json(self, messages: List[Dict[str, str]], **kwargs) -> Any:
+        """Run a chat completion whose content is a JSON document and decode it"""
+        content = await self.chat(messages, **kwargs)
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError as e:
+            raise LLMError(f"LLM returned invalid JSON: {str(e)}")
+
+    async def chat_cached(self, messages: List[Dict[str, str]], prompt_version: str,
+                          json_response: bool = False, model: str = "gpt-4",
+                          temperature: float = 0.7, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run ``chat`` (or ``chat_json``) through the response cache.
+
+        Args:
+            messages (List[Dict[str, str]]): Chat messages
+            prompt_version (str): Version of the calling prompt; bump it to invalidate old results
+            json_response (bool): Decode the content as JSON
+
+        Returns:
+            Tuple[Any, bool]: (result, whether it came from the cache)
+        """
+        call = self.chat_json if json_response else self.chat
+        if self.cache is None:
+            return await call(messages, model=model, temperature=temperature, **kwargs), False
+
+        key = llm_cache_key(model, prompt_version, temperature, messages)
+        found, value = await self.cache.get(key)
+        if found:
+            return value, True
+        result = await call(messages, model=model, temperature=temperature, **kwargs)
+        await self.cache.set(key, result)
+        return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {**self._counters, "max_concurrency": self.max_concurrency}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_shared_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client, creating it from the environment on first use"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = LLMClient.from_env()
+    return _shared_client
@@ -0,0 +1,347 @@
+"""
+Local resume field extraction.
+
+Contact details, profile URLs and explicit language levels are found with
+compiled regular expressions in a few milliseconds. An optional spaCy NER
+model (see ``train``) adds the name, location, experience and skills lines.
+
+The service uses this in three parse modes:
+
+- ``llm``: everything comes from the LLM (the original behaviour)
+- ``hybrid``: local fields are kept and the LLM is only asked for the rest
+- ``offline``: local fields only, for when the LLM is unavailable
+"""
+import argparse
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+PARSE_MODES = ("llm", "hybrid", "offline")
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"(?<![\w+])\+?\(?\d[\d\s().\-/]{5,}\d(?!\w)")
+PHONE_LABEL_RE = re.compile(r"\b(?:phone|tel|telephone|mobile|cell|whatsapp|contact)\b", re.IGNORECASE)
+YEAR_RANGE_RE = re.compile(r"^\(?(?:19|20)\d{2}\)?\s*[-/.]\s*\(?(?:19|20)\d{2}\)?$")
+LINKEDIN_RE = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[A-Za-z0-9_%\-]+/?", re.IGNORECASE)
+GITHUB_RE = re.compile(r"(?:https?://)?(?:www\.)?github\.com/[A-Za-z0-9\-]+(?:/[A-Za-z0-9_.\-]+)?/?", re.IGNORECASE)
+URL_RE = re.compile(r"(?:https?://|www\.)[^\s<>\"'()|,;]+", re.IGNORECASE)
+
+LEVELS = r"A1|A2|B1|B2|C1|C2|native|mother\s+tongue|muttersprache"
+LANGUAGE_NAMES = {
+    "english": "English", "german": "German", "deutsch": "German", "french": "French",
+    "spanish": "Spanish", "italian": "Italian", "dutch": "Dutch", "portuguese": "Portuguese",
+    "russian": "Russian", "turkish": "Turkish", "arabic": "Arabic", "urdu": "Urdu",
+    "hindi": "Hindi", "punjabi": "Punjabi", "persian": "Persian", "chinese": "Chinese",
+    "japanese": "Japanese", "polish": "Polish",
+}
+_LANGUAGE = "|".join(LANGUAGE_NAMES)
+# "German: B2", "German (C1)", "Deutsch - Muttersprache", and the reverse "B2 German"
+LANGUAGE_LEVEL_RE = re.compile(
+    rf"\b(?P<language>{_LANGUAGE})\b[^\n\w]{{0,6}}(?:\w+[^\n\w]{{1,3}}){{0,2}}?(?P<level>{LEVELS})\b"
+    rf"|\b(?P<level2>A1|A2|B1|B2|C1|C2)\b[^\n\w]{{0,3}}(?:level[^\n\w]{{1,3}})?(?P<language2>{_LANGUAGE})\b",
+    re.IGNORECASE,
+)
+
+EXPERIENCE_RE = re.compile(
+    r"(\d{1,2}(?:\.\d)?)\s*\+?\s*(?:years?|yrs?)\b(?:\s+of)?(?:\s+\w+){0,2}?\s+experience", re.IGNORECASE
+)
+LABELLED_LINE_RE = re.compile(r"^\s*(?P<label>[A-Za-z ]{2,20})\s*[:\-–]\s*(?P<value>.+?)\s*$", re.MULTILINE)
+LEADING_YEARS_RE = re.compile(r"(\d{1,2}(?:\.\d)?)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+NAME_RE = re.compile(r"^[A-Z][a-zA-Z'\-.]+(?: [A-Z][a-zA-Z'\-.]+){1,3}$")
+
+# Fields the regex stage can fill; the LLM is never needed for these once found
+LOCAL_FIELDS = ("email", "phone", "linkedinUrl", "githubUrl", "portfolioUrl", "germanLevel", "languages")
+
+
+def _normalize_url(url: str) -> str:
+    url = url.rstrip("/.")
+    return url if url.lower().startswith("http") else f"https://{url}"
+
+
+def _normalize_level(level: str) -> str:
+    level = " ".join(level.split())
+    if level.lower() in ("native", "mother tongue", "muttersprache"):
+        return "Native"
+    return level.upper()
+
+
+def find_phone(text: str) -> Optional[str]:
+    """First plausible phone number, preferring one on a line labelled as a phone"""
+    candidates = []
+    for match in PHONE_RE.finditer(text):
+        value = match.group(0).strip()
+        digits = re.sub(r"\D", "", value)
+        if not 7 <= len(digits) <= 15 or YEAR_RANGE_RE.match(value):
+            continue
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        labelled = bool(PHONE_LABEL_RE.search(text[line_start:match.start()]))
+        candidates.append((not labelled, match.start(), value))
+    return min(candidates)[2] if candidates else None
+
+
+def find_languages(text: str) -> List[Dict[str, str]]:
+    """Languages stated with an explicit CEFR or native level, in order of appearance"""
+    languages: Dict[str, str] = {}
+    for match in LANGUAGE_LEVEL_RE.finditer(text):
+        language = match.group("language") or match.group("language2")
+        level = match.group("level") or match.group("level2")
+        languages.setdefault(LANGUAGE_NAMES[language.lower()], _normalize_level(level))
+    return [{"language": language, "level": level} for language, level in languages.items()]
+
+
+def _labelled_values(text: str) -> Dict[str, str]:
+    values: Dict[str, str] = {}
+    for match in LABELLED_LINE_RE.finditer(text[:5000]):
+        values.setdefault(match.group("label").strip().lower(), match.group("value"))
+    return values
+
+
+def extract_local_fields(text: str) -> Dict[str, Any]:
+    """
+    Extract the deterministic fields of a resume with regular expressions.
+
+    Args:
+        text (str): Resume text
+
+    Returns:
+        Dict[str, Any]: Only the fields that were found, keyed like the LLM output
+            (email, phone, linkedinUrl, githubUrl, portfolioUrl, languages,
+            germanLevel, experience, fullName, city, country, skills)
+    """
+    fields: Dict[str, Any] = {}
+
+    email = EMAIL_RE.search(text)
+    if email:
+        fields["email"] = email.group(0)
+    phone = find_phone(text)
+    if phone:
+        fields["phone"] = phone
+
+    linkedin = LINKEDIN_RE.search(text)
+    if linkedin:
+        fields["linkedinUrl"] = _normalize_url(linkedin.group(0))
+    github = GITHUB_RE.search(text)
+    if github:
+        fields["githubUrl"] = _normalize_url(github.group(0))
+    for url in URL_RE.finditer(text):
+        value = url.group(0)
+        if not LINKEDIN_RE.search(value) and not GITHUB_RE.search(value):
+            fields["portfolioUrl"] = _normalize_url(value)
+            break
+
+    languages = find_languages(text)
+    if languages:
+        fields["languages"] = languages
+        german = next((entry["level"] for entry in languages if entry["language"] == "German"), None)
+        if german:
+            fields["germanLevel"] = german
+
+    # Labelled lines ("Experience: 3 years at Google", "Location: Lahore, Pakistan")
+    labelled = _labelled_values(text)
+    experience = EXPERIENCE_RE.search(text)
+    if experience:
+        fields["experience"] = experience.group(1)
+    elif "experience" in labelled and LEADING_YEARS_RE.match(labelled["experience"]):
+        fields["experience"] = LEADING_YEARS_RE.match(labelled["experience"]).group(1)
+    location = labelled.get("location") or labelled.get("city") or labelled.get("address")
+    if location:
+        parts = [part.strip() for part in location.split(",") if part.strip()]
+        if parts:
+            fields["city"] = parts[0]
+        if len(parts) > 1:
+            fields["country"] = parts[-1]
+    if "skills" in labelled:
+        fields["skills"] = [skill.strip() for skill in re.split(r"[,;|•]", labelled["skills"]) if skill.strip()]
+
+    # Resumes almost always open with the candidate's name
+    for line in text.splitlines()[:5]:
+        line = line.strip()
+        if line:
+            if NAME_RE.match(line) and "resume" not in line.lower():
+                fields["fullName"] = line
+            break
+
+    return fields
+
+
+class EntityExtractor:
+    """
+    Optional spaCy NER stage trained on ``resume_ner_dataset.json`` labels
+    (NAME, EMAIL, PHONE, EXPERIENCE, SKILLS, EDUCATION, LOCATION).
+
+    spaCy and the model are loaded on first use.
+    """
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._nlp = None
+        self._lock = threading.Lock()
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    import spacy
+
+                    self._nlp = spacy.load(self.model_path)
+        return self._nlp
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """Fields derived from the first entity of each label"""
+        entities: Dict[str, str] = {}
+        for ent in self.nlp(text[:20000]).ents:
+            entities.setdefault(ent.label_, ent.text.strip())
+
+        fields: Dict[str, Any] = {}
+        if "NAME" in entities:
+            fields["fullName"] = entities["NAME"]
+        if "EMAIL" in entities and EMAIL_RE.fullmatch(entities["EMAIL"]):
+            fields["email"] = entities["EMAIL"]
+        if "PHONE" in entities:
+            fields["phone"] = entities["PHONE"]
+        if "LOCATION" in entities:
+            parts = [part.strip() for part in entities["LOCATION"].split(",") if part.strip()]
+            fields["city"] = parts[0]
+            if len(parts) > 1:
+                fields["country"] = parts[-1]
+        if "EXPERIENCE" in entities and LEADING_YEARS_RE.search(entities["EXPERIENCE"]):
+            fields["experience"] = LEADING_YEARS_RE.search(entities["EXPERIENCE"]).group(1)
+        if "SKILLS" in entities:
+            fields["skills"] = [skill.strip() for skill in re.split(r"[,;|•]", entities["SKILLS"]) if skill.strip()]
+        if "EDUCATION" in entities:
+            fields["education"] = [{"degree": entities["EDUCATION"]}]
+        return fields
+
+
+class LocalFieldExtractor:
+    """Regex stage plus, when a model path is configured, the spaCy NER stage"""
+
+    def __init__(self, ner_model_path: Optional[str] = None):
+        self.entities = EntityExtractor(ner_model_path) if ner_model_path else None
+
+    @classmethod
+    def from_env(cls) -> "LocalFieldExtractor":
+        """Reads RESUME_NER_MODEL, the directory written by ``python local_extractor.py train``"""
+        return cls(os.getenv("RESUME_NER_MODEL") or None)
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        fields = extract_local_fields(text)
+        if self.entities is not None:
+            # Regex matches are exact, so NER only fills what they missed
+            for key, value in self.entities.extract(text).items():
+                fields.setdefault(key, value)
+        return fields
+
+
+def missing_fields(fields: Dict[str, Any], wanted: Iterable[str]) -> List[str]:
+    """The wanted fields a local pass did not fill, i.e. the ones still worth asking the LLM for"""
+    return [key for key in wanted if fields.get(key) in (None, "", [])]
+
+
+def fields_prompt(fields: Dict[str, str]) -> str:
+    """Short system prompt asking the LLM for just the given fields, as ``{key: description}``"""
+    lines = "\n".join(f"- {key}: {description}" for key, description in fields.items())
+    return ("You are a resume parsing assistant. From the resume text, extract only these fields "
+            f"and answer with a JSON object using exactly these keys (null when absent):\n{lines}")
+
+
+def load_ner_dataset(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def train(dataset_path: str, output_dir: str, iterations: int = 30, holdout: float = 0.2, seed: int = 0):
+    """
+    Train a blank English spaCy NER model on the resume NER dataset.
+
+    The last ``holdout`` fraction of the shuffled records is left out for ``evaluate``.
+    """
+    import random
+
+    import spacy
+    from spacy.training import Example
+
+    records = load_ner_dataset(dataset_path)
+    random.Random(seed).shuffle(records)
+    train_records = records[:int(len(records) * (1 - holdout))]
+
+    nlp = spacy.blank("en")
+    ner = nlp.add_pipe("ner")
+    for record in train_records:
+        for entity in record["entities"]:
+            ner.add_label(entity["label"])
+
+    examples = []
+    for record in train_records:
+        doc = nlp.make_doc(record["text"])
+        spans = [(e["start"], e["end"], e["label"]) for e in record["entities"]]
+        examples.append(Example.from_dict(doc, {"entities": spans}))
+
+    optimizer = nlp.initialize(lambda: examples)
+    for _ in range(iterations):
+        random.Random(seed).shuffle(examples)
+        for start in range(0, len(examples), 8):
+            nlp.update(examples[start:start + 8], sgd=optimizer, drop=0.2)
+    nlp.to_disk(output_dir)
+
+
+def evaluate(dataset_path: str, ner_model_path: Optional[str] = None, holdout: float = 0.2,
+             seed: int = 0) -> Dict[str, Any]:
+    """
+    Exact-match accuracy of the local fields against the dataset's annotated spans.
+
+    With a NER model, only the held-out records are scored so training data does not
+    flatter the result.
+    """
+    import random
+
+    records = load_ner_dataset(dataset_path)
+    if ner_model_path:
+        random.Random(seed).shuffle(records)
+        records = records[int(len(records) * (1 - holdout)):]
+    extractor = LocalFieldExtractor(ner_model_path)
+
+    label_fields = {"NAME": "fullName", "EMAIL": "email", "PHONE": "phone", "LOCATION": "city"}
+    totals = {label: {"annotated": 0, "found": 0, "correct": 0} for label in label_fields}
+    for record in records:
+        fields = extractor.extract(record["text"])
+        for entity in record["entities"]:
+            label = entity["label"]
+            if label not in label_fields:
+                continue
+            expected = record["text"][entity["start"]:entity["end"]].strip()
+            value = fields.get(label_fields[label])
+            counts = totals[label]
+            counts["annotated"] += 1
+            counts["found"] += value is not None
+            counts["correct"] += value is not None and (value == expected or value == expected.split(",")[0].strip())
+    return {
+        "records": len(records),
+        "fields": {
+            label_fields[label]: {**counts, "accuracy": round(counts["correct"] / counts["annotated"], 3)
+                                  if counts["annotated"] else None}
+            for label, counts in totals.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    default_dataset = os.path.join(os.path.dirname(__file__), "..", "AI Models", "Jobbert Model",
+                                   "resume_ner_dataset.json")
+    parser = argparse.ArgumentParser(description="Train or evaluate the local resume field extractor")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--dataset", default=default_dataset)
+    parser.add_argument("--model", default=os.getenv("RESUME_NER_MODEL"), help="spaCy model directory")
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        if not args.model:
+            parser.error("--model (or RESUME_NER_MODEL) is required for train")
+        train(args.dataset, args.model, iterations=args.iterations)
+        print(f"Saved NER model to {args.model}")
+    else:
+        print(json.dumps(evaluate(args.dataset, args.model), indent=2))
@@ -1,22 +1,40 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 import uvicorn
+import asyncio
 import os
 from dotenv import load_dotenv
 import json
 from typing import List, Optional
 from pydantic import BaseModel
-import fitz  # PyMuPDF
-import docx
-import openai
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from embedding_cache import EmbeddingCache
+from job_index import JobIndex, SharedJobIndex
+from executors import default_execution_layer
+from extraction import extract_pdf_text, extract_docx_text, extract_pdf_text_parallel
+from llm_client import get_llm_client
+from singleflight import SingleFlight, content_hash
+from batching import MicroBatcher
+from model_loader import LazyEncoder
+from uploads import SpooledUpload, UploadSizeLimitMiddleware, spool_upload, sweep_spooled_uploads
+from parse_queue import ParseJobQueue, QueueFullError, QueueUnavailableError
+from bulk_ingest import IngestJobStore, IngestStats, ingest
+from local_extractor import PARSE_MODES, LocalFieldExtractor, LOCAL_FIELDS, fields_prompt, missing_fields
+from skill_taxonomy import get_skill_taxonomy, skill_overlap
+from prompt_compaction import get_prompt_compactor
+from quiz_bank import DIFFICULTIES, QuizService
+from profile_embedding import encode_profile, profile_sections
+from metrics import MetricsMiddleware, get_metrics
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Shared async LLM client (OPENAI_API_KEY, OPENAI_BASE_URL, LLM_MAX_CONCURRENCY, LLM_TIMEOUT, LLM_MAX_RETRIES)
+llm = get_llm_client()
 
 # Initialize FastAPI app
 app = FastAPI(title="Zirak HR AI Service", 
@@ -31,8 +49,101 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize sentence transformer model for embeddings
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Prometheus metrics on /metrics and optional Server-Timing headers (METRICS_ENABLED, SERVER_TIMING)
+metrics = get_metrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# Uploads are capped while they stream in; the body limit leaves room for multipart framing
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES + 64 * 1024, paths=["/parse-resume/"])
+
+# Sentence transformer model for embeddings; loaded on first use or by the warm-up hook.
+# EMBEDDING_BACKEND selects torch (default), torch-int8, onnx or onnx-int8 inference.
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+model = LazyEncoder(EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND)
+
+# Concurrent encode calls are merged into batched forward passes unless EMBED_BATCHING=false
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "true").lower() == "true"
+if EMBED_BATCHING:
+    encoder = MicroBatcher(
+        model,
+        max_batch_size=int(os.getenv("EMBED_MAX_BATCH_SIZE", "64")),
+        max_wait_ms=float(os.getenv("EMBED_MAX_WAIT_MS", "5")),
+    )
+else:
+    encoder = model
+
+# Content-addressed embedding cache; set EMBEDDING_CACHE_DIR to persist it across restarts and workers
+embedding_cache = EmbeddingCache(
+    encoder,
+    # Quantized backends produce slightly different vectors, so they get their own cache keys
+    EMBEDDING_MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL_NAME}@{EMBEDDING_BACKEND}",
+    max_memory_items=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+    cache_dir=os.getenv("EMBEDDING_CACHE_DIR") or None,
+    dtype=os.getenv("EMBEDDING_CACHE_DTYPE", "float32"),
+)
+
+# Extraction budgets keep latency predictable for 40+ page portfolios (0 disables a limit)
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "60")) or None
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "200000")) or None
+
+# Thread/process pools for blocking work (PDF/DOCX parsing, embedding)
+executors = default_execution_layer(embed_workers=32 if EMBED_BATCHING else 2)
+
+# Coalesces concurrent identical parse/suggest/match requests into one computation
+single_flight = SingleFlight()
+
+# Prebuilt job vector index for recommendations; persisted to JOB_INDEX_PATH when set.
+# With JOB_INDEX_DIR, every worker on the host memory-maps one shared copy of the vectors
+# and picks up other workers' updates within JOB_INDEX_CHECK_INTERVAL seconds.
+JOB_INDEX_PATH = os.getenv("JOB_INDEX_PATH")
+JOB_INDEX_DIR = os.getenv("JOB_INDEX_DIR")
+JOB_INDEX_QUANTIZE = os.getenv("JOB_INDEX_QUANTIZE", "false").lower() == "true"
+# Indexes with at least this many jobs are searched off the event loop
+JOB_INDEX_OFFLOAD_ROWS = int(os.getenv("JOB_INDEX_OFFLOAD_ROWS", "20000"))
+if JOB_INDEX_DIR:
+    job_index = SharedJobIndex(
+        JOB_INDEX_DIR,
+        quantize=JOB_INDEX_QUANTIZE,
+        check_interval=float(os.getenv("JOB_INDEX_CHECK_INTERVAL", "1")),
+        seed_path=JOB_INDEX_PATH,
+    )
+elif JOB_INDEX_PATH and os.path.exists(JOB_INDEX_PATH):
+    job_index = JobIndex.load(JOB_INDEX_PATH)
+else:
+    job_index = JobIndex(quantize=JOB_INDEX_QUANTIZE)
+
+# RESUME_PARSE_MODE: llm (whole resume to the LLM), hybrid (regex/NER fields locally, the rest
+# from the LLM) or offline (local fields only); RESUME_NER_MODEL adds a trained spaCy model
+RESUME_PARSE_MODE = os.getenv("RESUME_PARSE_MODE", "llm")
+if RESUME_PARSE_MODE not in PARSE_MODES:
+    raise ValueError(f"RESUME_PARSE_MODE must be one of {', '.join(PARSE_MODES)}")
+local_extractor = LocalFieldExtractor.from_env()
+
+# Resume text is cleaned up and fitted into PROMPT_MAX_TOKENS before it reaches the LLM
+prompt_compactor = get_prompt_compactor()
+
+# Bulk ingestion jobs read sources under INGEST_ROOT and write JSONL to INGEST_OUTPUT_DIR
+INGEST_ROOT = os.path.realpath(os.getenv("INGEST_ROOT", "ingest"))
+INGEST_OUTPUT_DIR = os.getenv("INGEST_OUTPUT_DIR") or os.path.join(INGEST_ROOT, "output")
+INGEST_EXTRACT_CONCURRENCY = int(os.getenv("INGEST_EXTRACT_CONCURRENCY", "2"))
+INGEST_LLM_CONCURRENCY = int(os.getenv("INGEST_LLM_CONCURRENCY", "4"))
+# Jobs run by this worker; every worker reports and cancels any job through the shared store
+ingest_jobs = {}
+ingest_store = IngestJobStore(INGEST_OUTPUT_DIR)
+
+# Startup timings; WARMUP_ON_STARTUP=true loads the model before the worker reports ready
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+startup_report = {
+    "import_seconds": None,
+    "startup_seconds": None,
+    "warmup_seconds": None,
+    "model_load_seconds": None,
+    "warmup_state": "pending" if WARMUP_ON_STARTUP else "lazy",
+    "stale_uploads_removed": None,
+}
 
 # Pydantic models for request/response validation
 class ProfileData(BaseModel):
@@ -50,42 +161,144 @@ class ProfileData(BaseModel):
     githubUrl: Optional[str] = None
     resumeText: Optional[str] = None
 
+class ParsedResume(ProfileData):
+    cached: bool = False
+
 class SkillSuggestion(BaseModel):
     skills: List[str]
     confidence: List[float]
+    cached: bool = False
 
 class JobMatch(BaseModel):
     jobId: str
     title: str
     matchScore: float
 
+class JobPosting(BaseModel):
+    jobId: str
+    title: Optional[str] = ""
+    description: str
+
+class BatchJobMatchRequest(BaseModel):
+    profile: ProfileData
+    jobs: List[JobPosting]
+    topK: Optional[int] = None
+
+class BatchJobMatchResponse(BaseModel):
+    matches: List[JobMatch]
+
+class JobIndexUpdate(BaseModel):
+    jobs: List[JobPosting]
+
+class IngestJobRequest(BaseModel):
+    source: str  # Directory or ZIP archive, relative to INGEST_ROOT
+    retryErrors: bool = False
+
+class JobRecommendationRequest(BaseModel):
+    profile: ProfileData
+    topK: int = 10
+    approximate: bool = False
+
 # Helper functions
 def extract_text_from_pdf(file_content):
     """Extract text from PDF file content"""
     try:
-        with fitz.open(stream=file_content, filetype="pdf") as doc:
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            return text
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error extracting text from PDF: {str(e)}")
+        return extract_pdf_text(file_content, max_pages=EXTRACT_MAX_PAGES, max_chars=EXTRACT_MAX_CHARS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 def extract_text_from_docx(file_content):
     """Extract text from DOCX file content"""
     try:
-        doc = docx.Document(file_content)
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error extracting text from DOCX: {str(e)}")
+        return extract_docx_text(file_content, max_chars=EXTRACT_MAX_CHARS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def extract_text(kind, source):
+    """Extract text from a 'pdf' or 'docx' path or bytes in the extraction pool, off the event loop"""
+    run_in_pool = lambda fn, *args: executors.run("extract", fn, *args)
+    try:
+        with metrics.stage("extract"):
+            return await extract_in_pool(kind, source, run_in_pool)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-def parse_resume_with_llm(text):
+async def extract_in_pool(kind, source, run_in_pool):
+    if kind == 'pdf':
+        # Large PDFs are split into page ranges extracted by several workers
+        return await extract_pdf_text_parallel(
+            run_in_pool, source, max_pages=EXTRACT_MAX_PAGES, max_chars=EXTRACT_MAX_CHARS
+        )
+    elif kind == 'docx':
+        return await run_in_pool(extract_docx_text, source, EXTRACT_MAX_CHARS)
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PDF or DOCX file.")
+
+# Part of the LLM cache key: change a version together with its prompt
+PARSE_RESUME_PROMPT_VERSION = "parse-resume-v1"
+SUGGEST_SKILLS_PROMPT_VERSION = "suggest-skills-v1"
+PARSE_RESUME_FIELDS_PROMPT_VERSION = "parse-resume-fields-v1"
+
+# Fields of ParsedResume, described for the hybrid mode's per-field prompt
+PARSE_RESUME_FIELDS = {
+    "fullName": "full name",
+    "email": "email address",
+    "skills": "skills, as an array of strings",
+    "experience": "years of experience, as a string with the number",
+    "country": "country",
+    "city": "city",
+    "germanLevel": "German language level: None, A1, A2, B1, B2, C1, C2 or Native",
+    "availability": "availability",
+    "linkedinUrl": "LinkedIn URL",
+    "githubUrl": "GitHub URL",
+}
+
+async def compact_prompt_text(text, purpose):
+    """Compacted resume text for an LLM prompt; token counts are recorded per purpose"""
+    with metrics.stage("compaction"):
+        result = await asyncio.to_thread(prompt_compactor.compact, text, purpose)
+    return result.text
+
+async def parse_resume_locally(text, mode):
+    """Parse resume text in 'hybrid' or 'offline' mode, see local_extractor"""
+    local = await asyncio.to_thread(local_extractor.extract, text)
+    if mode == "offline":
+        return {**{key: local[key] for key in PARSE_RESUME_FIELDS if key in local}, "cached": False}
+    
+    # Regex fields are exact; the LLM only sees a prompt for the fields still missing
+    parsed_data = {key: local[key] for key in LOCAL_FIELDS if key in PARSE_RESUME_FIELDS and key in local}
+    remaining = missing_fields(parsed_data, PARSE_RESUME_FIELDS)
+    cached = False
+    if remaining:
+        prompt_text = await compact_prompt_text(text, "parse_resume_fields")
+        try:
+            llm_fields, cached = await llm.chat_cached(
+                prompt_version=PARSE_RESUME_FIELDS_PROMPT_VERSION,
+                json_response=True,
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": fields_prompt({key: PARSE_RESUME_FIELDS[key] for key in remaining})},
+                    {"role": "user", "content": prompt_text}
+                ],
+                temperature=0.3,
+                max_tokens=600
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error parsing resume with LLM: {str(e)}")
+        parsed_data.update({key: llm_fields[key] for key in remaining if key in llm_fields})
+    parsed_data["cached"] = cached
+    return parsed_data
+
+async def parse_resume_with_llm(text, mode=None):
     """Use OpenAI to parse resume text into structured data"""
+    mode = mode or RESUME_PARSE_MODE
+    if mode != "llm":
+        return await parse_resume_locally(text, mode)
+    prompt_text = await compact_prompt_text(text, "parse_resume")
     try:
-        response = openai.ChatCompletion.create(
+        parsed_data, cached = await llm.chat_cached(
+            prompt_version=PARSE_RESUME_PROMPT_VERSION,
+            json_response=True,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": """You are a resume parsing assistant. Extract the following information from the resume text:
@@ -102,20 +315,23 @@ def parse_resume_with_llm(text):
                 
                 Format your response as a valid JSON object with these keys: fullName, email, skills, experience, country, city, germanLevel, availability, linkedinUrl, githubUrl.
                 For skills, return an array of strings. For experience, return the number of years as a string."""},
-                {"role": "user", "content": text}
+                {"role": "user", "content": prompt_text}
             ],
             temperature=0.3,
             max_tokens=1000
         )
-        parsed_data = json.loads(response.choices[0].message.content)
+        parsed_data["cached"] = cached
         return parsed_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing resume with LLM: {str(e)}")
 
-def suggest_skills_with_llm(resume_text, current_skills):
+async def suggest_skills_with_llm(resume_text, current_skills):
     """Use OpenAI to suggest additional skills based on resume text and current skills"""
+    resume_text = await compact_prompt_text(resume_text, "suggest_skills")
     try:
-        response = openai.ChatCompletion.create(
+        suggested_skills, cached = await llm.chat_cached(
+            prompt_version=SUGGEST_SKILLS_PROMPT_VERSION,
+            json_response=True,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": """You are a career advisor specialized in tech skills. 
@@ -127,42 +343,244 @@ def suggest_skills_with_llm(resume_text, current_skills):
             temperature=0.5,
             max_tokens=500
         )
-        suggested_skills = json.loads(response.choices[0].message.content)
         # Calculate confidence scores (simplified)
         confidence_scores = [0.9 - (i * 0.05) for i in range(len(suggested_skills))]
         confidence_scores = [max(score, 0.5) for score in confidence_scores]  # Ensure minimum 0.5 confidence
         
-        return {"skills": suggested_skills, "confidence": confidence_scores}
+        return {"skills": suggested_skills, "confidence": confidence_scores, "cached": cached}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error suggesting skills with LLM: {str(e)}")
 
+# Quizzes are sampled from a per-skill question bank (QUIZ_BANK_PATH persists it); the LLM only
+# generates for skills whose bank is missing or stale. QUIZ_WARMUP_ON_STARTUP fills the bank for
+# the most requested skills in the background, again every QUIZ_WARMUP_INTERVAL seconds if set.
+quiz_service = QuizService.from_env(llm)
+QUIZ_WARMUP_ON_STARTUP = os.getenv("QUIZ_WARMUP_ON_STARTUP", "false").lower() == "true"
+QUIZ_WARMUP_INTERVAL = float(os.getenv("QUIZ_WARMUP_INTERVAL", "0"))
+QUIZ_WARMUP_SKILLS = [skill.strip() for skill in os.getenv("QUIZ_WARMUP_SKILLS", "").split(",") if skill.strip()] or None
+quiz_warmup_report = {"state": "idle", "last": None}
+
+async def run_quiz_warm_up(skills=None):
+    quiz_warmup_report["state"] = "running"
+    try:
+        quiz_warmup_report["last"] = await quiz_service.warm_up(skills or QUIZ_WARMUP_SKILLS)
+        quiz_warmup_report["state"] = "done"
+    except Exception as e:
+        quiz_warmup_report["state"] = f"failed: {str(e)}"
+
+async def quiz_warm_up_loop():
+    while True:
+        await run_quiz_warm_up()
+        if QUIZ_WARMUP_INTERVAL <= 0:
+            return
+        await asyncio.sleep(QUIZ_WARMUP_INTERVAL)
+
+def validate_quiz_request(skills, difficulty, questionsPerSkill):
+    if not skills:
+        raise HTTPException(status_code=400, detail="At least one skill is required")
+    if difficulty not in DIFFICULTIES:
+        raise HTTPException(status_code=400, detail=f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+    if not 1 <= questionsPerSkill <= 10:
+        raise HTTPException(status_code=400, detail="questionsPerSkill must be between 1 and 10")
+
+async def encode_in_pool(fn, *args, **kwargs):
+    """Run an embedding function in the embed pool, timed as the encode stage"""
+    with metrics.stage("encode"):
+        return await executors.run("embed", fn, *args, **kwargs)
+
+def embed_profile(profile_data, extra_texts=()):
+    """Profile vector from section embeddings cached one section at a time, plus vectors for extra_texts"""
+    return encode_profile(embedding_cache.encode, profile_data, list(extra_texts))
+
+def profile_skill_overlap(profile_data, job_description):
+    """Matching/missing job skills for a profile, found with the skill taxonomy instead of the LLM"""
+    taxonomy = get_skill_taxonomy()
+    candidate_skills = taxonomy.normalize(profile_data.skills or []) + taxonomy.extract(profile_data.resumeText or "")
+    return skill_overlap(candidate_skills, taxonomy.extract(job_description))
+
+def rank_jobs(profile_embedding, job_embeddings, top_k=None):
+    """Rank jobs by cosine similarity to the profile.
+
+    Both inputs must already be L2-normalized, so a single matrix-vector
+    product gives every cosine score. Returns (indices, scores) sorted by
+    descending score.
+    """
+    scores = job_embeddings @ profile_embedding
+    if top_k is not None and 0 < top_k < len(scores):
+        # argpartition is O(N); only the top_k slice needs a full sort
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order, scores[order]
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    """Stop the execution pools and close LLM connections on shutdown"""
+    await parse_queue.stop()
+    await quiz_service.bank.flush_requests(force=True)
+    executors.shutdown(wait=False)
+    if EMBED_BATCHING:
+        encoder.close()
+    await llm.aclose()
+
+def warm_up():
+    """Load the embedding model and run one encode so the first request is fast"""
+    started = time.perf_counter()
+    model.load()
+    model.encode(["warm-up"])
+    startup_report["model_load_seconds"] = model.load_seconds
+    startup_report["warmup_seconds"] = time.perf_counter() - started
+
+async def run_warm_up():
+    startup_report["warmup_state"] = "running"
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        startup_report["warmup_state"] = "done"
+    except Exception as e:
+        startup_report["warmup_state"] = f"failed: {str(e)}"
+
+@app.on_event("startup")
+async def startup_warm_up():
+    """Record startup timing and optionally warm the model in the background"""
+    startup_report["startup_seconds"] = time.perf_counter() - _IMPORT_STARTED
+    # Uploads older than a job record can no longer be claimed by any job or request
+    startup_report["stale_uploads_removed"] = await asyncio.to_thread(sweep_spooled_uploads, UPLOAD_TMP_DIR, PARSE_JOB_TTL)
+    parse_queue.start()
+    if QUIZ_WARMUP_ON_STARTUP:
+        asyncio.create_task(quiz_warm_up_loop())
+    if WARMUP_ON_STARTUP:
+        # Do not block startup: liveness answers while the model loads
+        asyncio.create_task(run_warm_up())
+
 # API Endpoints
 @app.get("/")
 async def root():
     return {"message": "Welcome to Zirak HR AI Service"}
 
-@app.post("/parse-resume/", response_model=ProfileData)
-async def parse_resume_endpoint(file: UploadFile = File(...)):
-    """Parse resume file (PDF or DOCX) and extract structured information"""
-    try:
-        contents = await file.read()
-        
-        # Extract text based on file type
-        if file.filename.endswith('.pdf'):
-            text = extract_text_from_pdf(contents)
-        elif file.filename.endswith('.docx'):
-            text = extract_text_from_docx(contents)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PDF or DOCX file.")
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop responds"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: fails until warm-up completes when WARMUP_ON_STARTUP is set"""
+    ready = not WARMUP_ON_STARTUP or startup_report["warmup_state"] == "done"
+    body = {"status": "ready" if ready else "starting", "modelLoaded": model.loaded,
+            "embeddingBackend": EMBEDDING_BACKEND, **startup_report}
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+@app.post("/warmup")
+async def warmup_endpoint():
+    """Load the embedding model now instead of on the first embedding request"""
+    if startup_report["warmup_state"] != "running":
+        await run_warm_up()
+    return {"modelLoaded": model.loaded, **startup_report}
+
+async def parse_spooled_upload(upload):
+    """Extract and parse a spooled upload; its temporary file is removed either way"""
+    parse_started = False
+    
+    async def parse():
+        nonlocal parse_started
+        parse_started = True
+        try:
+            # Workers open the spooled file by path instead of receiving a copy of its bytes
+            text = await extract_text(upload.kind, upload.path)
+        finally:
+            upload.cleanup()
         
         # Parse resume text with LLM
-        parsed_data = parse_resume_with_llm(text)
+        parsed_data = await parse_resume_with_llm(text)
         parsed_data["resumeText"] = text  # Include the full text for reference
-        
         return parsed_data
+    
+    try:
+        # Double-clicked uploads of the same file share one extraction and LLM call
+        return await single_flight.do("parse_resume", content_hash(upload.kind, upload.sha256), parse)
+    finally:
+        # A request coalesced into another one's work still owns its spooled file
+        if not parse_started:
+            upload.cleanup()
+
+async def run_parse_job(payload):
+    """Parse-queue handler: payload is the spooled upload of a submitted job"""
+    return ParsedResume(**await parse_spooled_upload(SpooledUpload(**payload))).model_dump()
+
+def discard_parse_job(payload):
+    """Remove the spooled upload of a job that will never be parsed"""
+    SpooledUpload(**payload).cleanup()
+
+def parse_job_error(error):
+    if isinstance(error, HTTPException):
+        return {"statusCode": error.status_code, "detail": error.detail}
+    return {"statusCode": 500, "detail": str(error)}
+
+# Job mode for /parse-resume/: PARSE_QUEUE_BACKEND (memory or redis), PARSE_QUEUE_WORKERS,
+# PARSE_QUEUE_MAX_DEPTH and PARSE_JOB_TTL
+parse_queue = ParseJobQueue.from_env(run_parse_job, on_error=parse_job_error, discard=discard_parse_job)
+PARSE_JOB_TTL = float(os.getenv("PARSE_JOB_TTL", "3600"))
+PARSE_QUEUE_RETRY_AFTER = os.getenv("PARSE_QUEUE_RETRY_AFTER", "5")
+
+def parse_job_view(job):
+    """A job record as returned to clients, without the internal payload"""
+    return {key: value for key, value in job.items() if key != "payload"}
+
+@app.post("/parse-resume/", response_model=ParsedResume)
+async def parse_resume_endpoint(file: UploadFile = File(...)):
+    """Parse resume file (PDF or DOCX) and extract structured information"""
+    try:
+        # Stream to a temporary file; the type comes from the magic bytes, not the filename
+        with metrics.stage("upload_read"):
+            upload = await spool_upload(file, MAX_UPLOAD_BYTES, UPLOAD_TMP_DIR)
+        return await parse_spooled_upload(upload)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/parse-resume/jobs", status_code=202)
+async def submit_parse_job_endpoint(file: UploadFile = File(...)):
+    """Queue a resume for parsing and return its job id without waiting for the result"""
+    with metrics.stage("upload_read"):
+        upload = await spool_upload(file, MAX_UPLOAD_BYTES, UPLOAD_TMP_DIR)
+    try:
+        job = await parse_queue.submit(vars(upload))
+    except QueueFullError as e:
+        upload.cleanup()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": PARSE_QUEUE_RETRY_AFTER})
+    except QueueUnavailableError as e:
+        upload.cleanup()
+        raise HTTPException(status_code=503, detail=f"Parse queue unavailable: {str(e)}",
+                            headers={"Retry-After": PARSE_QUEUE_RETRY_AFTER})
+    status_url = f"/parse-resume/jobs/{job['jobId']}"
+    return JSONResponse(status_code=202, content={**parse_job_view(job), "statusUrl": status_url},
+                        headers={"Location": status_url})
+
+@app.get("/parse-resume/jobs/{job_id}")
+async def get_parse_job_endpoint(job_id: str, wait: float = 0):
+    """Status and, once done, result of a parse job; wait up to ``wait`` seconds (max 30) for it to finish"""
+    try:
+        job = await parse_queue.get(job_id, wait=min(max(wait, 0), 30))
+    except QueueUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Parse queue unavailable: {str(e)}")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Parse job not found or expired")
+    return parse_job_view(job)
+
+@app.get("/parse-resume/jobs/{job_id}/events")
+async def stream_parse_job_endpoint(job_id: str):
+    """Server-sent events with the job record on every status change until it finishes"""
+    if await parse_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Parse job not found or expired")
+    
+    async def events():
+        async for job in parse_queue.watch(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(parse_job_view(job))}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/suggest-skills/", response_model=SkillSuggestion)
 async def suggest_skills_endpoint(profile_data: ProfileData):
     """Suggest additional skills based on resume text and current skills"""
@@ -170,60 +588,324 @@ async def suggest_skills_endpoint(profile_data: ProfileData):
         raise HTTPException(status_code=400, detail="Resume text is required")
     
     current_skills = profile_data.skills or []
-    suggestions = suggest_skills_with_llm(profile_data.resumeText, current_skills)
+    key = content_hash(profile_data.resumeText, "\n".join(current_skills))
+    suggestions = await single_flight.do(
+        "suggest_skills", key, lambda: suggest_skills_with_llm(profile_data.resumeText, current_skills)
+    )
     
     return suggestions
 
 @app.post("/generate-quiz/")
-async def generate_quiz_endpoint(skills: List[str]):
+async def generate_quiz_endpoint(skills: List[str], difficulty: str = "intermediate", questionsPerSkill: int = 3):
     """Generate quiz questions based on user skills"""
+    validate_quiz_request(skills, difficulty, questionsPerSkill)
     try:
-        if not skills or len(skills) == 0:
-            raise HTTPException(status_code=400, detail="At least one skill is required")
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": """You are a technical assessment creator. 
-                Generate 3 multiple-choice questions for each skill provided.
-                Each question should have 4 options with one correct answer.
-                Format your response as a JSON array of objects, where each object has:
-                - skill: the skill being tested
-                - question: the question text
-                - options: array of 4 possible answers
-                - correctAnswer: the index (0-3) of the correct answer
-                - explanation: brief explanation of why the answer is correct"""},
-                {"role": "user", "content": f"Skills: {', '.join(skills)}"}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        quiz_data = json.loads(response.choices[0].message.content)
-        return {"quiz": quiz_data}
+        return await quiz_service.quiz(skills, difficulty, questionsPerSkill)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quiz: {str(e)}")
 
+@app.post("/generate-quiz/stream")
+async def stream_quiz_endpoint(skills: List[str], difficulty: str = "intermediate", questionsPerSkill: int = 3):
+    """Server-sent events with each skill's questions as soon as they are ready"""
+    validate_quiz_request(skills, difficulty, questionsPerSkill)
+    
+    async def events():
+        async for item in quiz_service.stream(skills, difficulty, questionsPerSkill):
+            yield f"event: {'error' if 'error' in item else 'question'}\ndata: {json.dumps(item)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/quiz-bank/warmup", status_code=202)
+async def quiz_bank_warmup_endpoint(skills: Optional[List[str]] = None):
+    """Fill the question bank for the given skills, or the most requested ones, in the background"""
+    if quiz_warmup_report["state"] != "running":
+        asyncio.create_task(run_quiz_warm_up(skills))
+    return {"state": "running"}
+
 @app.post("/job-match-score/")
 async def job_match_score_endpoint(profile_data: ProfileData, job_description: str):
     """Calculate match score between profile and job description"""
     try:
-        # Create profile embedding
-        profile_text = f"{profile_data.fullName} {' '.join(profile_data.skills or [])} {profile_data.experience} {profile_data.resumeText or ''}"
-        profile_embedding = model.encode(profile_text)
-        
-        # Create job embedding
-        job_embedding = model.encode(job_description)
+        async def score():
+            # Embed profile sections and the job in one batch while skills are matched alongside
+            (profile_embedding, (job_embedding,)), overlap = await asyncio.gather(
+                encode_in_pool(embed_profile, profile_data, [job_description]),
+                asyncio.to_thread(profile_skill_overlap, profile_data, job_description),
+            )
+            
+            # Both vectors are normalized, so the dot product is the cosine similarity
+            with metrics.stage("similarity"):
+                similarity = np.dot(profile_embedding, job_embedding)
+            
+            # Convert to percentage
+            return {"matchScore": float(similarity * 100), **overlap}
         
-        # Calculate cosine similarity
-        similarity = np.dot(profile_embedding, job_embedding) / (np.linalg.norm(profile_embedding) * np.linalg.norm(job_embedding))
-        
-        # Convert to percentage
-        match_score = float(similarity * 100)
-        
-        return {"matchScore": match_score}
+        section_texts, _ = profile_sections(profile_data)
+        key = content_hash(*section_texts, "\n".join(profile_data.skills or []), job_description)
+        return await single_flight.do("job_match_score", key, score)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating match score: {str(e)}")
 
+@app.post("/job-match-scores/", response_model=BatchJobMatchResponse)
+async def batch_job_match_score_endpoint(request: BatchJobMatchRequest):
+    """Score one profile against many jobs and return the best matches first"""
+    if not request.jobs:
+        raise HTTPException(status_code=400, detail="At least one job is required")
+    if request.topK is not None and request.topK < 1:
+        raise HTTPException(status_code=400, detail="topK must be a positive integer")
+
+    try:
+        profile_embedding, _ = await encode_in_pool(embed_profile, request.profile)
+        # One batched forward pass for all job descriptions not already cached
+        job_embeddings = await encode_in_pool(
+            embedding_cache.encode,
+            [job.description for job in request.jobs],
+            batch_size=64,
+            normalize_embeddings=True,
+        )
+
+        with metrics.stage("similarity"):
+            order, scores = rank_jobs(np.asarray(profile_embedding), np.asarray(job_embeddings), request.topK)
+        matches = [
+            JobMatch(jobId=request.jobs[i].jobId, title=request.jobs[i].title or "", matchScore=float(score * 100))
+            for i, score in zip(order, scores)
+        ]
+        return {"matches": matches}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating match scores: {str(e)}")
+
+async def update_job_index(fn, *args):
+    """Apply an index update off the event loop and persist the result"""
+    def apply():
+        result = fn(*args)
+        # A shared index publishes every update itself
+        if JOB_INDEX_PATH and not JOB_INDEX_DIR:
+            job_index.save(JOB_INDEX_PATH)
+        return result
+
+    return await asyncio.get_running_loop().run_in_executor(None, apply)
+
+@app.post("/jobs/index/")
+async def index_jobs_endpoint(update: JobIndexUpdate):
+    """Add or replace jobs in the recommendation index"""
+    if not update.jobs:
+        raise HTTPException(status_code=400, detail="At least one job is required")
+
+    try:
+        vectors = await encode_in_pool(embedding_cache.encode, [job.description for job in update.jobs], batch_size=64)
+        await update_job_index(job_index.add, [job.jobId for job in update.jobs], vectors,
+                               [job.title or "" for job in update.jobs])
+        return {"indexed": len(update.jobs), "total": len(job_index)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error indexing jobs: {str(e)}")
+
+@app.delete("/jobs/index/{job_id}")
+async def remove_job_endpoint(job_id: str):
+    """Remove a job from the recommendation index"""
+    if not await update_job_index(job_index.remove, [job_id]):
+        raise HTTPException(status_code=404, detail="Job not found in index")
+    return {"removed": job_id, "total": len(job_index)}
+
+@app.post("/jobs/index/rebuild-ivf")
+async def rebuild_job_index_endpoint():
+    """Recluster the index so approximate recommendation search stays accurate"""
+    await update_job_index(job_index.build_ivf)
+    return {"total": len(job_index)}
+
+@app.get("/jobs/index/stats")
+async def job_index_stats_endpoint():
+    """Size of the recommendation index and, when shared, the generation this worker serves"""
+    return job_index.stats()
+
+@app.post("/recommend-jobs/", response_model=BatchJobMatchResponse)
+async def recommend_jobs_endpoint(request: JobRecommendationRequest):
+    """Recommend the indexed jobs that best fit a candidate profile"""
+    if request.topK < 1:
+        raise HTTPException(status_code=400, detail="topK must be a positive integer")
+
+    try:
+        profile_embedding, _ = await encode_in_pool(embed_profile, request.profile)
+        with metrics.stage("similarity"):
+            if len(job_index) >= JOB_INDEX_OFFLOAD_ROWS:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: job_index.search(profile_embedding, k=request.topK, approximate=request.approximate))
+            else:
+                results = job_index.search(profile_embedding, k=request.topK, approximate=request.approximate)
+        matches = [JobMatch(jobId=job_id, title=title, matchScore=score * 100) for job_id, title, score in results]
+        return {"matches": matches}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recommending jobs: {str(e)}")
+
+def local_ingest_status(job_id):
+    job = ingest_jobs[job_id]
+    return {"jobId": job_id, "source": job["source"], "status": job["status"],
+            "error": job["error"], **job["stats"].summary()}
+
+def ingest_job_status(job_id):
+    job = ingest_jobs.get(job_id)
+    if job is not None and job["status"] == "running":
+        return local_ingest_status(job_id)
+    # Finished here or run by another worker on this host: the shared record is the latest
+    status = ingest_store.read_status(job_id)
+    if status is None:
+        if job is None:
+            raise HTTPException(status_code=404, detail="Ingestion job not found")
+        return local_ingest_status(job_id)
+    return status
+
+async def publish_ingest_status(job_id, interval=1.0):
+    """Share this worker's progress on a job and act on cancellations requested through other workers"""
+    job = ingest_jobs[job_id]
+    while True:
+        ingest_store.write_status(job_id, local_ingest_status(job_id))
+        if job["status"] != "running":
+            return
+        if ingest_store.pop_cancel(job_id):
+            job["task"].cancel()
+        await asyncio.sleep(interval)
+
+async def run_ingest_job(job_id, source_path, output_path, retry_errors):
+    job = ingest_jobs[job_id]
+    try:
+        await ingest(
+            source_path, output_path, parse_resume_with_llm,
+            # Shares the extraction pool with uploads, capped so interactive requests are not starved
+            lambda fn, *args: executors.run("extract", fn, *args),
+            extract_concurrency=INGEST_EXTRACT_CONCURRENCY, llm_concurrency=INGEST_LLM_CONCURRENCY,
+            max_pages=EXTRACT_MAX_PAGES, max_chars=EXTRACT_MAX_CHARS,
+            retry_errors=retry_errors, stats=job["stats"],
+        )
+        job["status"] = "completed"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        ingest_store.write_status(job_id, local_ingest_status(job_id))
+        ingest_store.release(job_id)
+
+@app.post("/ingest/jobs", status_code=202)
+async def create_ingest_job_endpoint(request: IngestJobRequest):
+    """Start parsing a directory or ZIP archive of resumes into JSONL in the background"""
+    source_path = os.path.realpath(os.path.join(INGEST_ROOT, request.source))
+    if os.path.commonpath([source_path, INGEST_ROOT]) != INGEST_ROOT:
+        raise HTTPException(status_code=400, detail="Source must be inside the ingestion root")
+    if not os.path.exists(source_path):
+        raise HTTPException(status_code=404, detail="Source not found")
+    
+    # The same source always maps to the same job and output file, so resubmitting
+    # an interrupted import resumes from its checkpoint
+    job_id = content_hash(source_path)[:16]
+    job = ingest_jobs.get(job_id)
+    if job is None or job["status"] != "running":
+        if not ingest_store.acquire(job_id):
+            # Already running in another worker, which owns the output file
+            return ingest_job_status(job_id)
+        ingest_store.pop_cancel(job_id)
+        output_path = os.path.join(INGEST_OUTPUT_DIR, f"{job_id}.jsonl")
+        job = ingest_jobs[job_id] = {"source": request.source, "output": output_path, "status": "running",
+                                     "error": None, "stats": IngestStats()}
+        ingest_store.write_status(job_id, local_ingest_status(job_id))
+        job["task"] = asyncio.create_task(run_ingest_job(job_id, source_path, output_path, request.retryErrors))
+        asyncio.create_task(publish_ingest_status(job_id))
+    return ingest_job_status(job_id)
+
+@app.get("/ingest/jobs/{job_id}")
+async def get_ingest_job_endpoint(job_id: str):
+    """Report progress, throughput and errors of an ingestion job"""
+    return ingest_job_status(job_id)
+
+@app.get("/ingest/jobs/{job_id}/results")
+async def get_ingest_results_endpoint(job_id: str):
+    """Download the JSONL written so far by an ingestion job"""
+    output_path = os.path.join(INGEST_OUTPUT_DIR, f"{job_id}.jsonl")
+    if (job_id not in ingest_jobs and ingest_store.read_status(job_id) is None) or not os.path.exists(output_path):
+        raise HTTPException(status_code=404, detail="Ingestion results not found")
+    return FileResponse(output_path, media_type="application/x-ndjson", filename=f"{job_id}.jsonl")
+
+@app.delete("/ingest/jobs/{job_id}")
+async def cancel_ingest_job_endpoint(job_id: str):
+    """Stop an ingestion job; resubmitting its source continues where it stopped"""
+    job = ingest_jobs.get(job_id)
+    if job is not None and job["status"] == "running":
+        job["task"].cancel()
+        await asyncio.gather(job["task"], return_exceptions=True)
+        return ingest_job_status(job_id)
+
+    status = ingest_job_status(job_id)
+    if status["status"] == "running":
+        # Owned by another worker: ask it to stop and wait for it to report
+        ingest_store.request_cancel(job_id)
+        deadline = time.monotonic() + 10
+        while status["status"] == "running" and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+            status = ingest_job_status(job_id)
+    return status
+
+@app.get("/executors/stats")
+async def executor_stats_endpoint():
+    """Report queue depth and in-flight work per execution pool"""
+    return executors.stats()
+
+@app.get("/single-flight/stats")
+async def single_flight_stats_endpoint():
+    """Report how many requests were served by an identical in-flight computation"""
+    return single_flight.stats()
+
+@app.get("/llm/stats")
+async def llm_stats_endpoint():
+    """Report LLM request, retry and concurrency counters"""
+    return llm.stats()
+
+@app.get("/batching/stats")
+async def batching_stats_endpoint():
+    """Report micro-batching throughput, batch sizes and queue/encode latency"""
+    if not EMBED_BATCHING:
+        return {"enabled": False}
+    return {"enabled": True, **encoder.stats()}
+
+@app.get("/parse-queue/stats")
+async def parse_queue_stats_endpoint():
+    """Report parse job queue depth, workers and outcomes"""
+    return await parse_queue.stats()
+
+@app.get("/prompt-compaction/stats")
+async def prompt_compaction_stats_endpoint():
+    """Report prompt tokens before and after compaction for each LLM path"""
+    return prompt_compactor.stats()
+
+@app.get("/quiz-bank/stats")
+async def quiz_bank_stats_endpoint():
+    """Report question bank size, bank hits, generations and the last warm-up"""
+    return {**quiz_service.stats(), "warmup": quiz_warmup_report}
+
+@app.get("/embedding-cache/stats")
+async def embedding_cache_stats_endpoint():
+    """Report embedding cache hit/miss counters and tier sizes"""
+    return embedding_cache.stats()
+
+# Subsystem counters are exported as gauges, read only when /metrics is scraped
+metrics.register_stats("llm", llm.stats)
+metrics.register_stats("embedding_cache", embedding_cache.stats)
+metrics.register_stats("single_flight", single_flight.stats)
+metrics.register_stats("executors", executors.stats)
+metrics.register_stats("parse_queue", parse_queue.stats)
+metrics.register_stats("prompt_compaction", prompt_compactor.stats)
+metrics.register_stats("quiz_bank", quiz_service.stats)
+metrics.register_stats("job_index", job_index.stats)
+if EMBED_BATCHING:
+    metrics.register_stats("batching", encoder.stats)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics: stage and request latency histograms, in-flight gauges and subsystem counters"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=await metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+startup_report["import_seconds"] = time.perf_counter() - _IMPORT_STARTED
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,104 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers ``/v1/chat/completions`` with canned content shaped like what each of
+the service's prompts expects, after a configurable delay, so benchmarks and
+load tests exercise the full request path without network access, API costs
+or rate limits. Point the service at it with
+``OPENAI_BASE_URL=http://127.0.0.1:8099/v1``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PARSED_RESUME = {
+    "fullName": "Jane Doe", "email": "jane.doe@example.com", "skills": ["Python", "FastAPI", "Docker", "AWS"],
+    "experience": "6", "country": "Germany", "city": "Berlin", "germanLevel": "B2", "availability": "Immediately",
+    "linkedinUrl": "https://linkedin.com/in/janedoe", "githubUrl": "https://github.com/janedoe",
+}
+QUIZ_QUESTION = {
+    "question": "Which statement is correct?", "options": ["First", "Second", "Third", "Fourth"],
+    "correctAnswer": 1, "explanation": "Canned answer from the mock server.",
+}
+
+# (phrase in the system prompt, response content); the first match wins
+CANNED_RESPONSES = [
+    ("resume parsing assistant", PARSED_RESUME),
+    ("career advisor", ["Kubernetes", "Terraform", "GraphQL", "Redis", "PostgreSQL"]),
+    ("assessment creator", {"questions": [{**QUIZ_QUESTION, "question": f"Question {i + 1}?"} for i in range(10)]}),
+    ("resume writer", "Experienced engineer with a track record of shipping reliable services."),
+    ("matchscore", {"matchScore": 78, "recommendations": ["Highlight cloud experience", "Quantify project impact"]}),
+    ("recommendations", {"recommendations": ["Highlight cloud experience", "Quantify project impact"]}),
+]
+
+# Per-field prompts of the hybrid parse mode (local_extractor.fields_prompt) list "- key: description"
+# lines; they also call themselves a resume parsing assistant, so they are matched first
+FIELDS_PROMPT_PHRASE = "extract only these fields"
+_FIELD_LINE_RE = re.compile(r"^- (\w+):", re.MULTILINE)
+
+
+def canned_content(messages) -> str:
+    """Message content for a request, chosen by phrases in its system prompt"""
+    prompt = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    system = prompt.lower()
+    if FIELDS_PROMPT_PHRASE in system:
+        return json.dumps({key: PARSED_RESUME.get(key) for key in _FIELD_LINE_RE.findall(prompt)})
+    for phrase, content in CANNED_RESPONSES:
+        if phrase in system:
+            return content if isinstance(content, str) else json.dumps(content)
+    return json.dumps({})
+
+
+def create_app(latency_ms: float = 500, jitter_ms: float = 0, error_rate: float = 0) -> FastAPI:
+    """
+    Args:
+        latency_ms (float): Delay before each response
+        jitter_ms (float): Uniform random extra delay, 0 to ``jitter_ms``
+        error_rate (float): Share of requests answered with a 429, to exercise retries
+    """
+    app = FastAPI(title="Mock OpenAI API")
+    app.state.counters = {"requests": 0, "errors": 0}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.counters["requests"] += 1
+        await asyncio.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+        if error_rate and random.random() < error_rate:
+            app.state.counters["errors"] += 1
+            return JSONResponse(status_code=429, content={"error": {"message": "Rate limited by mock"}},
+                                headers={"Retry-After": "0.1"})
+        content = canned_content(body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/stats", lambda: app.state.counters, methods=["GET"])
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate), host=args.host, port=args.port,
+                log_level="warning")
@@ -0,0 +1,278 @@
+import argparse
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def load_sentence_transformer(model_name: str):
+    """Import sentence-transformers and load a model; both are deferred until first use"""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def load_torch_int8(model_name: str):
+    """Load a SentenceTransformer with its Linear layers dynamically quantized to int8"""
+    import torch
+
+    model = load_sentence_transformer(model_name)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def default_onnx_dir(model_name: str) -> str:
+    root = os.getenv("EMBEDDING_ONNX_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "zirak-hr", "onnx")
+    return os.path.join(root, model_name.replace("/", "__"))
+
+
+def export_onnx(model_name: str, directory: str, quantize: bool = True):
+    """
+    Export the transformer of a SentenceTransformer to ONNX, optionally with a
+    dynamically int8-quantized copy.
+
+    Args:
+        model_name (str): SentenceTransformer model name
+        directory (str): Output directory for the model, tokenizer and pooling config
+        quantize (bool): Also write ``model-int8.onnx``
+    """
+    import torch
+
+    os.makedirs(directory, exist_ok=True)
+    st_model = load_sentence_transformer(model_name)
+    transformer = st_model._first_module()
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(directory)
+
+    dummy = tokenizer(["Python developer with FastAPI experience"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = auto_model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)), return_dict=False)[0]
+
+    fp32_path = os.path.join(directory, "model.onnx")
+    export_options = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter, which does not take dynamic_axes
+        export_options["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(),
+            tuple(dummy[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names},
+                          "token_embeddings": {0: "batch", 1: "sequence"}},
+            opset_version=14,
+            **export_options,
+        )
+
+    pooling = st_model[1].get_config_dict() if len(st_model) > 1 else {}
+    with open(os.path.join(directory, "pooling.json"), "w") as f:
+        json.dump({
+            "dimension": st_model.get_sentence_embedding_dimension(),
+            "max_seq_length": st_model.get_max_seq_length(),
+            "cls_pooling": bool(pooling.get("pooling_mode_cls_token")),
+            "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+        }, f)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, os.path.join(directory, "model-int8.onnx"), weight_type=QuantType.QInt8)
+
+
+class OnnxEncoder:
+    """ONNX Runtime implementation of the SentenceTransformer ``encode`` interface"""
+
+    def __init__(self, directory: str, quantized: bool = True, threads: Optional[int] = None):
+        """
+        Args:
+            directory (str): Directory written by ``export_onnx``
+            quantized (bool): Use the int8 model instead of the float32 one
+            threads (int, optional): Intra-op threads for ONNX Runtime
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, "pooling.json")) as f:
+            self.config = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        path = os.path.join(directory, "model-int8.onnx" if quantized else "model.onnx")
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.config["max_seq_length"], return_tensors="np")
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+        if self.config["cls_pooling"]:
+            embeddings = token_embeddings[:, 0]
+        else:
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        result = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Length-sorted batches keep padding, and therefore wasted compute, small
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            indices = order[start:start + batch_size]
+            result[indices] = self._encode_batch([texts[i] for i in indices])
+        if normalize_embeddings:
+            result = result / np.maximum(np.linalg.norm(result, axis=1, keepdims=True), 1e-12)
+        return result[0] if single else result
+
+
+def load_onnx(model_name: str, quantized: bool = True):
+    """Load the ONNX export of a model, exporting it first if it is not on disk yet"""
+    directory = default_onnx_dir(model_name)
+    filename = "model-int8.onnx" if quantized else "model.onnx"
+    if not os.path.exists(os.path.join(directory, filename)):
+        export_onnx(model_name, directory, quantize=quantized)
+    threads = os.getenv("EMBEDDING_ONNX_THREADS")
+    return OnnxEncoder(directory, quantized=quantized, threads=int(threads) if threads else None)
+
+
+def backend_loader(backend: str) -> Callable[[str], object]:
+    """Return the model loader for an EMBEDDING_BACKEND value"""
+    if backend == "torch":
+        return load_sentence_transformer
+    if backend == "torch-int8":
+        return load_torch_int8
+    if backend == "onnx":
+        return lambda name: load_onnx(name, quantized=False)
+    if backend == "onnx-int8":
+        return lambda name: load_onnx(name, quantized=True)
+    raise ValueError(f"Unknown embedding backend '{backend}'; expected one of {', '.join(BACKENDS)}")
+
+
+class LazyEncoder:
+    """
+    Stand-in for a SentenceTransformer that loads the real model on first use.
+
+    Importing the service stays cheap, and workers that never serve an
+    embedding route never pay for torch or the model weights.
+    """
+
+    def __init__(self, model_name: str, loader: Optional[Callable[[str], object]] = None,
+                 backend: str = "torch"):
+        """
+        Args:
+            model_name (str): Model to load
+            loader (Callable, optional): Function that loads a model by name; overrides ``backend``
+            backend (str): One of ``BACKENDS``
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.loader = loader or backend_loader(backend)
+        self.load_seconds: Optional[float] = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Load the model if needed and return it"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    self._model = self.loader(self.model_name)
+                    self.load_seconds = time.perf_counter() - started
+        return self._model
+
+    def encode(self, *args, **kwargs):
+        return self.load().encode(*args, **kwargs)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.load().get_sentence_embedding_dimension()
+
+
+def _time_encode(encoder, texts: List[str], repeats: int) -> float:
+    encoder.encode(texts[:8])
+    started = time.perf_counter()
+    for _ in range(repeats):
+        encoder.encode(texts, batch_size=32)
+    return (time.perf_counter() - started) / (repeats * len(texts)) * 1000
+
+
+def check_backend(model_name: str, backend: str, dataset: str, repeats: int = 3) -> dict:
+    """
+    Compare a backend's match scores and speed against the float32 PyTorch model.
+
+    Every resume in the Apizhai dataset is scored against every job title, the
+    way ``/job-match-score/`` scores a profile against a job.
+    """
+    from job_index import load_job_dataset
+
+    records = load_job_dataset(dataset)
+    resumes = [r["resume"] for r in records]
+    jobs = sorted({r["job"] for r in records})
+
+    reference = load_sentence_transformer(model_name)
+    candidate = backend_loader(backend)(model_name)
+
+    def scores(encoder):
+        profiles = encoder.encode(resumes, batch_size=32, normalize_embeddings=True)
+        postings = encoder.encode(jobs, batch_size=32, normalize_embeddings=True)
+        return np.asarray(profiles) @ np.asarray(postings).T * 100
+
+    reference_scores, candidate_scores = scores(reference), scores(candidate)
+    difference = np.abs(reference_scores - candidate_scores)
+    reference_ms = _time_encode(reference, resumes, repeats)
+    candidate_ms = _time_encode(candidate, resumes, repeats)
+    return {
+        "backend": backend,
+        "pairs": int(difference.size),
+        "max_abs_score_diff": round(float(difference.max()), 3),
+        "mean_abs_score_diff": round(float(difference.mean()), 3),
+        "top1_agreement": float(np.mean(reference_scores.argmax(axis=1) == candidate_scores.argmax(axis=1))),
+        "reference_ms_per_text": round(reference_ms, 3),
+        "backend_ms_per_text": round(candidate_ms, 3),
+        "speedup": round(reference_ms / candidate_ms, 2),
+    }
+
+
+if __name__ == "__main__":
+    default_dataset = os.path.join(os.path.dirname(__file__), "..", "AI Models", "Apizhai Model",
+                                   "job_recommendation_dataset.jsonl")
+    parser = argparse.ArgumentParser(description="Export or check alternative embedding backends")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--backend", default="onnx-int8", choices=BACKENDS)
+    parser.add_argument("--dataset", default=default_dataset)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, default_onnx_dir(args.model), quantize=True)
+        print(f"Exported {args.model} to {default_onnx_dir(args.model)}")
+    else:
+        print(json.dumps(check_backend(args.model, args.backend, args.dataset), indent=2))
@@ -0,0 +1,371 @@
+"""
+Asynchronous job queue for resume parsing.
+
+Submitting returns a job id at once; a bounded pool of worker tasks processes
+the queue and records each job's status and result in the backend, where
+clients poll or stream it. The in-process backend is the default. The Redis
+backend (any Redis-compatible server, e.g. a local redis-server or KeyDB)
+lets several service processes on one host share a queue; spooled uploads
+are passed by path, so they must share the upload directory.
+
+Each queue entry carries its job's payload as well as its id, so a payload
+whose record expired before a worker reached it can still be released.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+TERMINAL_STATES = ("done", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised by ``submit`` when the queue is at its maximum depth"""
+
+
+class QueueUnavailableError(Exception):
+    """Raised when the queue backend cannot be reached"""
+
+
+class InMemoryJobBackend:
+    """Queue and job records in this process; jobs are lost on restart"""
+
+    def __init__(self, job_ttl: float = 3600):
+        self.job_ttl = job_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+        self._changed: Optional[asyncio.Condition] = None
+
+    def _ensure(self):
+        # Created lazily so they bind to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._changed = asyncio.Condition()
+
+    def _expire(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expires in self._expires.items() if expires <= now]:
+            self._jobs.pop(job_id, None)
+            self._expires.pop(job_id, None)
+
+    async def enqueue(self, job: Dict[str, Any], max_depth: int) -> bool:
+        self._ensure()
+        self._expire()
+        if self._queue.qsize() >= max_depth:
+            return False
+        await self.save(job)
+        self._queue.put_nowait({"jobId": job["jobId"], "payload": job["payload"]})
+        return True
+
+    async def dequeue(self, timeout: float) -> Optional[Dict[str, Any]]:
+        self._ensure()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def drain(self) -> List[Dict[str, Any]]:
+        """Remove and return every queued entry; they die with this process otherwise"""
+        self._ensure()
+        entries = []
+        while not self._queue.empty():
+            entries.append(self._queue.get_nowait())
+        return entries
+
+    async def save(self, job: Dict[str, Any]):
+        self._ensure()
+        self._expire()
+        self._jobs[job["jobId"]] = job
+        if job["status"] in TERMINAL_STATES:
+            self._expires[job["jobId"]] = time.monotonic() + self.job_ttl
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._expire()
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def wait_for_change(self, job_id: str, timeout: float):
+        self._ensure()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def depth(self) -> int:
+        self._ensure()
+        return self._queue.qsize()
+
+    async def close(self):
+        pass
+
+
+class RedisJobBackend:
+    """
+    Queue in a Redis list and job records in expiring keys.
+
+    The depth check and push are two commands, so the maximum depth may be
+    overshot by the number of processes submitting at the same instant.
+    """
+
+    def __init__(self, url: str, namespace: str = "parse-jobs", job_ttl: float = 3600, poll_interval: float = 0.25):
+        import redis.asyncio as redis
+        from redis.exceptions import RedisError
+
+        self.redis = redis.from_url(url, decode_responses=True)
+        self._errors = (RedisError, OSError)
+        self.queue_key = f"{namespace}:queue"
+        self.job_prefix = f"{namespace}:job:"
+        self.job_ttl = int(job_ttl)
+        self.poll_interval = poll_interval
+
+    async def _call(self, fn, *args, **kwargs):
+        try:
+            return await fn(*args, **kwargs)
+        except self._errors as e:
+            raise QueueUnavailableError(str(e))
+
+    async def enqueue(self, job: Dict[str, Any], max_depth: int) -> bool:
+        if await self._call(self.redis.llen, self.queue_key) >= max_depth:
+            return False
+        await self.save(job)
+        entry = {"jobId": job["jobId"], "payload": job["payload"]}
+        await self._call(self.redis.rpush, self.queue_key, json.dumps(entry))
+        return True
+
+    async def dequeue(self, timeout: float) -> Optional[Dict[str, Any]]:
+        item = await self._call(self.redis.blpop, [self.queue_key], timeout=max(int(timeout), 1))
+        if not item:
+            return None
+        try:
+            return json.loads(item[1])
+        except ValueError:
+            # Pushed as a bare job id by an older version
+            return {"jobId": item[1], "payload": None}
+
+    async def drain(self) -> List[Dict[str, Any]]:
+        # The queue outlives this process and other processes keep serving it
+        return []
+
+    async def save(self, job: Dict[str, Any]):
+        await self._call(self.redis.set, self.job_prefix + job["jobId"], json.dumps(job), ex=self.job_ttl)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        value = await self._call(self.redis.get, self.job_prefix + job_id)
+        return json.loads(value) if value else None
+
+    async def wait_for_change(self, job_id: str, timeout: float):
+        # Job records change at most a few times, so polling is cheap enough here
+        await asyncio.sleep(min(self.poll_interval, timeout))
+
+    async def depth(self) -> int:
+        return await self._call(self.redis.llen, self.queue_key)
+
+    async def close(self):
+        await self.redis.close()
+
+
+class ParseJobQueue:
+    """Bounded worker pool in front of a job backend"""
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]], backend=None,
+                 workers: int = 4, max_depth: int = 100,
+                 on_error: Optional[Callable[[Exception], Dict[str, Any]]] = None,
+                 discard: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            handler (Callable): Coroutine function run with a job's payload; its return
+                value becomes the job result
+            backend: InMemoryJobBackend (default) or RedisJobBackend
+            workers (int): Jobs processed concurrently by this process
+            max_depth (int): Queued jobs accepted before ``submit`` raises QueueFullError
+            on_error (Callable, optional): Turns a handler exception into the job's error record
+            discard (Callable, optional): Releases the payload of a job that never reaches
+                ``handler``: its record expired while queued, it could not be started, or
+                this process stopped while it was queued
+        """
+        self.handler = handler
+        self.backend = backend or InMemoryJobBackend()
+        self.workers = workers
+        self.max_depth = max_depth
+        self.on_error = on_error or (lambda e: {"detail": str(e)})
+        self.discard = discard
+        self._tasks = []
+        # Dequeued entries not loaded yet, and records not saved yet, while the backend is unreachable
+        self._unloaded: List[Dict[str, Any]] = []
+        self._unsaved: Dict[str, Dict[str, Any]] = {}
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "running": 0,
+                          "backend_errors": 0}
+
+    @classmethod
+    def from_env(cls, handler, on_error=None, discard=None) -> "ParseJobQueue":
+        """
+        Build a queue from PARSE_QUEUE_BACKEND (memory or redis), PARSE_QUEUE_REDIS_URL,
+        PARSE_QUEUE_WORKERS, PARSE_QUEUE_MAX_DEPTH and PARSE_JOB_TTL
+        """
+        job_ttl = float(os.getenv("PARSE_JOB_TTL", "3600"))
+        if os.getenv("PARSE_QUEUE_BACKEND", "memory") == "redis":
+            backend = RedisJobBackend(os.getenv("PARSE_QUEUE_REDIS_URL", "redis://localhost:6379/0"), job_ttl=job_ttl)
+        else:
+            backend = InMemoryJobBackend(job_ttl=job_ttl)
+        return cls(
+            handler,
+            backend=backend,
+            workers=int(os.getenv("PARSE_QUEUE_WORKERS", "4")),
+            max_depth=int(os.getenv("PARSE_QUEUE_MAX_DEPTH", "100")),
+            on_error=on_error,
+            discard=discard,
+        )
+
+    def start(self):
+        """Start the worker tasks; call from the running event loop"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            for entry in self._unloaded + await self.backend.drain():
+                job = await self.backend.load(entry["jobId"])
+                if job is not None:
+                    job.update(status="failed", error={"detail": "Service shutting down"}, finishedAt=time.time())
+                    await self.backend.save(job)
+                self._discard(entry["payload"])
+        except QueueUnavailableError as e:
+            logger.warning("Could not fail queued parse jobs on shutdown: %s", e)
+        self._unloaded = []
+        await self.backend.close()
+
+    def _discard(self, payload: Optional[Dict[str, Any]]):
+        if self.discard is not None and payload is not None:
+            try:
+                self.discard(payload)
+            except Exception:
+                logger.exception("Could not discard a parse job payload")
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job and return its record; raises QueueFullError when the queue is full"""
+        self.start()
+        job = {"jobId": uuid.uuid4().hex, "status": "queued", "payload": payload, "createdAt": time.time(),
+               "startedAt": None, "finishedAt": None, "result": None, "error": None}
+        if not await self.backend.enqueue(job, self.max_depth):
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Parse queue is full ({self.max_depth} jobs waiting)")
+        self._counters["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """A job's record, waiting up to ``wait`` seconds for it to finish"""
+        deadline = time.monotonic() + wait
+        job = await self.backend.load(job_id)
+        while job is not None and job["status"] not in TERMINAL_STATES and time.monotonic() < deadline:
+            await self.backend.wait_for_change(job_id, deadline - time.monotonic())
+            job = await self.backend.load(job_id)
+        return job
+
+    async def watch(self, job_id: str, timeout: float = 300):
+        """Yield a job's record each time its status changes, until it finishes"""
+        deadline = time.monotonic() + timeout
+        last_status = None
+        while time.monotonic() < deadline:
+            job = await self.backend.load(job_id)
+            if job is None:
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield job
+            if job["status"] in TERMINAL_STATES:
+                return
+            await self.backend.wait_for_change(job_id, deadline - time.monotonic())
+
+    async def _worker(self):
+        # A backend outage must not end the task: nothing would restart it
+        while True:
+            try:
+                await self._process_next()
+            except QueueUnavailableError as e:
+                self._counters["backend_errors"] += 1
+                logger.warning("Parse queue backend unavailable, retrying in 1s: %s", e)
+                await asyncio.sleep(1)
+
+    async def _save(self, job: Dict[str, Any]):
+        """Save a record, keeping it to retry if the backend is unreachable"""
+        try:
+            await self.backend.save(job)
+            self._unsaved.pop(job["jobId"], None)
+        except QueueUnavailableError:
+            self._unsaved[job["jobId"]] = job
+            raise
+
+    async def _process_next(self):
+        for job in list(self._unsaved.values()):
+            await self._save(job)
+        if self._unloaded:
+            entry = self._unloaded.pop(0)
+        else:
+            entry = await self.backend.dequeue(timeout=1)
+            if entry is None:
+                return
+        job_id = entry["jobId"]
+        try:
+            job = await self.backend.load(job_id)
+        except QueueUnavailableError:
+            # Already popped from the queue; load it once the backend is back
+            self._unloaded.append(entry)
+            raise
+        if job is None:
+            # The record expired while queued; nobody can collect the result
+            self._discard(entry["payload"])
+            return
+
+        job.update(status="running", startedAt=time.time())
+        try:
+            await self.backend.save(job)
+        except QueueUnavailableError:
+            # Clients could not follow it; fail it visibly once the backend accepts writes again
+            job.update(status="failed", error={"detail": "Parse queue backend unavailable"}, finishedAt=time.time())
+            self._counters["failed"] += 1
+            self._unsaved[job_id] = job
+            self._discard(job["payload"])
+            raise
+        self._counters["running"] += 1
+        try:
+            job["result"] = await self.handler(job["payload"])
+            job["status"] = "done"
+            self._counters["completed"] += 1
+        except asyncio.CancelledError:
+            job.update(status="failed", error={"detail": "Service shutting down"}, finishedAt=time.time())
+            await asyncio.shield(self.backend.save(job))
+            raise
+        except Exception as e:
+            job.update(status="failed", error=self.on_error(e))
+            self._counters["failed"] += 1
+        finally:
+            self._counters["running"] -= 1
+        job["finishedAt"] = time.time()
+        await self._save(job)
+
+    async def stats(self) -> Dict[str, Any]:
+        try:
+            depth = await self.backend.depth()
+        except QueueUnavailableError:
+            depth = None
+        return {
+            **self._counters,
+            "backend": type(self.backend).__name__,
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "depth": depth,
+            "unsaved": len(self._unsaved),
+        }
@@ -0,0 +1,125 @@
+"""
+Section-level profile embeddings.
+
+A profile is embedded as separate sections (skills, descriptive experience
+and the resume in chunks) instead of one concatenated string. Each section goes through the
+content-addressed embedding cache on its own, so editing one skill re-encodes
+only the skills section, and a long resume is encoded in full, chunk by chunk,
+instead of being cut off at the model's maximum sequence length. The section
+vectors are combined into one profile vector by a weighted mean.
+"""
+import os
+import re
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from prompt_compaction import split_sections
+
+# Relative weight of each section in the profile vector; the resume's weight is
+# shared between its chunks so a long resume does not drown out the other sections.
+# Only descriptive experience text gets its own section; a bare year count is folded
+# into the skills section (see ``experience_phrase``).
+SECTION_WEIGHTS = {"skills": 1.0, "experience": 0.3, "resume": 1.0}
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; 150 words stays clear of that for typical resume text
+DEFAULT_CHUNK_WORDS = int(os.getenv("PROFILE_CHUNK_WORDS", "150"))
+
+_WORD_RE = re.compile(r"\S+")
+_YEARS_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)?\.?$", re.IGNORECASE)
+
+
+def experience_phrase(experience: str) -> str:
+    """
+    "5", "5+" or "5 years" as "5 years of experience"; empty for anything else.
+
+    The parser usually stores experience as a bare year count, and the
+    embedding of a lone number says nothing about the candidate.
+    """
+    match = _YEARS_RE.match(experience.strip())
+    return f"{match.group(1)} years of experience" if match else ""
+
+
+def chunk_text(text: str, max_words: int = DEFAULT_CHUNK_WORDS) -> List[str]:
+    """
+    Split text into chunks of at most ``max_words`` words.
+
+    Chunks never cross a resume section heading and break at line ends where
+    possible, so an edit in one section leaves the other sections' chunks (and
+    their cached embeddings) unchanged.
+    """
+    chunks = []
+    for _, lines in split_sections(text):
+        current: List[str] = []
+        for line in lines:
+            words = _WORD_RE.findall(line)
+            if current and len(current) + len(words) > max_words:
+                chunks.append(" ".join(current))
+                current = []
+            # A single line longer than a chunk is split at word boundaries
+            while len(words) > max_words:
+                chunks.append(" ".join(words[:max_words]))
+                words = words[max_words:]
+            current.extend(words)
+        if current:
+            chunks.append(" ".join(current))
+    return chunks
+
+
+def profile_sections(profile, max_words: int = DEFAULT_CHUNK_WORDS) -> Tuple[List[str], List[float]]:
+    """
+    Texts and weights of a profile's sections.
+
+    Args:
+        profile: Object with ``fullName``, ``skills``, ``experience`` and ``resumeText``
+        max_words (int): Maximum words per resume chunk
+
+    Returns:
+        Tuple[List[str], List[float]]: Section texts and their weights
+    """
+    texts, weights = [], []
+    experience = (profile.experience or "").strip()
+    years = experience_phrase(experience)
+    skills = ", ".join(skill.strip() for skill in profile.skills or [] if skill and skill.strip())
+    if skills:
+        # The year count only means something next to the skills it qualifies
+        texts.append(f"Skills: {skills}" + (f". {years}" if years else ""))
+        weights.append(SECTION_WEIGHTS["skills"])
+    if experience and not years:
+        texts.append(experience)
+        weights.append(SECTION_WEIGHTS["experience"])
+    chunks = chunk_text(profile.resumeText or "", max_words)
+    for chunk in chunks:
+        texts.append(chunk)
+        weights.append(SECTION_WEIGHTS["resume"] / len(chunks))
+    if not texts:
+        # Nothing but a name: still return a vector so callers need no special case
+        texts.append((profile.fullName or "").strip())
+        weights.append(1.0)
+    return texts, weights
+
+
+def combine_sections(vectors: np.ndarray, weights: List[float]) -> np.ndarray:
+    """L2-normalized weighted mean of L2-normalized section vectors"""
+    weights = np.asarray(weights, dtype=np.float32)
+    combined = weights @ np.asarray(vectors, dtype=np.float32) / weights.sum()
+    return combined / max(float(np.linalg.norm(combined)), 1e-12)
+
+
+def encode_profile(encode: Callable[..., np.ndarray], profile, extra_texts: List[str] = (),
+                   max_words: int = DEFAULT_CHUNK_WORDS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Embed a profile's sections, plus any other texts, in one batched encode call.
+
+    Args:
+        encode (Callable): ``EmbeddingCache.encode`` or a compatible function
+        profile: Profile to embed
+        extra_texts (List[str]): Texts encoded in the same batch, e.g. a job description
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The normalized profile vector and the
+            normalized vectors of ``extra_texts``
+    """
+    texts, weights = profile_sections(profile, max_words)
+    vectors = encode(texts + list(extra_texts), normalize_embeddings=True)
+    return combine_sections(vectors[:len(texts)], weights), vectors[len(texts):]
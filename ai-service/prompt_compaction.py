@@ -0,0 +1,263 @@
+"""
+Prompt compaction for resume text sent to the LLM.
+
+Extracted PDF/DOCX text carries ligatures, hyphenated line breaks, page
+numbers, the same header or footer on every page and runs of whitespace. All
+of it costs input tokens and latency without helping the model. ``compact``
+cleans the text up and then fits it into a token budget section by section,
+trimming low-value sections such as references before experience and skills.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_CHAR_FIXES = str.maketrans({
+    # Ligatures
+    "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl",
+    # Non-breaking, zero-width and soft-hyphen characters
+    "\u00a0": " ", "\u2009": " ", "\u200b": "", "\u00ad": "", "\ufeff": "",
+    # Bullets (including the Symbol-font bullet Word exports) and dashes
+    "\u2022": "-", "\u25cf": "-", "\u25aa": "-", "\u2023": "-", "\uf0b7": "-", "\u2013": "-", "\u2014": "-",
+})
+_SPACES_RE = re.compile(r"[ \t\f\v]+")
+_HYPHENATED_BREAK_RE = re.compile(r"([a-z])-\n([a-z])")
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s*)?\d{1,3}(?:\s*(?:/|of)\s*\d{1,3})?$|^-\s*\d{1,3}\s*-$", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Lines from the top and bottom of each page checked for running headers and footers
+PAGE_EDGE_LINES = 3
+
+# Section headings, and the order sections are trimmed in when over budget:
+# the lower the priority, the earlier a section is cut
+SECTION_PRIORITIES = {
+    "references": 0, "referees": 0, "hobbies": 1, "interests": 1, "volunteering": 2, "volunteer": 2,
+    "awards": 3, "achievements": 3, "publications": 3, "certifications": 4, "courses": 4, "training": 4,
+    "projects": 5, "summary": 6, "profile": 6, "objective": 6, "about me": 6, "education": 7,
+    "languages": 8, "work experience": 9, "professional experience": 9, "experience": 9,
+    "employment history": 9, "employment": 9, "technical skills": 10, "skills": 10, "core competencies": 10,
+}
+# Text before the first heading: name and contact details
+PREAMBLE_PRIORITY = 11
+_HEADING_RE = re.compile(
+    r"^(?:" + "|".join(re.escape(name) for name in sorted(SECTION_PRIORITIES, key=len, reverse=True)) + r")\s*:?$",
+    re.IGNORECASE,
+)
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Prompt tokens in ``text``: exact with tiktoken installed, otherwise an estimate
+    from word and punctuation counts
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return math.ceil(len(_TOKEN_RE.findall(text)) * 1.3)
+
+
+def normalize_text(text: str) -> Tuple[str, int]:
+    """
+    Clean up extracted text: fix ligatures and bullets, rejoin hyphenated words,
+    collapse whitespace, and drop page numbers, consecutive duplicate lines and
+    running page headers and footers.
+
+    A running header or footer is a line repeated at the same position, within
+    ``PAGE_EDGE_LINES`` of the top or bottom, on more than one page (pages are
+    separated by form feeds); its first occurrence is kept. Lines repeated
+    elsewhere, such as the same job title under two companies, are content and stay.
+
+    Returns:
+        Tuple[str, int]: The cleaned text and the number of lines removed
+    """
+    text = _HYPHENATED_BREAK_RE.sub(r"\1\2", text.translate(_CHAR_FIXES).replace("\r\n", "\n").replace("\r", "\n"))
+    pages = [[_SPACES_RE.sub(" ", raw).strip() for raw in page.split("\n")] for page in text.split("\f")]
+
+    def edge_slots(keys: List[str]) -> List[Tuple[Tuple[str, int, str], ...]]:
+        """(side, offset, line) slots of each line; empty away from the page edges"""
+        return [tuple(slot for slot in (("top", i, key), ("bottom", len(keys) - 1 - i, key))
+                      if slot[1] < PAGE_EDGE_LINES)
+                for i, key in enumerate(keys)]
+
+    slot_counts: Counter = Counter()
+    for page in pages:
+        slot_counts.update({slot for slots in edge_slots([line.lower() for line in page if line]) for slot in slots})
+    # Labels such as "Responsibilities:" can open any page and are kept
+    running = {slot for slot, count in slot_counts.items() if count > 1 and not slot[2].endswith(":")}
+
+    lines: List[str] = []
+    seen_running = set()
+    previous = None
+    removed = 0
+    for page in pages:
+        slots = iter(edge_slots([line.lower() for line in page if line]))
+        for line in page:
+            if not line:
+                if lines and lines[-1]:
+                    lines.append("")
+                continue
+            key = line.lower()
+            repeats = [slot for slot in next(slots) if slot in running]
+            if _PAGE_NUMBER_RE.match(line) or key == previous or any(slot in seen_running for slot in repeats):
+                removed += 1
+                continue
+            seen_running.update(repeats)
+            previous = key
+            lines.append(line)
+    return "\n".join(lines).strip(), removed
+
+
+def split_sections(text: str) -> List[Tuple[int, List[str]]]:
+    """Split resume text at recognised headings into (priority, lines) sections"""
+    sections: List[Tuple[int, List[str]]] = [(PREAMBLE_PRIORITY, [])]
+    for line in text.split("\n"):
+        if _HEADING_RE.match(line):
+            sections.append((SECTION_PRIORITIES[line.rstrip(":").strip().lower()], [line]))
+        else:
+            sections[-1][1].append(line)
+    return [section for section in sections if section[1]]
+
+
+def truncate_sections(text: str, max_tokens: int) -> Tuple[str, List[str]]:
+    """
+    Fit ``text`` into ``max_tokens`` by trimming sections from their end, lowest
+    priority section first; whole sections go before experience or skills are touched.
+
+    Returns:
+        Tuple[str, List[str]]: The truncated text and the headings of trimmed sections
+    """
+    sections = split_sections(text)
+    line_tokens = [[count_tokens(line) + 1 for line in lines] for _, lines in sections]
+    total = sum(sum(tokens) for tokens in line_tokens)
+    trimmed = []
+    for index in sorted(range(len(sections)), key=lambda i: sections[i][0]):
+        if total <= max_tokens:
+            break
+        priority, lines = sections[index]
+        tokens = line_tokens[index]
+        trimmed.append(lines[0] if priority != PREAMBLE_PRIORITY else "(preamble)")
+        while lines and total > max_tokens:
+            lines.pop()
+            total -= tokens.pop()
+    return "\n".join(line for _, lines in sections for line in lines), trimmed
+
+
+class CompactionResult:
+    """Compacted text with the before/after token counts"""
+
+    __slots__ = ("text", "tokens_before", "tokens_after", "removed_lines", "trimmed_sections")
+
+    def __init__(self, text: str, tokens_before: int, tokens_after: int, removed_lines: int,
+                 trimmed_sections: List[str]):
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.removed_lines = removed_lines
+        self.trimmed_sections = trimmed_sections
+
+
+def compact(text: str, max_tokens: Optional[int] = None) -> CompactionResult:
+    """
+    Normalize resume text and, with ``max_tokens``, enforce a token budget.
+
+    Args:
+        text (str): Extracted resume text
+        max_tokens (int, optional): Token budget for the compacted text
+
+    Returns:
+        CompactionResult: Compacted text and token counts before and after
+    """
+    tokens_before = count_tokens(text)
+    compacted, removed = normalize_text(text)
+    trimmed: List[str] = []
+    if max_tokens is not None and count_tokens(compacted) > max_tokens:
+        compacted, trimmed = truncate_sections(compacted, max_tokens)
+    return CompactionResult(compacted, tokens_before, count_tokens(compacted), removed, trimmed)
+
+
+class PromptCompactor:
+    """
+    ``compact`` with a configured budget and per-purpose token statistics, so the
+    savings of each LLM path can be read from the stats endpoint.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = 3000, enabled: bool = True, stats_window: int = 1024):
+        """
+        Args:
+            max_tokens (int, optional): Token budget for resume text in a prompt
+            enabled (bool): When false, text passes through untouched (still counted)
+            stats_window (int): Number of recent calls kept per purpose for percentiles
+        """
+        self.max_tokens = max_tokens
+        self.enabled = enabled
+        self.stats_window = stats_window
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def compact(self, text: str, purpose: str = "default") -> CompactionResult:
+        if self.enabled:
+            result = compact(text, self.max_tokens)
+        else:
+            tokens = count_tokens(text)
+            result = CompactionResult(text, tokens, tokens, 0, [])
+        with self._lock:
+            stats = self._stats.setdefault(purpose, {
+                "calls": 0, "tokens_before": 0, "tokens_after": 0, "truncated": 0,
+                "recent_before": deque(maxlen=self.stats_window), "recent_after": deque(maxlen=self.stats_window),
+            })
+            stats["calls"] += 1
+            stats["tokens_before"] += result.tokens_before
+            stats["tokens_after"] += result.tokens_after
+            stats["truncated"] += bool(result.trimmed_sections)
+            stats["recent_before"].append(result.tokens_before)
+            stats["recent_after"].append(result.tokens_after)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            purposes = {}
+            for purpose, stats in self._stats.items():
+                before, after = list(stats["recent_before"]), list(stats["recent_after"])
+                purposes[purpose] = {
+                    "calls": stats["calls"],
+                    "tokens_before": stats["tokens_before"],
+                    "tokens_after": stats["tokens_after"],
+                    "tokens_saved_ratio": round(1 - stats["tokens_after"] / stats["tokens_before"], 3)
+                    if stats["tokens_before"] else 0.0,
+                    "truncated": stats["truncated"],
+                    "tokens_before_p50": float(np.percentile(before, 50)),
+                    "tokens_after_p50": float(np.percentile(after, 50)),
+                    "tokens_after_p95": float(np.percentile(after, 95)),
+                }
+        return {"enabled": self.enabled, "max_tokens": self.max_tokens, "purposes": purposes}
+
+    @classmethod
+    def from_env(cls) -> "PromptCompactor":
+        """Reads PROMPT_COMPACTION (default true) and PROMPT_MAX_TOKENS (default 3000, 0 for no budget)"""
+        return cls(
+            max_tokens=int(os.getenv("PROMPT_MAX_TOKENS", "3000")) or None,
+            enabled=os.getenv("PROMPT_COMPACTION", "true").lower() == "true",
+        )
+
+
+_shared_compactor: Optional[PromptCompactor] = None
+
+
+def get_prompt_compactor() -> PromptCompactor:
+    """Return the process-wide compactor, configured from the environment on first use"""
+    global _shared_compactor
+    if _shared_compactor is None:
+        _shared_compactor = PromptCompactor.from_env()
+    return _shared_compactor
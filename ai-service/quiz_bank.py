@@ -0,0 +1,425 @@
+"""
+Quiz question bank.
+
+Questions are generated one skill per LLM call, validated and stored per
+(skill, difficulty). Quizzes are served by sampling from the bank; the LLM is
+only called for skills whose bank is missing, too small or stale, and those
+calls run concurrently. A warm-up job keeps the most requested skills filled.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from singleflight import SingleFlight
+from skill_taxonomy import get_skill_taxonomy
+
+QUIZ_BANK_PROMPT_VERSION = "quiz-bank-v1"
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+
+# Seed for warm-up before request counts exist
+DEFAULT_WARMUP_SKILLS = ["Python", "JavaScript", "TypeScript", "React", "Node.js", "Java", "SQL",
+                         "AWS", "Docker", "Machine Learning"]
+
+
+def skill_key(skill: str) -> Tuple[str, str]:
+    """(bank key, display name) for a skill; taxonomy aliases share one bank entry"""
+    canonical = get_skill_taxonomy().canonicalize(skill) or " ".join(skill.split())
+    return canonical.lower(), canonical
+
+
+def validate_question(item: Any, skill: str) -> Optional[Dict[str, Any]]:
+    """
+    Check a generated question and bring it into the served shape, or return None.
+
+    A valid question has text, exactly four distinct non-empty options and a
+    correctAnswer index between 0 and 3.
+    """
+    if not isinstance(item, dict):
+        return None
+    question = item.get("question")
+    options = item.get("options")
+    answer = item.get("correctAnswer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    options = [str(option).strip() for option in options]
+    if not all(options) or len({option.lower() for option in options}) != 4:
+        return None
+    try:
+        answer = int(answer)
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= answer <= 3:
+        return None
+    explanation = item.get("explanation")
+    return {
+        "skill": skill,
+        "question": question.strip(),
+        "options": options,
+        "correctAnswer": answer,
+        "explanation": explanation.strip() if isinstance(explanation, str) else "",
+    }
+
+
+def _question_hash(question: Dict[str, Any]) -> str:
+    return hashlib.sha256(" ".join(question["question"].lower().split()).encode("utf-8")).hexdigest()[:16]
+
+
+class QuizBank:
+    """
+    Validated questions per (skill, difficulty), held in memory and, with a path,
+    persisted to SQLite so every worker and restart shares the bank.
+
+    SQLite is only touched from threads. Other workers' questions are read
+    when a skill runs short here and with the whole bank every
+    ``refresh_interval`` seconds; request counts are written in batches every
+    ``flush_interval`` seconds.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 30 * 24 * 3600,
+                 refresh_interval: float = 60, flush_interval: float = 5):
+        """
+        Args:
+            path (str, optional): SQLite file for the persistent bank
+            max_age (float): Seconds after which a question no longer counts as fresh
+            refresh_interval (float): Seconds between full reads of the persistent bank
+            flush_interval (float): Seconds request counts are batched before being written
+        """
+        self.path = path
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        # Serializes use of the connection by the threads running database calls
+        self._db_lock = threading.Lock()
+        # (skill key, difficulty) -> {question hash: (question, created_at)}
+        self._questions: Dict[Tuple[str, str], Dict[str, Tuple[Dict[str, Any], float]]] = {}
+        self._requests: Dict[str, List[Any]] = {}
+        # Request counts not written yet: skill key -> [display name, count]
+        self._pending_requests: Dict[str, List[Any]] = {}
+        self._reloaded_at = self._flushed_at = time.monotonic()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._inherited: List[sqlite3.Connection] = []
+        if path:
+            self._conn = self._connect()
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_questions (skill_key TEXT NOT NULL, difficulty TEXT NOT NULL, "
+                "question_hash TEXT NOT NULL, question TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (skill_key, difficulty, question_hash))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_requests (skill_key TEXT PRIMARY KEY, skill TEXT NOT NULL, "
+                "count INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+            self.reload()
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _after_fork(self):
+        # SQLite connections must not cross fork(); closing the parent's could checkpoint
+        # its WAL from under it, so keep it referenced and open a fresh one in the child
+        self._inherited.append(self._conn)
+        self._conn = self._connect()
+
+    def _merge(self, rows):
+        with self._lock:
+            for key, difficulty, question_hash, question, created_at in rows:
+                bucket = self._questions.setdefault((key, difficulty), {})
+                if question_hash not in bucket:
+                    bucket[question_hash] = (json.loads(question), created_at)
+
+    def reload(self):
+        """Read the persistent bank, picking up questions and request counts from other workers; blocking"""
+        if self._conn is None:
+            return
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT skill_key, difficulty, question_hash, question, created_at FROM quiz_questions"
+            ).fetchall()
+            requests = self._conn.execute("SELECT skill_key, skill, count FROM quiz_requests").fetchall()
+        self._merge(rows)
+        with self._lock:
+            self._requests = {key: [skill, count] for key, skill, count in requests}
+            # Counts recorded here but not written yet are not in the table
+            for key, (skill, count) in self._pending_requests.items():
+                self._requests.setdefault(key, [skill, 0])[1] += count
+        self._reloaded_at = time.monotonic()
+
+    def _reload_bucket(self, key: str, difficulty: str):
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT skill_key, difficulty, question_hash, question, created_at FROM quiz_questions "
+                "WHERE skill_key = ? AND difficulty = ?",
+                (key, difficulty),
+            ).fetchall()
+        self._merge(rows)
+
+    async def refresh(self, skill: Optional[str] = None, difficulty: Optional[str] = None):
+        """
+        Pick up questions other workers stored: for one skill now, or for the
+        whole bank if ``refresh_interval`` has passed since the last read.
+        """
+        if self._conn is None:
+            return
+        if skill is not None:
+            await asyncio.to_thread(self._reload_bucket, skill_key(skill)[0], difficulty)
+        elif time.monotonic() - self._reloaded_at >= self.refresh_interval:
+            self._reloaded_at = time.monotonic()
+            await asyncio.to_thread(self.reload)
+
+    def _write_questions(self, rows):
+        with self._db_lock:
+            self._conn.executemany("INSERT OR REPLACE INTO quiz_questions VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    async def add(self, skill: str, difficulty: str, questions: Iterable[Dict[str, Any]]) -> int:
+        """Store validated questions, skipping duplicates; returns how many were new"""
+        key, _ = skill_key(skill)
+        now = time.time()
+        added = []
+        with self._lock:
+            bucket = self._questions.setdefault((key, difficulty), {})
+            for question in questions:
+                question_hash = _question_hash(question)
+                if question_hash not in bucket:
+                    bucket[question_hash] = (question, now)
+                    added.append((key, difficulty, question_hash, json.dumps(question, ensure_ascii=False), now))
+        if self._conn is not None and added:
+            await asyncio.to_thread(self._write_questions, added)
+        return len(added)
+
+    def fresh(self, skill: str, difficulty: str) -> List[Dict[str, Any]]:
+        key, _ = skill_key(skill)
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            bucket = self._questions.get((key, difficulty), {})
+            return [question for question, created_at in bucket.values() if created_at >= cutoff]
+
+    def sample(self, skill: str, difficulty: str, count: int, rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+        """Up to ``count`` random fresh questions, labelled with the skill's canonical display name"""
+        questions = self.fresh(skill, difficulty)
+        chosen = (rng or random).sample(questions, min(count, len(questions)))
+        _, display = skill_key(skill)
+        return [{**question, "skill": display} for question in chosen]
+
+    def _write_requests(self, counts: Dict[str, List[Any]]):
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT INTO quiz_requests VALUES (?, ?, ?) "
+                "ON CONFLICT(skill_key) DO UPDATE SET count = count + excluded.count",
+                [(key, skill, count) for key, (skill, count) in counts.items()],
+            )
+            self._conn.commit()
+
+    async def record_request(self, skills: Iterable[str]):
+        """Count skill requests; warm-up fills the most requested skills first"""
+        with self._lock:
+            for skill in skills:
+                key, display = skill_key(skill)
+                self._requests.setdefault(key, [display, 0])[1] += 1
+                if self._conn is not None:
+                    self._pending_requests.setdefault(key, [display, 0])[1] += 1
+        await self.flush_requests()
+
+    async def flush_requests(self, force: bool = False):
+        """Write the batched request counts once ``flush_interval`` has passed, or now with ``force``"""
+        if not self._pending_requests or (not force and time.monotonic() - self._flushed_at < self.flush_interval):
+            return
+        with self._lock:
+            pending, self._pending_requests = self._pending_requests, {}
+            self._flushed_at = time.monotonic()
+        await asyncio.to_thread(self._write_requests, pending)
+
+    def top_skills(self, limit: int) -> List[str]:
+        with self._lock:
+            ranked = sorted(self._requests.values(), key=lambda entry: -entry[1])
+        return [skill for skill, _ in ranked[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            buckets = len(self._questions)
+            total = sum(len(bucket) for bucket in self._questions.values())
+            fresh = sum(1 for bucket in self._questions.values() for _, created in bucket.values() if created >= cutoff)
+        return {"buckets": buckets, "questions": total, "fresh_questions": fresh, "persistent": self._conn is not None}
+
+
+class QuizService:
+    """Serves quizzes from a QuizBank, generating per skill with the LLM on demand"""
+
+    def __init__(self, llm, bank: QuizBank, model: str = "gpt-4", min_bank_size: int = 9,
+                 batch_size: int = 10, warmup_concurrency: int = 2):
+        """
+        Args:
+            llm (LLMClient): Client used for generation
+            bank (QuizBank): Question store
+            model (str): Model name
+            min_bank_size (int): Fresh questions per skill below which the bank is topped up
+            batch_size (int): Questions requested per generation call
+            warmup_concurrency (int): Skills generated at once by ``warm_up``
+        """
+        self.llm = llm
+        self.bank = bank
+        self.model = model
+        self.min_bank_size = min_bank_size
+        self.batch_size = batch_size
+        self.warmup_concurrency = warmup_concurrency
+        self._single_flight = SingleFlight()
+        self._counters = {"served_from_bank": 0, "generated_skills": 0, "generation_failures": 0,
+                          "invalid_questions": 0}
+
+    @classmethod
+    def from_env(cls, llm) -> "QuizService":
+        """Reads QUIZ_BANK_PATH, QUIZ_BANK_MAX_AGE, QUIZ_BANK_REFRESH_INTERVAL, QUIZ_BANK_MIN_SIZE and QUIZ_WARMUP_CONCURRENCY"""
+        bank = QuizBank(
+            path=os.getenv("QUIZ_BANK_PATH") or None,
+            max_age=float(os.getenv("QUIZ_BANK_MAX_AGE", str(30 * 24 * 3600))),
+            refresh_interval=float(os.getenv("QUIZ_BANK_REFRESH_INTERVAL", "60")),
+        )
+        return cls(
+            llm,
+            bank,
+            min_bank_size=int(os.getenv("QUIZ_BANK_MIN_SIZE", "9")),
+            warmup_concurrency=int(os.getenv("QUIZ_WARMUP_CONCURRENCY", "2")),
+        )
+
+    async def _generate(self, skill: str, difficulty: str) -> int:
+        _, display = skill_key(skill)
+        known = [question["question"] for question in self.bank.fresh(skill, difficulty)][:20]
+        avoid = "\n".join(f"- {question}" for question in known)
+        raw = await self.llm.chat_json(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": f"""You are a technical assessment creator.
+                Generate {self.batch_size} {difficulty} multiple-choice questions testing the given skill.
+                Each question should have 4 options with one correct answer.
+                Format your response as a JSON object with a "questions" array whose objects have:
+                - question: the question text
+                - options: array of 4 possible answers
+                - correctAnswer: the index (0-3) of the correct answer
+                - explanation: brief explanation of why the answer is correct"""},
+                {"role": "user", "content": f"Skill: {display}" + (f"\n\nDo not repeat these questions:\n{avoid}" if avoid else "")}
+            ],
+            temperature=0.8,
+            max_tokens=1800,
+        )
+        items = raw.get("questions", []) if isinstance(raw, dict) else raw if isinstance(raw, list) else []
+        questions = [question for question in (validate_question(item, display) for item in items) if question]
+        self._counters["invalid_questions"] += len(items) - len(questions)
+        self._counters["generated_skills"] += 1
+        return await self.bank.add(skill, difficulty, questions)
+
+    async def _refill(self, skill: str, difficulty: str, target: int):
+        key, _ = skill_key(skill)
+
+        async def refill():
+            # Another worker may have filled this skill already
+            await self.bank.refresh(skill, difficulty)
+            if len(self.bank.fresh(skill, difficulty)) >= target:
+                return 0
+            return await self._generate(skill, difficulty)
+
+        try:
+            await self._single_flight.do("quiz", f"{key}:{difficulty}", refill)
+        except Exception:
+            self._counters["generation_failures"] += 1
+            raise
+
+    async def ensure(self, skill: str, difficulty: str, needed: int = 1):
+        """
+        Make at least ``needed`` fresh questions available for a skill. Only a bank
+        with too few questions waits for generation; one below ``min_bank_size`` is
+        topped up in the background so repeated quizzes keep some variety.
+        Concurrent callers for the same skill share one LLM call.
+        """
+        available = len(self.bank.fresh(skill, difficulty))
+        if available >= needed:
+            self._counters["served_from_bank"] += 1
+            if available < self.min_bank_size:
+                task = asyncio.create_task(self._refill(skill, difficulty, self.min_bank_size))
+                # Failures are already counted; retrieve them so they are not logged as unhandled
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return
+        try:
+            await self._refill(skill, difficulty, needed)
+        except Exception:
+            # A partially filled bank still serves; only an empty one is an error
+            if not self.bank.fresh(skill, difficulty):
+                raise
+
+    async def quiz(self, skills: List[str], difficulty: str = "intermediate", per_skill: int = 3) -> Dict[str, Any]:
+        """
+        Build a quiz with ``per_skill`` questions for every skill.
+
+        Returns:
+            Dict[str, Any]: quiz (list of questions in skill order) and cached
+                (True when every skill was served from the bank)
+        """
+        skills = list(dict.fromkeys(skills))
+        await self.bank.refresh()
+        await self.bank.record_request(skills)
+        missing = [skill for skill in skills if len(self.bank.fresh(skill, difficulty)) < per_skill]
+        await asyncio.gather(*(self.ensure(skill, difficulty, per_skill) for skill in skills))
+        quiz = [question for skill in skills for question in self.bank.sample(skill, difficulty, per_skill)]
+        return {"quiz": quiz, "cached": not missing}
+
+    async def stream(self, skills: List[str], difficulty: str = "intermediate",
+                     per_skill: int = 3) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each skill's questions as soon as they are available; banked skills come first"""
+        skills = list(dict.fromkeys(skills))
+        await self.bank.refresh()
+        await self.bank.record_request(skills)
+
+        async def ready(skill):
+            try:
+                await self.ensure(skill, difficulty, per_skill)
+                return skill, None
+            except Exception as e:
+                return skill, e
+
+        for next_done in asyncio.as_completed([ready(skill) for skill in skills]):
+            skill, error = await next_done
+            if error is not None:
+                yield {"skill": skill_key(skill)[1], "error": str(error)}
+                continue
+            for question in self.bank.sample(skill, difficulty, per_skill):
+                yield question
+
+    async def warm_up(self, skills: Optional[List[str]] = None, limit: int = 20,
+                      difficulties: Iterable[str] = DIFFICULTIES) -> Dict[str, Any]:
+        """
+        Fill the bank for the given skills, or the most requested ones plus the
+        default seed, generating only where questions are missing or stale.
+        """
+        if skills is None:
+            await self.bank.refresh()
+            skills = list(dict.fromkeys(self.bank.top_skills(limit) + DEFAULT_WARMUP_SKILLS))[:limit]
+        semaphore = asyncio.Semaphore(self.warmup_concurrency)
+        failures = []
+
+        async def fill(skill, difficulty):
+            async with semaphore:
+                try:
+                    if len(self.bank.fresh(skill, difficulty)) < self.min_bank_size:
+                        await self._refill(skill, difficulty, self.min_bank_size)
+                except Exception as e:
+                    failures.append({"skill": skill, "difficulty": difficulty, "error": str(e)})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fill(skill, difficulty) for skill in skills for difficulty in difficulties))
+        return {"skills": skills, "failures": failures, "seconds": round(time.perf_counter() - started, 3)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "bank": self.bank.stats()}
@@ -1,32 +1,100 @@
-import fitz  # PyMuPDF
-import docx
+import asyncio
 import re
-import openai
-import os
 from dotenv import load_dotenv
-import json
 from typing import Dict, List, Any, Optional
+from llm_client import LLMClient, get_llm_client
+from extraction import extract_pdf_text, extract_docx_text
+from prompt_compaction import PromptCompactor, get_prompt_compactor
+from skill_taxonomy import SkillTaxonomy, get_skill_taxonomy, skill_overlap
+from local_extractor import PARSE_MODES, LOCAL_FIELDS, LocalFieldExtractor, fields_prompt, missing_fields
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Prompt versions key the LLM response cache; bump one whenever its prompt changes
+PARSE_PROMPT_VERSION = "resume-parser-parse-v1"
+SUGGEST_SKILLS_PROMPT_VERSION = "resume-parser-suggest-skills-v1"
+SUMMARY_PROMPT_VERSION = "resume-parser-summary-v1"
+ANALYZE_PROMPT_VERSION = "resume-parser-analyze-v4"
+PARSE_FIELDS_PROMPT_VERSION = "resume-parser-parse-fields-v1"
+
+# Keys returned by parse_with_gpt, described for the hybrid mode's per-field prompt
+PARSE_FIELDS = {
+    "fullName": "full name",
+    "email": "email address",
+    "phone": "phone number",
+    "skills": "skills, as an array of strings",
+    "experience": "years of experience, as a string with the number",
+    "education": "education, as a list of objects with degree, institution and year",
+    "workExperience": "work experience, as a list of objects with title, company, duration and description",
+    "country": "country",
+    "city": "city",
+    "languages": "languages, as a list of objects with language and level",
+    "germanLevel": "German level: None, A1, A2, B1, B2, C1, C2 or Native",
+    "linkedinUrl": "LinkedIn URL",
+    "githubUrl": "GitHub URL",
+    "portfolioUrl": "portfolio URL",
+}
+
+# "85", "85.5%", "85/100" or "4/5"; anything else in the LLM's score is ignored
+SCORE_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*(?:/\s*(\d+(?:\.\d+)?))?")
+
+
+def parse_match_score(value: Any) -> Optional[float]:
+    """Read a 0-100 score from an LLM answer leniently; None when it holds no usable number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        score = float(value)
+    elif isinstance(value, str):
+        match = SCORE_RE.search(value)
+        if not match:
+            return None
+        score = float(match.group(1))
+        if match.group(2) and float(match.group(2)) > 0:
+            score = score / float(match.group(2)) * 100
+    else:
+        return None
+    return score if 0 <= score <= 100 else None
 
 class ResumeParser:
     """
     A class to parse resumes in PDF or DOCX format and extract structured information
     using OpenAI's GPT models.
+    
+    The GPT methods are coroutines that share the process-wide async LLM client,
+    and its response cache.
     """
     
-    def __init__(self, model="gpt-4"):
+    def __init__(self, model="gpt-4", llm: Optional[LLMClient] = None,
+                 max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                 mode: str = "llm", local_extractor: Optional[LocalFieldExtractor] = None,
+                 skill_taxonomy: Optional[SkillTaxonomy] = None,
+                 prompt_compactor: Optional[PromptCompactor] = None):
         """
         Initialize the ResumeParser with the specified OpenAI model.
         
         Args:
             model (str): The OpenAI model to use for parsing
+            llm (LLMClient, optional): LLM client to use; defaults to the shared client
+            max_pages (int, optional): Stop PDF extraction after this many pages
+            max_chars (int, optional): Stop extraction after this many characters
+            mode (str): 'llm', 'hybrid' (local fields plus the LLM for the rest) or 'offline'
+            local_extractor (LocalFieldExtractor, optional): Defaults to one configured from RESUME_NER_MODEL
+            skill_taxonomy (SkillTaxonomy, optional): Defaults to the shared taxonomy
+            prompt_compactor (PromptCompactor, optional): Cleans up and budgets resume text
+                before it is sent; defaults to the shared compactor
         """
+        if mode not in PARSE_MODES:
+            raise ValueError(f"Unknown parse mode '{mode}'; expected one of {', '.join(PARSE_MODES)}")
         self.model = model
+        self.llm = llm or get_llm_client()
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.mode = mode
+        self.local_extractor = local_extractor or LocalFieldExtractor.from_env()
+        self.skill_taxonomy = skill_taxonomy or get_skill_taxonomy()
+        self.prompt_compactor = prompt_compactor or get_prompt_compactor()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """
@@ -39,13 +107,9 @@ class ResumeParser:
             str: Extracted text from the PDF
         """
         try:
-            text = ""
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    text += page.get_text()
-            return text
-        except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
+            return extract_pdf_text(file_path, max_pages=self.max_pages, max_chars=self.max_chars)
+        except ValueError as e:
+            raise Exception(str(e))
     
     def extract_text_from_pdf_bytes(self, file_bytes: bytes) -> str:
         """
@@ -58,13 +122,9 @@ class ResumeParser:
             str: Extracted text from the PDF
         """
         try:
-            text = ""
-            with fitz.open(stream=file_bytes, filetype="pdf") as doc:
-                for page in doc:
-                    text += page.get_text()
-            return text
-        except Exception as e:
-            raise Exception(f"Error extracting text from PDF bytes: {str(e)}")
+            return extract_pdf_text(file_bytes, max_pages=self.max_pages, max_chars=self.max_chars)
+        except ValueError as e:
+            raise Exception(str(e))
     
     def extract_text_from_docx(self, file_path: str) -> str:
         """
@@ -77,13 +137,9 @@ class ResumeParser:
             str: Extracted text from the DOCX
         """
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
-        except Exception as e:
-            raise Exception(f"Error extracting text from DOCX: {str(e)}")
+            return extract_docx_text(file_path, max_chars=self.max_chars)
+        except ValueError as e:
+            raise Exception(str(e))
     
     def extract_text_from_docx_bytes(self, file_bytes: bytes) -> str:
         """
@@ -96,14 +152,9 @@ class ResumeParser:
             str: Extracted text from the DOCX
         """
         try:
-            from io import BytesIO
-            doc = docx.Document(BytesIO(file_bytes))
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
-        except Exception as e:
-            raise Exception(f"Error extracting text from DOCX bytes: {str(e)}")
+            return extract_docx_text(file_bytes, max_chars=self.max_chars)
+        except ValueError as e:
+            raise Exception(str(e))
     
     def extract_text(self, file_path: str) -> str:
         """
@@ -140,7 +191,11 @@ class ResumeParser:
         else:
             raise ValueError("Unsupported file format. Please provide a PDF or DOCX file.")
     
-    def parse_with_gpt(self, text: str) -> Dict[str, Any]:
+    async def _compact(self, text: str, purpose: str) -> str:
+        """Compacted prompt text; tokenizing runs in a thread so concurrent parses keep going"""
+        return (await asyncio.to_thread(self.prompt_compactor.compact, text, purpose)).text
+
+    async def parse_with_gpt(self, text: str) -> Dict[str, Any]:
         """
         Parse resume text using OpenAI's GPT model.
         
@@ -150,8 +205,13 @@ class ResumeParser:
         Returns:
             Dict[str, Any]: Structured resume data
         """
+        if self.mode != "llm":
+            return await self.parse_locally(text)
+        prompt_text = await self._compact(text, "parse_resume")
         try:
-            response = openai.ChatCompletion.create(
+            parsed_data, _ = await self.llm.chat_cached(
+                prompt_version=PARSE_PROMPT_VERSION,
+                json_response=True,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": """You are a resume parsing assistant. Extract the following information from the resume text:
@@ -173,18 +233,56 @@ class ResumeParser:
                     
                     Format your response as a valid JSON object with these keys: fullName, email, phone, skills, experience, education, workExperience, country, city, languages, germanLevel, linkedinUrl, githubUrl, portfolioUrl.
                     For skills, return an array of strings. For experience, return the number of years as a string."""},
-                    {"role": "user", "content": text}
+                    {"role": "user", "content": prompt_text}
                 ],
                 temperature=0.3,
                 max_tokens=1500
             )
             
-            parsed_data = json.loads(response.choices[0].message.content)
             return parsed_data
         except Exception as e:
             raise Exception(f"Error parsing resume with GPT: {str(e)}")
     
-    def suggest_skills(self, resume_text: str, current_skills: List[str]) -> Dict[str, Any]:
+    async def parse_locally(self, text: str) -> Dict[str, Any]:
+        """
+        Parse resume text in 'hybrid' or 'offline' mode.
+        
+        Regex/NER fields are filled locally; in hybrid mode the LLM is then asked,
+        with a prompt listing only those fields, for the ones still missing.
+        
+        Args:
+            text (str): Resume text to parse
+            
+        Returns:
+            Dict[str, Any]: Structured resume data
+        """
+        local = await asyncio.to_thread(self.local_extractor.extract, text)
+        if self.mode == "offline":
+            return {key: local[key] for key in PARSE_FIELDS if key in local}
+        
+        parsed_data = {key: local[key] for key in LOCAL_FIELDS if key in PARSE_FIELDS and key in local}
+        remaining = missing_fields(parsed_data, PARSE_FIELDS)
+        if not remaining:
+            return parsed_data
+        prompt_text = await self._compact(text, "parse_resume_fields")
+        try:
+            llm_fields, _ = await self.llm.chat_cached(
+                prompt_version=PARSE_FIELDS_PROMPT_VERSION,
+                json_response=True,
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": fields_prompt({key: PARSE_FIELDS[key] for key in remaining})},
+                    {"role": "user", "content": prompt_text}
+                ],
+                temperature=0.3,
+                max_tokens=1200
+            )
+        except Exception as e:
+            raise Exception(f"Error parsing resume with GPT: {str(e)}")
+        parsed_data.update({key: llm_fields[key] for key in remaining if key in llm_fields})
+        return parsed_data
+    
+    async def suggest_skills(self, resume_text: str, current_skills: List[str]) -> Dict[str, Any]:
         """
         Suggest additional skills based on resume text and current skills.
         
@@ -195,8 +293,11 @@ class ResumeParser:
         Returns:
             Dict[str, Any]: Dictionary with suggested skills and confidence scores
         """
+        resume_text = await self._compact(resume_text, "suggest_skills")
         try:
-            response = openai.ChatCompletion.create(
+            suggested_skills, _ = await self.llm.chat_cached(
+                prompt_version=SUGGEST_SKILLS_PROMPT_VERSION,
+                json_response=True,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": """You are a career advisor specialized in tech skills. 
@@ -209,8 +310,6 @@ class ResumeParser:
                 max_tokens=500
             )
             
-            suggested_skills = json.loads(response.choices[0].message.content)
-            
             # Calculate confidence scores (simplified)
             confidence_scores = [0.9 - (i * 0.05) for i in range(len(suggested_skills))]
             confidence_scores = [max(score, 0.5) for score in confidence_scores]  # Ensure minimum 0.5 confidence
@@ -222,7 +321,7 @@ class ResumeParser:
         except Exception as e:
             raise Exception(f"Error suggesting skills: {str(e)}")
     
-    def generate_resume_summary(self, parsed_data: Dict[str, Any]) -> str:
+    async def generate_resume_summary(self, parsed_data: Dict[str, Any]) -> str:
         """
         Generate a professional summary based on parsed resume data.
         
@@ -241,8 +340,10 @@ class ResumeParser:
             Education: {', '.join([f"{edu.get('degree')} from {edu.get('institution')}" for edu in parsed_data.get('education', [])])}
             Work Experience: {', '.join([f"{exp.get('title')} at {exp.get('company')}" for exp in parsed_data.get('workExperience', [])])}
             """
+            prompt = await self._compact(prompt, "resume_summary")
             
-            response = openai.ChatCompletion.create(
+            summary, _ = await self.llm.chat_cached(
+                prompt_version=SUMMARY_PROMPT_VERSION,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": """You are a professional resume writer. 
@@ -255,41 +356,71 @@ class ResumeParser:
                 max_tokens=200
             )
             
-            return response.choices[0].message.content.strip()
+            return summary.strip()
         except Exception as e:
             raise Exception(f"Error generating resume summary: {str(e)}")
     
-    def analyze_resume_for_job(self, resume_text: str, job_description: str) -> Dict[str, Any]:
+    async def analyze_resume_for_job(self, resume_text: str, job_description: str,
+                                     include_recommendations: bool = True) -> Dict[str, Any]:
         """
         Analyze how well a resume matches a job description.
         
+        Matching and missing skills come from the skill taxonomy; the LLM is asked
+        for the free-text recommendations, and for an overall match score only
+        when the job names no known skills.
+        
         Args:
             resume_text (str): Resume text
             job_description (str): Job description text
+            include_recommendations (bool): Ask the LLM for recommendations
             
         Returns:
-            Dict[str, Any]: Analysis results including match score and recommendations
+            Dict[str, Any]: Analysis results including match score and recommendations.
+                matchScore (0-100) is skillOverlapScore, the share of the job's skills
+                found in the resume; when the job names no known skills it is the
+                LLM's overall score, as before the skill taxonomy, or None when the
+                LLM gives no usable number
         """
+        overlap = skill_overlap(self.skill_taxonomy.extract(resume_text), self.skill_taxonomy.extract(job_description))
+        analysis = {"matchScore": overlap["skillOverlapScore"], **overlap, "recommendations": []}
+        # Without overlap data only the LLM can score the match
+        if not include_recommendations and analysis["matchScore"] is not None:
+            return analysis
+        resume_text = await self._compact(resume_text, "analyze_resume")
+        if analysis["matchScore"] is None:
+            system_prompt = """You are a career coach and resume expert.
+                    The candidate's skill gap for the job has already been computed.
+                    Provide:
+                    1. An overall match score (0-100) of the resume for the job
+                    2. Concrete recommendations to improve the resume for this specific job
+                    
+                    Format your response as a JSON object with these keys: matchScore (a number), recommendations (an array of strings)."""
+        else:
+            system_prompt = """You are a career coach and resume expert.
+                    The candidate's skill gap for the job has already been computed.
+                    Provide concrete recommendations to improve the resume for this specific job.
+                    
+                    Format your response as a JSON object with this key: recommendations (an array of strings)."""
         try:
-            response = openai.ChatCompletion.create(
+            result, _ = await self.llm.chat_cached(
+                prompt_version=ANALYZE_PROMPT_VERSION,
+                json_response=True,
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": """You are a career coach and resume expert.
-                    Analyze how well the candidate's resume matches the job description.
-                    Provide:
-                    1. An overall match score (0-100)
-                    2. Matching skills (skills in the resume that match the job requirements)
-                    3. Missing skills (skills in the job description that are not in the resume)
-                    4. Recommendations to improve the resume for this specific job
-                    
-                    Format your response as a JSON object with these keys: matchScore, matchingSkills, missingSkills, recommendations."""},
-                    {"role": "user", "content": f"Resume:\n{resume_text}\n\nJob Description:\n{job_description}"}
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Resume:\n{resume_text}\n\nJob Description:\n{job_description}\n\n"
+                                                f"Matching skills: {', '.join(overlap['matchingSkills']) or 'none'}\n"
+                                                f"Missing skills: {', '.join(overlap['missingSkills']) or 'none'}"}
                 ],
                 temperature=0.5,
-                max_tokens=1000
+                max_tokens=600
             )
-            
-            return json.loads(response.choices[0].message.content)
+            result = result if isinstance(result, dict) else {"recommendations": result}
+            if analysis["matchScore"] is None:
+                analysis["matchScore"] = parse_match_score(result.get("matchScore"))
+            if include_recommendations:
+                analysis["recommendations"] = result.get("recommendations", [])
+            return analysis
         except Exception as e:
             raise Exception(f"Error analyzing resume for job: {str(e)}")
 
@@ -299,5 +430,5 @@ if __name__ == "__main__":
     
     # Example: Parse a resume file
     # resume_text = parser.extract_text("path/to/resume.pdf")
-    # parsed_data = parser.parse_with_gpt(resume_text)
+    # parsed_data = asyncio.run(parser.parse_with_gpt(resume_text))
     # print(json.dumps(parsed_data, indent=2))
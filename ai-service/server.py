@@ -0,0 +1,342 @@
+"""
+Pre-fork multi-worker server for the AI service.
+
+``uvicorn --workers N`` starts N independent interpreters, and each one
+imports the service and loads its own copy of the embedding model. This
+server imports the service and loads the model once in a master process, then
+forks the workers. They share the model weights and everything else built at
+import copy-on-write, so adding workers adds throughput without adding a copy
+of the model per worker. Set JOB_INDEX_DIR so the job vectors are shared too:
+every worker maps the same files, and one worker's update is published to the
+others (see ``job_index.SharedJobIndex``).
+
+State kept in a worker's memory is not shared. Parse jobs must use the Redis
+queue (PARSE_QUEUE_BACKEND=redis) so a poll that lands on another worker finds
+the job, and the server refuses to start more than one worker otherwise.
+Bulk ingestion jobs are shared through files in INGEST_OUTPUT_DIR (see
+``bulk_ingest.IngestJobStore``). Prometheus metrics are aggregated across
+workers through PROMETHEUS_MULTIPROC_DIR, which the server points at a fresh
+directory when it is not set (see ``metrics``).
+
+The master owns the listening socket and supervises the workers:
+
+- a worker that dies is replaced
+- SIGHUP recycles the workers: a new worker is forked and has to report
+  ready before an old one is retired, one at a time, so capacity never drops
+  and in-flight requests finish. The new workers are forked from the master,
+  so they run the code, model and configuration the master loaded at start;
+  deploying a change needs a restart of the master.
+- SIGTERM/SIGINT stop every worker gracefully and then exit
+
+    python server.py --workers 4 --port 8000
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+logger = logging.getLogger("ai-service.server")
+
+
+def prepare_metrics_dir() -> Optional[str]:
+    """
+    Point PROMETHEUS_MULTIPROC_DIR at an empty directory, before prometheus_client
+    is imported, so ``/metrics`` on any worker reports every worker's samples.
+
+    A configured directory is emptied of a previous run's files; otherwise a
+    temporary one is created, and its path returned so it can be removed on exit.
+    """
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="ai-service-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+        return directory
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+    return None
+
+
+def forget_worker_metrics(pid: int):
+    """Drop an exited worker's live gauges (requests in flight) from the aggregate"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+class PreforkServer:
+    """Master process that forks and supervises uvicorn workers sharing one socket"""
+
+    def __init__(self, app, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                 threads_per_worker: Optional[int] = None, graceful_timeout: float = 30,
+                 ready_timeout: float = 120, log_level: str = "info"):
+        """
+        Args:
+            app: ASGI application, fully imported before the workers are forked
+            host (str): Interface to bind
+            port (int): Port to bind
+            workers (int): Worker processes
+            threads_per_worker (int, optional): torch intra-op threads per worker, so N workers
+                do not each start one thread per core
+            graceful_timeout (float): Seconds a stopping worker gets to finish in-flight requests
+            ready_timeout (float): Seconds a new worker gets to start serving during a reload
+            log_level (str): uvicorn log level for the workers
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.log_level = log_level
+        self.socket: Optional[socket.socket] = None
+        # pid -> fork time
+        self._workers: Dict[int, float] = {}
+        # pid -> read end of the pipe a new worker writes to once it is serving
+        self._ready_pipes: Dict[int, int] = {}
+        self._stopping = False
+        self._reload_requested = False
+        self._respawn_delay = 0.0
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self) -> int:
+        """Fork a worker and return its pid; the read end of its ready pipe is kept until it reports"""
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            code = 0
+            try:
+                self._run_worker(ready_write)
+            except BaseException:
+                logger.exception("Worker %s crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_write)
+        self._workers[pid] = time.monotonic()
+        self._ready_pipes[pid] = ready_read
+        logger.info("Started worker %s", pid)
+        return pid
+
+    def _run_worker(self, ready_fd: int):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        if self.threads_per_worker:
+            try:
+                import torch
+                torch.set_num_threads(self.threads_per_worker)
+            except ImportError:
+                pass
+
+        config = uvicorn.Config(self.app, log_level=self.log_level, timeout_graceful_shutdown=self.graceful_timeout)
+        server = uvicorn.Server(config)
+
+        async def serve():
+            task = asyncio.create_task(server.serve(sockets=[self.socket]))
+            while not server.started and not task.done():
+                await asyncio.sleep(0.05)
+            if server.started:
+                os.write(ready_fd, b"1")
+            os.close(ready_fd)
+            await task
+
+        asyncio.run(serve())
+
+    def _wait_ready(self, pid: int, timeout: float) -> bool:
+        """Whether a worker reported that it is serving within ``timeout`` seconds"""
+        ready_fd = self._ready_pipes.pop(pid, None)
+        if ready_fd is None:
+            return False
+        try:
+            readable, _, _ = select.select([ready_fd], [], [], timeout)
+            return bool(readable) and os.read(ready_fd, 1) == b"1"
+        finally:
+            os.close(ready_fd)
+
+    def _reap(self) -> Dict[int, int]:
+        """Collect exited workers; returns pid -> exit status"""
+        exited = {}
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            exited[pid] = os.waitstatus_to_exitcode(status)
+            forget_worker_metrics(pid)
+            started = self._workers.pop(pid, None)
+            ready_fd = self._ready_pipes.pop(pid, None)
+            if ready_fd is not None:
+                os.close(ready_fd)
+            if started is not None and not self._stopping:
+                logger.warning("Worker %s exited with status %s", pid, exited[pid])
+                # Back off while workers keep dying right after they start
+                quick = time.monotonic() - started < 5
+                self._respawn_delay = min(max(self._respawn_delay * 2, 0.5), 30) if quick else 0.0
+        return exited
+
+    def _stop_worker(self, pid: int, timeout: float):
+        """Send SIGTERM and wait for the worker to finish its in-flight requests"""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self._wait_stopped(pid, timeout)
+
+    def _wait_stopped(self, pid: int, timeout: float):
+        self._workers.pop(pid, None)
+        ready_fd = self._ready_pipes.pop(pid, None)
+        if ready_fd is not None:
+            os.close(ready_fd)
+        deadline = time.monotonic() + timeout + 5
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    return
+                if done:
+                    return
+                time.sleep(0.05)
+            logger.warning("Worker %s did not stop in time; killing it", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        finally:
+            forget_worker_metrics(pid)
+
+    def reload(self):
+        """
+        Replace every worker, one at a time, without dropping below the configured count.
+
+        Workers are forked from this process again, so this releases memory they
+        accumulated and reopens per-worker state, but does not load new code or settings.
+        """
+        logger.info("Recycling %d workers", len(self._workers))
+        for old_pid in list(self._workers):
+            new_pid = self._spawn()
+            if not self._wait_ready(new_pid, self.ready_timeout):
+                logger.error("Worker %s did not become ready; keeping worker %s", new_pid, old_pid)
+                self._stop_worker(new_pid, 0)
+                return
+            self._stop_worker(old_pid, self.graceful_timeout)
+        logger.info("Recycled all workers")
+
+    def run(self):
+        """Bind, fork the workers and supervise them until SIGTERM or SIGINT"""
+        self.socket = self._bind()
+        # Move everything built at import out of the collector's reach, so collections
+        # in the workers do not write to (and un-share) the inherited pages
+        gc.collect()
+        gc.freeze()
+
+        def stop(signum, frame):
+            self._stopping = True
+
+        def request_reload(signum, frame):
+            self._reload_requested = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        logger.info("Listening on %s:%d with %d workers", self.host, self.port, self.workers)
+        for _ in range(self.workers):
+            self._spawn()
+        try:
+            while not self._stopping:
+                self._reap()
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload()
+                elif len(self._workers) < self.workers:
+                    time.sleep(self._respawn_delay)
+                    if not self._stopping:
+                        self._spawn()
+                time.sleep(0.2)
+        finally:
+            logger.info("Stopping %d workers", len(self._workers))
+            # Signal every worker first so they drain in parallel; a second signal would force them out
+            pids = list(self._workers)
+            for pid in pids:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in pids:
+                self._wait_stopped(pid, self.graceful_timeout)
+            self.socket.close()
+
+
+def preload(app_module):
+    """Load the embedding model in the master so the workers inherit it"""
+    backend = getattr(app_module, "EMBEDDING_BACKEND", "torch")
+    if backend.startswith("onnx"):
+        # ONNX Runtime sessions own thread pools that do not survive fork(); each worker loads its own
+        logger.info("Not preloading the %s backend; workers load it on first use", backend)
+        return
+    started = time.perf_counter()
+    app_module.model.load()
+    logger.info("Loaded %s in %.1fs", app_module.EMBEDDING_MODEL_NAME, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the AI service with pre-forked workers sharing one model")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--threads-per-worker", type=int, default=int(os.getenv("WORKER_THREADS", "0")) or None,
+                        help="torch threads per worker; defaults to cores divided by workers")
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--no-preload", action="store_true", help="Let each worker load the model itself")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+    if args.workers > 1 and os.getenv("PARSE_QUEUE_BACKEND", "memory") != "redis":
+        parser.error("--workers > 1 needs PARSE_QUEUE_BACKEND=redis; with the in-memory queue, "
+                     "polling a parse job on another worker than the one that accepted it fails")
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s[%(process)d] %(message)s")
+    # Must happen before main imports prometheus_client
+    metrics_dir = prepare_metrics_dir() if args.workers > 1 else None
+    import main
+
+    if not args.no_preload:
+        preload(main)
+    try:
+        PreforkServer(
+            main.app,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers),
+            graceful_timeout=args.graceful_timeout,
+            log_level=args.log_level,
+        ).run()
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,67 @@
+import asyncio
+import copy
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Tuple, Union
+
+
+def content_hash(*parts: Union[str, bytes, None]) -> str:
+    """Stable hash of request content, used as a coalescing key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async computations.
+
+    The first caller for a (namespace, key) pair starts the computation as a task;
+    callers arriving while it is running await the same task instead of starting
+    their own. The task is shielded, so a disconnecting client does not cancel
+    the work for the others. Followers receive a deep copy of the result so
+    callers can mutate what they get back.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, namespace: str, field: str):
+        counters = self._counters.setdefault(namespace, {"executed": 0, "deduplicated": 0})
+        counters[field] += 1
+
+    async def do(self, namespace: str, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers with the same namespace and key.
+
+        Args:
+            namespace (str): Kind of work, e.g. the endpoint name
+            key (str): Content hash identifying the request
+            fn (Callable[[], Awaitable[Any]]): Coroutine factory doing the work
+
+        Returns:
+            Any: Result of ``fn``
+        """
+        flight_key = (namespace, key)
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self._count(namespace, "deduplicated")
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self._count(namespace, "executed")
+        task = asyncio.ensure_future(fn())
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "namespaces": {name: dict(counters) for name, counters in self._counters.items()},
+        }
@@ -0,0 +1,175 @@
+"""
+Skill taxonomy and single-pass skill extraction.
+
+Canonical skills and their aliases (``skill_taxonomy.json``, or the file named
+by SKILL_TAXONOMY_PATH) are compiled into one Aho-Corasick automaton, so
+finding every known skill in a resume or job description is a single linear
+scan of the text regardless of how many skills the taxonomy holds.
+"""
+import json
+import os
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(__file__), "skill_taxonomy.json")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_skill(text: str) -> str:
+    """Lower-case and collapse whitespace; the form patterns and text are matched in"""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
+
+
+class SkillAutomaton:
+    """Aho-Corasick automaton over normalized skill patterns"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            patterns: (pattern, canonical skill) pairs; patterns must be normalized
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (pattern length, canonical skill) for every pattern ending there
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for pattern, skill in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((len(pattern), skill))
+
+        # Breadth-first failure links; outputs are merged along them at build time
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        All pattern occurrences on word boundaries in normalized ``text``.
+
+        Returns:
+            List of (start, end, canonical skill), leftmost-longest and non-overlapping,
+            so "React Native" is not also reported as "React"
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, skill in out[state]:
+                start = index - length + 1
+                end = index + 1
+                # Skills only count as whole words: "java" must not match inside "javascript"
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, end, skill))
+
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected = []
+        last_end = -1
+        for start, end, skill in matches:
+            if start >= last_end:
+                selected.append((start, end, skill))
+                last_end = end
+        return selected
+
+
+class SkillTaxonomy:
+    """Canonical skills with aliases, e.g. "JS" and "ES6" both map to "JavaScript" """
+
+    def __init__(self, skills: Dict[str, List[str]], alias_only: Iterable[str] = ()):
+        """
+        Args:
+            skills (Dict[str, List[str]]): Canonical skill name to its aliases
+            alias_only (Iterable[str]): Canonical names too ambiguous to match in free text
+                (e.g. "Go", "R"); they are still found through their aliases
+        """
+        alias_only = {normalize_skill(name) for name in alias_only}
+        self.skills = list(skills)
+        self._lookup: Dict[str, str] = {}
+        for skill, aliases in skills.items():
+            for name in [skill, *aliases]:
+                self._lookup.setdefault(normalize_skill(name), skill)
+        self._automaton = SkillAutomaton(
+            (pattern, skill) for pattern, skill in self._lookup.items() if pattern not in alias_only
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "SkillTaxonomy":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["skills"], data.get("aliasOnly", ()))
+
+    def canonicalize(self, name: str) -> Optional[str]:
+        """Canonical name for a skill or alias, or None when it is not in the taxonomy"""
+        return self._lookup.get(normalize_skill(name))
+
+    def extract(self, text: str) -> List[str]:
+        """Canonical skills mentioned in ``text``, in order of first mention"""
+        found: Dict[str, None] = {}
+        for _, _, skill in self._automaton.find(normalize_skill(text)):
+            found.setdefault(skill, None)
+        return list(found)
+
+    def normalize(self, skills: Iterable[str]) -> List[str]:
+        """
+        Canonicalize a list of skills, e.g. a profile's; unknown skills are kept as
+        given, duplicates are dropped
+        """
+        result: Dict[str, None] = {}
+        for skill in skills:
+            if skill and skill.strip():
+                result.setdefault(self.canonicalize(skill) or skill.strip(), None)
+        return list(result)
+
+
+def skill_overlap(candidate_skills: Iterable[str], required_skills: Iterable[str]) -> Dict[str, Any]:
+    """
+    Compare canonical candidate and job skills.
+
+    Returns:
+        Dict[str, Any]: matchingSkills and missingSkills (in job order) and
+            skillOverlapScore, the percentage of the job's skills the candidate has
+            (None when the job names no known skills)
+    """
+    candidate = {normalize_skill(skill) for skill in candidate_skills}
+    required = list(dict.fromkeys(required_skills))
+    matching = [skill for skill in required if normalize_skill(skill) in candidate]
+    missing = [skill for skill in required if normalize_skill(skill) not in candidate]
+    return {
+        "matchingSkills": matching,
+        "missingSkills": missing,
+        "skillOverlapScore": round(len(matching) / len(required) * 100, 1) if required else None,
+    }
+
+
+_default_taxonomy: Optional[SkillTaxonomy] = None
+
+
+def get_skill_taxonomy() -> SkillTaxonomy:
+    """Process-wide taxonomy loaded from SKILL_TAXONOMY_PATH or the bundled file"""
+    global _default_taxonomy
+    if _default_taxonomy is None:
+        _default_taxonomy = SkillTaxonomy.from_file(os.getenv("SKILL_TAXONOMY_PATH") or DEFAULT_TAXONOMY_PATH)
+    return _default_taxonomy
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service is a flat set of modules imported from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+
+class RecordingModel:
+    """Embeds a text as [its length, 1] and records the size of every forward pass"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False):
+        self.batches.append(len(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32).reshape(len(texts), 2)
+
+
+def test_concurrent_callers_share_forward_passes():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=200)
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def call(index):
+        barrier.wait()
+        results[index] = batcher.encode(["x" * index, "y"])
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    # Every caller gets its own rows back, in order
+    for index, rows in results.items():
+        assert rows.tolist() == [[index, 1.0], [1, 1.0]]
+    assert sum(model.batches) == 16
+    assert len(model.batches) < 8
+    assert batcher.stats()["requests"] == 8
+
+
+def test_batches_are_capped():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=3, max_wait_ms=100)
+    threads = [threading.Thread(target=batcher.encode, args=(["a", "b"],)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+    # A batch closes once it holds max_batch_size texts, so no pass takes more than one extra request
+    assert all(size <= 4 for size in model.batches)
+    assert sum(model.batches) == 8
+
+
+def test_single_text_and_normalization():
+    batcher = MicroBatcher(RecordingModel(), max_wait_ms=0)
+    vector = batcher.encode("abc", normalize_embeddings=True)
+    batcher.close()
+    assert vector.shape == (2,)
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+
+
+def test_model_errors_reach_every_caller_in_the_batch():
+    batcher = MicroBatcher(RecordingModel(fail=True), max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.encode(["a"])
+    batcher.close()
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import zipfile
+
+import bulk_ingest
+from bulk_ingest import IngestJobStore, ingest, iter_resumes, load_checkpoint
+
+
+async def run_inline(fn, *args):
+    return fn(*args)
+
+
+def test_iter_resumes_lists_directories_and_archives_in_order(tmp_path):
+    source = tmp_path / "resumes"
+    (source / "b").mkdir(parents=True)
+    for name in ("b/two.PDF", "one.docx", "notes.txt", ".hidden.pdf", "~$lock.docx"):
+        (source / name).write_bytes(b"")
+    assert [source_id for source_id, _ in iter_resumes(str(source))] == [
+        "one.docx", os.path.join("b", "two.PDF")]
+
+    archive = tmp_path / "resumes.zip"
+    with zipfile.ZipFile(archive, "w") as z:
+        for name in ("z.pdf", "a/b.docx", "__MACOSX/a/._b.docx", "readme.md"):
+            z.writestr(name, b"")
+    assert list(iter_resumes(str(archive))) == [
+        ("a/b.docx", (str(archive), "a/b.docx")), ("z.pdf", (str(archive), "z.pdf"))]
+
+
+def test_load_checkpoint_skips_torn_lines_and_optionally_errors(tmp_path):
+    output = tmp_path / "out.jsonl"
+    assert load_checkpoint(str(output)) == set()
+    output.write_text(
+        json.dumps({"source": "a.pdf", "status": "ok"}) + "\n"
+        + json.dumps({"source": "b.pdf", "status": "error"}) + "\n"
+        + '{"source": "c.pdf", "sta'
+    )
+    assert load_checkpoint(str(output)) == {"a.pdf", "b.pdf"}
+    assert load_checkpoint(str(output), retry_errors=True) == {"a.pdf"}
+
+
+def test_ingest_resumes_from_checkpoint(tmp_path, monkeypatch):
+    source = tmp_path / "resumes"
+    source.mkdir()
+    for name in ("a.pdf", "b.pdf", "empty.pdf"):
+        (source / name).write_bytes(b"")
+    monkeypatch.setattr(bulk_ingest, "extract_resume",
+                        lambda ref, max_pages, max_chars: "" if "empty" in ref[1] else f"text of {ref[1]}")
+    output = tmp_path / "out" / "parsed.jsonl"
+    parsed = []
+
+    async def parse(text):
+        parsed.append(text)
+        return {"chars": len(text)}
+
+    stats = asyncio.run(ingest(str(source), str(output), parse, run_inline))
+    assert (stats.succeeded, stats.failed) == (2, 1)
+    records = {r["source"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert records["empty.pdf"]["status"] == "error"
+    assert records["a.pdf"]["status"] == "ok"
+
+    parsed.clear()
+    stats = asyncio.run(ingest(str(source), str(output), parse, run_inline))
+    assert (stats.discovered, stats.skipped, parsed) == (3, 3, [])
+
+
+def test_job_store_creates_its_directory_on_first_write(tmp_path):
+    directory = tmp_path / "ingest" / "output"
+    store = IngestJobStore(str(directory))
+    assert not directory.exists()
+    assert store.read_status("job") is None
+    assert not store.pop_cancel("job")
+    assert not directory.exists()
+
+    store.write_status("job", {"jobId": "job", "status": "done"})
+    assert store.read_status("job") == {"jobId": "job", "status": "done"}
+
+
+def in_child(fn) -> int:
+    """Run ``fn`` in a forked process, the way another worker would; returns its exit status"""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = fn()
+        finally:
+            os._exit(code)
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+def test_only_one_worker_owns_a_job(tmp_path):
+    store = IngestJobStore(str(tmp_path))
+    assert store.acquire("job")
+    assert not store.acquire("job")
+    # Probing its own lock must not release it
+    assert store.is_owned("job")
+    assert in_child(lambda: 0 if IngestJobStore(str(tmp_path)).acquire("job") else 3) == 3
+
+    store.release("job")
+    assert not store.is_owned("job")
+    assert in_child(lambda: 0 if IngestJobStore(str(tmp_path)).acquire("job") else 3) == 0
+
+
+def test_running_status_without_an_owner_is_interrupted(tmp_path):
+    store = IngestJobStore(str(tmp_path))
+    assert store.read_status("job") is None
+    store.acquire("job")
+    store.write_status("job", {"jobId": "job", "status": "running"})
+    assert store.read_status("job")["status"] == "running"
+    store.release("job")
+    assert store.read_status("job")["status"] == "interrupted"
+
+
+def test_cancel_marker_is_consumed_once(tmp_path):
+    store = IngestJobStore(str(tmp_path))
+    assert not store.pop_cancel("job")
+    IngestJobStore(str(tmp_path)).request_cancel("job")
+    assert store.pop_cancel("job")
+    assert not store.pop_cancel("job")
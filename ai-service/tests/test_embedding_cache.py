@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from embedding_cache import DiskEmbeddingStore, EmbeddingCache, cache_key
+
+
+class CountingModel:
+    """Deterministic 4-d embeddings that record every text it encodes"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32):
+        self.encoded.extend(texts)
+        return np.array([[len(text), text.count("a"), 1.0, 2.0] for text in texts], dtype=np.float32)
+
+
+def test_cache_key_ignores_whitespace_but_not_the_model():
+    assert cache_key("m", "Python  developer\n") == cache_key("m", "Python developer")
+    assert cache_key("m", "Python developer") != cache_key("other", "Python developer")
+
+
+def test_only_misses_are_encoded_once_per_call():
+    model = CountingModel()
+    cache = EmbeddingCache(model, "m")
+    first = cache.encode(["alpha", "beta", "alpha"])
+    second = cache.encode(["beta", "gamma"])
+    assert model.encoded == ["alpha", "beta", "gamma"]
+    assert np.array_equal(first[0], first[2])
+    assert np.array_equal(first[1], second[0])
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_single_text_and_normalization():
+    cache = EmbeddingCache(CountingModel(), "m")
+    vector = cache.encode("banana", normalize_embeddings=True)
+    assert vector.shape == (4,)
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+
+
+def test_memory_tier_is_bounded():
+    model = CountingModel()
+    cache = EmbeddingCache(model, "m", max_memory_items=1)
+    cache.encode(["a", "b"])
+    cache.encode(["a"])
+    assert model.encoded == ["a", "b", "a"]
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    EmbeddingCache(CountingModel(), "m", cache_dir=str(tmp_path)).encode(["alpha", "beta"])
+    model = CountingModel()
+    restarted = EmbeddingCache(model, "m", cache_dir=str(tmp_path))
+    vectors = restarted.encode(["beta", "alpha"])
+    assert model.encoded == []
+    assert vectors[0].tolist() == [4, 1, 1, 2]
+    assert restarted.stats()["disk_hits"] == 2 and restarted.stats()["disk_items"] == 2
+
+
+def test_disk_tier_rejects_another_dimension(tmp_path):
+    EmbeddingCache(CountingModel(), "m", cache_dir=str(tmp_path)).encode(["alpha"])
+    with pytest.raises(ValueError):
+        DiskEmbeddingStore(str(tmp_path), dim=8)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from executors import BoundedExecutor
+
+
+def test_cancelled_caller_keeps_its_permit_until_the_job_finishes():
+    started = []
+    release = threading.Event()
+
+    def job(name):
+        started.append(name)
+        if name == "first":
+            release.wait(2)
+        return name
+
+    async def scenario():
+        pool = BoundedExecutor("test", max_workers=2, max_concurrency=1)
+        first = asyncio.create_task(pool.run(job, "first"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        second = asyncio.create_task(pool.run(job, "second"))
+        await asyncio.sleep(0.1)
+        # The pool is still running the first job, so the second must wait for its permit
+        waiting = list(started)
+        release.set()
+        result = await second
+        pool.shutdown()
+        return waiting, result, pool.stats()
+
+    waiting, result, stats = asyncio.run(scenario())
+    assert waiting == ["first"]
+    assert result == "second"
+    assert stats["running"] == 0 and stats["completed"] == 2
+
+
+def test_failures_are_counted_and_raised():
+    def boom():
+        raise RuntimeError("broken")
+
+    async def scenario():
+        pool = BoundedExecutor("test", max_workers=1)
+        with pytest.raises(RuntimeError):
+            await pool.run(boom)
+        # Counters are updated by the pool's done callback on the next loop iteration
+        await asyncio.sleep(0)
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1 and stats["running"] == 0
+
+
+def test_concurrency_is_capped():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+
+    async def scenario():
+        pool = BoundedExecutor("test", max_workers=4, max_concurrency=2)
+        await asyncio.gather(*(pool.run(job) for _ in range(8)))
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert max(peak) == 2
+    assert stats["max_queued"] >= 6
+
+
+def crash():
+    os._exit(1)
+
+
+def square(value):
+    return value * value
+
+
+def test_pool_is_replaced_after_a_worker_dies():
+    async def scenario():
+        pool = BoundedExecutor("test", kind="process", max_workers=1)
+        assert await pool.run(square, 2) == 4
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(crash)
+        # Counters and the pool are reset by the done callback on the next loop iteration
+        await asyncio.sleep(0)
+        result = await pool.run(square, 3)
+        stats = pool.stats()
+        pool.shutdown()
+        return result, stats
+
+    result, stats = asyncio.run(scenario())
+    assert result == 9
+    assert stats["failed"] == 1 and stats["completed"] == 2 and stats["running"] == 0
+
+
+def test_job_submitted_to_an_already_broken_pool_runs_on_a_new_one():
+    async def scenario():
+        pool = BoundedExecutor("test", kind="process", max_workers=1)
+        broken = pool.executor
+        future = broken.submit(crash)
+        with pytest.raises(BrokenProcessPool):
+            future.result(timeout=10)
+        result = await pool.run(square, 5)
+        replaced = pool.executor is not broken
+        pool.shutdown()
+        return result, replaced
+
+    assert asyncio.run(scenario()) == (25, True)
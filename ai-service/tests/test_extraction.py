@@ -0,0 +1,71 @@
+import asyncio
+from io import BytesIO
+
+import docx
+import fitz
+import pytest
+
+from extraction import (
+    extract_docx_text,
+    extract_pdf_pages,
+    extract_pdf_text,
+    extract_pdf_text_parallel,
+    pdf_page_count,
+)
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def run_inline(fn, *args):
+    return fn(*args)
+
+
+def test_pdf_extraction_respects_page_and_char_budgets():
+    pdf = make_pdf([f"Page {i}" for i in range(5)])
+    assert pdf_page_count(pdf) == 5
+
+    text = extract_pdf_text(pdf)
+    assert [f"Page {i}" in text for i in range(5)] == [True] * 5
+
+    first_two = extract_pdf_text(pdf, max_pages=2)
+    assert "Page 1" in first_two and "Page 2" not in first_two
+    assert len(extract_pdf_text(pdf, max_chars=10)) == 10
+    assert extract_pdf_pages(pdf, 3, 4).strip() == "Page 3"
+
+
+def test_parallel_extraction_matches_sequential_extraction():
+    pdf = make_pdf([f"Page {i}" for i in range(7)])
+    parallel = asyncio.run(extract_pdf_text_parallel(run_inline, pdf, chunk_pages=2))
+    assert parallel == extract_pdf_text(pdf)
+
+    budgeted = asyncio.run(extract_pdf_text_parallel(run_inline, pdf, max_pages=5, max_chars=20, chunk_pages=2))
+    assert budgeted == extract_pdf_text(pdf, max_pages=5, max_chars=20)
+
+
+def test_docx_extraction_includes_tables_and_headers_in_order():
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Jane Doe - jane@example.com"
+    document.add_paragraph("Experience")
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Acme"
+    table.rows[0].cells[1].text = "Engineer"
+    document.add_paragraph("Skills")
+    buffer = BytesIO()
+    document.save(buffer)
+
+    text = extract_docx_text(buffer.getvalue())
+    assert text.index("Jane Doe") < text.index("Experience") < text.index("Acme | Engineer") < text.index("Skills")
+
+
+def test_invalid_files_raise_value_error():
+    with pytest.raises(ValueError, match="PDF"):
+        extract_pdf_text(b"not a pdf")
+    with pytest.raises(ValueError, match="DOCX"):
+        extract_docx_text(b"not a docx")
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from job_index import JobIndex
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def index(quantize=False):
+    job_index = JobIndex(3, quantize=quantize)
+    job_index.add(["backend", "frontend", "data"],
+                  np.stack([unit(1, 0, 0), unit(0, 1, 0), unit(0, 0, 1)]),
+                  ["Backend Engineer", "Frontend Engineer", "Data Scientist"])
+    return job_index
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_search_ranks_by_cosine_similarity(quantize):
+    results = index(quantize).search(unit(0.9, 0.1, 0), k=2)
+    assert [job_id for job_id, _, _ in results] == ["backend", "frontend"]
+    assert results[0][1] == "Backend Engineer"
+    assert results[0][2] == pytest.approx(0.994, abs=0.01)
+
+
+def test_remove_moves_the_last_row_into_the_gap():
+    job_index = index()
+    assert job_index.remove(["backend", "missing"]) == 1
+    assert len(job_index) == 2 and "backend" not in job_index
+    assert job_index.search(unit(0, 0, 1), k=1)[0][0] == "data"
+
+
+def test_approximate_search_uses_ivf_buckets():
+    job_index = index()
+    job_index.build_ivf(n_lists=3)
+    assert job_index.search(unit(0, 1, 0), k=1, approximate=True, n_probe=1)[0][0] == "frontend"
+
+
+def test_save_and_load_round_trip_without_pickle(tmp_path):
+    path = str(tmp_path / "jobs.npz")
+    job_index = index(quantize=True)
+    job_index.add(["ünïcode"], unit(1, 1, 0)[None, :], ["Ingénieur"])
+    job_index.save(path)
+
+    with np.load(path, allow_pickle=False) as data:
+        assert data["ids"].dtype.kind == "U"
+    loaded = JobIndex.load(path)
+    assert loaded.quantize
+    assert loaded.search(unit(1, 1, 0), k=1)[0][:2] == ("ünïcode", "Ingénieur")
+    assert len(loaded) == 4
+
+
+def test_load_rejects_pickled_ids(tmp_path):
+    path = str(tmp_path / "jobs.npz")
+    np.savez(path, vectors=np.zeros((1, 3), np.float32), scales=np.ones(1, np.float32),
+             assignments=np.zeros(1, np.int32), centroids=np.zeros((0, 3), np.float32),
+             ids=np.array(["a"], dtype=object), titles=np.array(["A"], dtype=object), quantize=np.array(False))
+    with pytest.raises(ValueError, match="pickled"):
+        JobIndex.load(path)
+
+
+def test_published_generation_is_memory_mapped(tmp_path):
+    directory = str(tmp_path)
+    generation = index().publish(directory)
+    opened = JobIndex.open_published(directory)
+    assert opened.generation == generation
+    assert isinstance(opened._vectors, np.memmap)
+    assert opened.search(unit(0, 0, 1), k=1)[0][0] == "data"
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import rank_jobs
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+JOB_VECTORS = {
+    "python backend": unit(1, 0, 0),
+    "python data": unit(1, 1, 0),
+    "sales": unit(0, 0, 1),
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def encode_in_pool(fn, *args, **kwargs):
+        if fn is main.embed_profile:
+            return unit(1, 0.2, 0), []
+        return np.stack([JOB_VECTORS[text] for text in args[0]])
+
+    monkeypatch.setattr(main, "encode_in_pool", encode_in_pool)
+    return TestClient(main.app)
+
+
+def jobs(*descriptions):
+    return [{"jobId": f"job-{index}", "title": description.title(), "description": description}
+            for index, description in enumerate(descriptions)]
+
+
+def test_rank_jobs_orders_by_score():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    order, ranked = rank_jobs(np.array([1.0], dtype=np.float32), scores[:, None])
+    assert order.tolist() == [1, 3, 2, 0]
+    assert ranked.tolist() == pytest.approx([0.9, 0.7, 0.5, 0.1])
+
+
+def test_rank_jobs_top_k():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)[:, None]
+    profile = np.array([1.0], dtype=np.float32)
+    assert rank_jobs(profile, scores, top_k=2)[0].tolist() == [1, 3]
+    # Out of range values return every job
+    assert rank_jobs(profile, scores, top_k=10)[0].tolist() == [1, 3, 2, 0]
+    assert rank_jobs(profile, scores, top_k=0)[0].tolist() == [1, 3, 2, 0]
+
+
+def test_rank_jobs_keeps_input_order_on_ties():
+    order, _ = rank_jobs(np.array([1.0], dtype=np.float32), np.array([[0.5], [0.5], [0.5]], dtype=np.float32))
+    assert order.tolist() == [0, 1, 2]
+
+
+def test_batch_endpoint_returns_best_matches_first(client):
+    response = client.post("/job-match-scores/", json={
+        "profile": {"skills": ["Python"]},
+        "jobs": jobs("sales", "python data", "python backend"),
+        "topK": 2,
+    })
+    assert response.status_code == 200
+    matches = response.json()["matches"]
+    assert [match["jobId"] for match in matches] == ["job-2", "job-1"]
+    assert set(matches[0]) == {"jobId", "title", "matchScore"}
+    assert matches[0]["title"] == "Python Backend"
+    assert 0 < matches[1]["matchScore"] < matches[0]["matchScore"] <= 100
+
+
+def test_batch_endpoint_validates_the_request(client):
+    assert client.post("/job-match-scores/", json={"profile": {}, "jobs": []}).status_code == 400
+    response = client.post("/job-match-scores/", json={"profile": {}, "jobs": jobs("sales"), "topK": 0})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "topK must be a positive integer"
+    assert client.post("/job-match-scores/", json={"profile": {}}).status_code == 422
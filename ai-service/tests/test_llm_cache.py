@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from llm_cache import LLMResponseCache, SQLiteCacheBackend, llm_cache_key
+
+
+def test_key_depends_on_every_input():
+    messages = [{"role": "user", "content": "hi"}]
+    key = llm_cache_key("gpt-4", "v1", 0.0, messages)
+    assert key == llm_cache_key("gpt-4", "v1", 0.0, [dict(m) for m in messages])
+    assert key != llm_cache_key("gpt-4", "v2", 0.0, messages)
+    assert key != llm_cache_key("gpt-4", "v1", 0.5, messages)
+
+
+def test_memory_tier_hits_and_hands_out_copies():
+    async def scenario():
+        cache = LLMResponseCache(max_items=2)
+        await cache.set("a", {"skills": ["Python"]})
+        found, value = await cache.get("a")
+        value["skills"].append("Go")
+        return found, await cache.get("a"), await cache.get("missing"), cache.stats()
+
+    found, again, missing, stats = asyncio.run(scenario())
+    assert found
+    assert again == (True, {"skills": ["Python"]})
+    assert missing == (False, None)
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used():
+    async def scenario():
+        cache = LLMResponseCache(max_items=2)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return [(await cache.get(key))[0] for key in "abc"]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_expired_entries_miss():
+    async def scenario():
+        cache = LLMResponseCache()
+        await cache.set("a", 1, ttl=-1)
+        return await cache.get("a"), cache.stats()["expired"]
+
+    assert asyncio.run(scenario()) == ((False, None), 1)
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+
+    async def scenario():
+        await LLMResponseCache(path=path).set("a", {"summary": "text"})
+        other = LLMResponseCache(path=path)
+        return await other.get("a"), other.stats()
+
+    value, stats = asyncio.run(scenario())
+    assert value == (True, {"summary": "text"})
+    assert stats["disk_hits"] == 1
+
+
+def test_disk_tier_prunes_every_nth_write(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "llm.sqlite"), max_items=3, prune_every=5)
+    later = time.time() + 60
+    backend.set("expired", "x", time.time() - 1)
+    for index in range(6):
+        backend.set(f"k{index}", "x", later)
+    # The count as of the prune on the 5th write; two more rows were written since
+    assert len(backend) == 3
+    backend.prune()
+    assert len(backend) == 3
+    assert backend.get("expired") is None
+    assert backend.get("k0") is None
+    assert backend.get("k5") is not None
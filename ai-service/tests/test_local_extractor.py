@@ -0,0 +1,59 @@
+from local_extractor import (
+    LocalFieldExtractor,
+    extract_local_fields,
+    fields_prompt,
+    find_languages,
+    find_phone,
+    missing_fields,
+)
+
+RESUME = """Ayesha Khan
+Location: Lahore, Pakistan
+Email: ayesha.khan@example.com | Mobile: +92 300 1234567
+linkedin.com/in/ayesha-khan  github.com/ayeshak  https://ayesha.dev
+Skills: Python, FastAPI; Docker
+5+ years of backend experience
+
+Education
+BSc Computer Science 2014 - 2018
+
+Languages
+English (C1), German: B2, Urdu - native
+"""
+
+
+def test_extracts_contact_fields_and_languages():
+    fields = extract_local_fields(RESUME)
+    assert fields["fullName"] == "Ayesha Khan"
+    assert fields["email"] == "ayesha.khan@example.com"
+    assert fields["phone"] == "+92 300 1234567"
+    assert fields["linkedinUrl"] == "https://linkedin.com/in/ayesha-khan"
+    assert fields["githubUrl"] == "https://github.com/ayeshak"
+    assert fields["portfolioUrl"] == "https://ayesha.dev"
+    assert (fields["city"], fields["country"]) == ("Lahore", "Pakistan")
+    assert fields["skills"] == ["Python", "FastAPI", "Docker"]
+    assert fields["experience"] == "5"
+    assert fields["germanLevel"] == "B2"
+    assert fields["languages"] == [
+        {"language": "English", "level": "C1"},
+        {"language": "German", "level": "B2"},
+        {"language": "Urdu", "level": "Native"},
+    ]
+
+
+def test_year_ranges_are_not_phone_numbers():
+    assert find_phone("Studied 2014 - 2018 at LUMS") is None
+    assert find_phone("ID 2014-2018\nTel: 0301 7654321") == "0301 7654321"
+    assert find_languages("Deutsch - Muttersprache, B1 French") == [
+        {"language": "German", "level": "Native"},
+        {"language": "French", "level": "B1"},
+    ]
+
+
+def test_only_missing_fields_are_left_for_the_llm():
+    fields = LocalFieldExtractor().extract("Resume\nContact: someone@example.org")
+    assert "fullName" not in fields
+    assert missing_fields(fields, ["email", "phone", "languages"]) == ["phone", "languages"]
+
+    prompt = fields_prompt({"phone": "Phone number"})
+    assert "- phone: Phone number" in prompt
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import Metrics, MetricsMiddleware, server_timing_header
+
+
+def sample(text, line_prefix):
+    return [line for line in text.splitlines() if line.startswith(line_prefix)]
+
+
+def test_stage_records_latency_and_errors():
+    metrics = Metrics(namespace="t")
+    with metrics.stage("encode"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage("encode"):
+            raise ValueError("bad input")
+    metrics.register_stats("cache", lambda: {"hits": 3, "tiers": {"disk": 1}, "name": "lru"})
+
+    text = asyncio.run(metrics.render()).decode()
+    assert sample(text, 't_stage_seconds_count{stage="encode"}') == ['t_stage_seconds_count{stage="encode"} 2.0']
+    assert sample(text, 't_stage_errors_total{stage="encode"}') == ['t_stage_errors_total{stage="encode"} 1.0']
+    assert "t_cache_hits 3.0" in text and "t_cache_tiers_disk 1.0" in text
+    assert "lru" not in text
+
+
+def test_disabled_metrics_are_no_ops():
+    metrics = Metrics(enabled=False)
+    with metrics.stage("encode"):
+        pass
+    assert not hasattr(metrics, "registry")
+
+
+def test_middleware_labels_routes_and_adds_server_timing():
+    metrics = Metrics(namespace="t", server_timing=True)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        with metrics.stage("lookup"):
+            return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    response = TestClient(app).get("/items/7")
+    assert response.headers["server-timing"].startswith("lookup;dur=")
+
+    text = asyncio.run(metrics.render()).decode()
+    assert 't_http_request_seconds_count{method="GET",route="/items/{item_id}",status="200"} 1.0' in text
+    assert server_timing_header([("a", 0.001), ("a", 0.002)], 0.01) == b"a;dur=3.0, total;dur=10.0"
+
+
+def test_multiprocess_mode_aggregates_worker_samples(tmp_path):
+    # prometheus_client picks its value storage at import, so this runs in a fresh interpreter
+    script = textwrap.dedent("""
+        import asyncio, os, sys
+        from metrics import Metrics
+
+        metrics = Metrics.from_env()
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                with metrics.stage("encode"):
+                    pass
+                os._exit(0)
+            os.waitpid(pid, 0)
+        metrics.register_stats("queue", lambda: {"depth": 4})
+        sys.stdout.write(asyncio.run(metrics.render()).decode())
+    """)
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "METRICS_NAMESPACE": "t"}
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+    assert 't_stage_seconds_count{stage="encode"} 2.0' in result.stdout
+    assert 't_queue_depth{pid="' in result.stdout
+
+
+def test_server_prepares_an_empty_metrics_dir(tmp_path, monkeypatch):
+    from server import prepare_metrics_dir
+
+    (tmp_path / "histogram_123.db").write_bytes(b"stale")
+    (tmp_path / "keep.txt").write_text("x")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert prepare_metrics_dir() is None
+    assert os.listdir(tmp_path) == ["keep.txt"]
+
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+    created = prepare_metrics_dir()
+    try:
+        assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == created and os.listdir(created) == []
+    finally:
+        os.rmdir(created)
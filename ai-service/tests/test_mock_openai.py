@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from local_extractor import fields_prompt
+from mock_openai import PARSED_RESUME, canned_content, create_app
+from resume_parser import PARSE_FIELDS, ResumeParser
+
+
+class RecordingLLM:
+    """Answers every prompt from the mock server, keeping the system prompts it was sent"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def chat_cached(self, messages, **kwargs):
+        self.prompts.append(messages[0]["content"])
+        return json.loads(canned_content(messages)), False
+
+
+def system(prompt):
+    return [{"role": "system", "content": prompt}, {"role": "user", "content": "resume text"}]
+
+
+def test_per_field_prompts_get_only_their_fields():
+    prompt = fields_prompt({key: PARSE_FIELDS[key] for key in ("skills", "city", "workExperience")})
+    assert json.loads(canned_content(system(prompt))) == {
+        "skills": PARSED_RESUME["skills"], "city": "Berlin", "workExperience": None}
+
+
+def test_each_service_prompt_gets_its_own_canned_answer():
+    llm = RecordingLLM()
+    parser = ResumeParser(llm=llm)
+    parsed = asyncio.run(parser.parse_with_gpt("Jane Doe\nPython developer"))
+    assert parsed["fullName"] == "Jane Doe" and parsed["skills"] == PARSED_RESUME["skills"]
+
+    scored = asyncio.run(parser.analyze_resume_for_job("Python developer", "A friendly team player"))
+    assert scored["matchScore"] == 78.0 and scored["recommendations"]
+    assert len(llm.prompts) == 2
+
+
+def test_hybrid_parse_gets_per_field_answers():
+    llm = RecordingLLM()
+    parsed = asyncio.run(ResumeParser(llm=llm, mode="hybrid").parse_with_gpt("Contact: ayesha@example.org"))
+    assert "extract only these fields" in llm.prompts[0]
+    # The locally found email is kept; the mock answers only the fields that were asked for
+    assert parsed["email"] == "ayesha@example.org"
+    assert parsed["skills"] == PARSED_RESUME["skills"]
+    assert "availability" not in parsed
+
+
+def test_endpoint_answers_like_chat_completions():
+    client = TestClient(create_app(latency_ms=0))
+    response = client.post("/v1/chat/completions", json={"model": "gpt-4", "messages": system("You are a resume writer")})
+    assert response.json()["choices"][0]["message"]["content"].startswith("Experienced engineer")
+    assert client.get("/stats").json() == {"requests": 1, "errors": 0}
@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+import pytest
+
+from model_loader import BACKENDS, LazyEncoder, OnnxEncoder, backend_loader, load_sentence_transformer
+
+
+class FakeModel:
+    def encode(self, texts, **kwargs):
+        return [len(text) for text in texts]
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+def counting_loader(calls):
+    def load(name):
+        calls.append(name)
+        return FakeModel()
+    return load
+
+
+def test_model_is_not_loaded_until_first_use():
+    calls = []
+    encoder = LazyEncoder("mini", loader=counting_loader(calls))
+    assert not encoder.loaded and calls == []
+
+    assert encoder.encode(["ab", "abc"]) == [2, 3]
+    assert encoder.loaded and calls == ["mini"]
+    assert encoder.load_seconds is not None
+
+    assert encoder.get_sentence_embedding_dimension() == 3
+    assert calls == ["mini"]
+
+
+def test_concurrent_first_use_loads_once():
+    calls = []
+    encoder = LazyEncoder("mini", loader=counting_loader(calls))
+    barrier = threading.Barrier(8)
+
+    def use():
+        barrier.wait()
+        encoder.load()
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["mini"]
+
+
+def test_backend_loader_selects_by_name():
+    assert backend_loader("torch") is load_sentence_transformer
+    for backend in BACKENDS:
+        assert callable(backend_loader(backend))
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        backend_loader("tensorrt")
+
+
+def test_onnx_encoder_restores_input_order_after_length_sorting():
+    encoder = OnnxEncoder.__new__(OnnxEncoder)
+    encoder.config = {"dimension": 2}
+    batches = []
+
+    def encode_batch(texts):
+        batches.append(texts)
+        return np.array([[len(text), 0.0] for text in texts], dtype=np.float32)
+
+    encoder._encode_batch = encode_batch
+    texts = ["a", "abcd", "ab", "abc", "abcde"]
+    result = encoder.encode(texts, batch_size=2)
+
+    assert batches == [["abcde", "abcd"], ["abc", "ab"], ["a"]]
+    assert result[:, 0].tolist() == [1, 4, 2, 3, 5]
+    single = encoder.encode("abc", normalize_embeddings=True)
+    assert single.tolist() == [1.0, 0.0]
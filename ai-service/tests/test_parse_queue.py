@@ -0,0 +1,197 @@
+import asyncio
+
+import pytest
+
+from parse_queue import InMemoryJobBackend, ParseJobQueue, QueueFullError, QueueUnavailableError
+
+
+class FlakyBackend(InMemoryJobBackend):
+    """In-memory backend whose load and save fail while their name is in ``failing``"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failing = set()
+
+    async def save(self, job):
+        if "save" in self.failing:
+            raise QueueUnavailableError("backend down")
+        await super().save(job)
+
+    async def load(self, job_id):
+        if "load" in self.failing:
+            raise QueueUnavailableError("backend down")
+        return await super().load(job_id)
+
+
+async def echo(payload):
+    return {"echo": payload["text"]}
+
+
+def test_job_runs_to_done():
+    async def scenario():
+        queue = ParseJobQueue(echo, workers=2)
+        job = await queue.submit({"text": "resume"})
+        done = await queue.get(job["jobId"], wait=2)
+        stats = await queue.stats()
+        await queue.stop()
+        return job, done, stats
+
+    job, done, stats = asyncio.run(scenario())
+    assert job["status"] == "queued"
+    assert done["status"] == "done"
+    assert done["result"] == {"echo": "resume"}
+    assert stats["completed"] == 1 and stats["running"] == 0
+
+
+def test_handler_error_is_recorded():
+    async def failing(payload):
+        raise ValueError("unreadable file")
+
+    async def scenario():
+        queue = ParseJobQueue(failing, on_error=lambda e: {"detail": f"Error: {e}"})
+        job = await queue.submit({})
+        done = await queue.get(job["jobId"], wait=2)
+        await queue.stop()
+        return done
+
+    done = asyncio.run(scenario())
+    assert done["status"] == "failed"
+    assert done["error"] == {"detail": "Error: unreadable file"}
+
+
+def test_full_queue_rejects_jobs():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocked(payload):
+            await release.wait()
+
+        queue = ParseJobQueue(blocked, workers=1, max_depth=1)
+        await queue.submit({})
+        await asyncio.sleep(0.05)
+        await queue.submit({})
+        with pytest.raises(QueueFullError):
+            await queue.submit({})
+        release.set()
+        stats = await queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["submitted"] == 2 and stats["rejected"] == 1
+
+
+def test_finished_jobs_expire_on_load():
+    async def scenario():
+        backend = InMemoryJobBackend(job_ttl=0)
+        await backend.save({"jobId": "a", "status": "done"})
+        return await backend.load("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_job_popped_during_an_outage_runs_once_the_backend_is_back():
+    async def scenario():
+        backend = FlakyBackend()
+        queue = ParseJobQueue(echo, backend=backend)
+        queue.start = lambda: None
+        job = await queue.submit({"text": "resume"})
+        backend.failing = {"load"}
+        with pytest.raises(QueueUnavailableError):
+            await queue._process_next()
+        backend.failing = set()
+        await queue._process_next()
+        return await queue.get(job["jobId"])
+
+    assert asyncio.run(scenario())["status"] == "done"
+
+
+def test_job_that_could_not_be_marked_running_is_failed_visibly():
+    async def scenario():
+        backend = FlakyBackend()
+        queue = ParseJobQueue(echo, backend=backend)
+        queue.start = lambda: None
+        job = await queue.submit({"text": "resume"})
+        backend.failing = {"save"}
+        with pytest.raises(QueueUnavailableError):
+            await queue._process_next()
+        unsaved = (await queue.stats())["unsaved"]
+        backend.failing = set()
+        await queue._process_next()
+        return unsaved, await queue.get(job["jobId"]), await queue.stats()
+
+    unsaved, job, stats = asyncio.run(scenario())
+    assert unsaved == 1
+    assert job["status"] == "failed"
+    assert job["error"] == {"detail": "Parse queue backend unavailable"}
+    assert stats["unsaved"] == 0
+
+
+def test_workers_survive_a_backend_outage():
+    async def scenario():
+        backend = FlakyBackend()
+        queue = ParseJobQueue(echo, backend=backend, workers=1)
+        backend.failing = {"load"}
+        job = await queue.submit({"text": "resume"})
+        await asyncio.sleep(0.1)
+        backend.failing = set()
+        done = await queue.get(job["jobId"], wait=3)
+        stats = await queue.stats()
+        await queue.stop()
+        return done, stats
+
+    done, stats = asyncio.run(scenario())
+    assert done["status"] == "done"
+    assert stats["backend_errors"] >= 1
+
+
+def test_payload_of_an_expired_job_is_discarded():
+    async def scenario():
+        discarded = []
+        backend = InMemoryJobBackend()
+        queue = ParseJobQueue(echo, backend=backend, discard=discarded.append)
+        queue.start = lambda: None
+        job = await queue.submit({"text": "resume"})
+        backend._jobs.pop(job["jobId"])
+        await queue._process_next()
+        return discarded
+
+    assert asyncio.run(scenario()) == [{"text": "resume"}]
+
+
+def test_jobs_queued_at_shutdown_fail_and_release_their_payloads():
+    async def scenario():
+        discarded = []
+        release = asyncio.Event()
+
+        async def blocked(payload):
+            await release.wait()
+
+        backend = InMemoryJobBackend()
+        queue = ParseJobQueue(blocked, backend=backend, workers=1, discard=discarded.append)
+        running = await queue.submit({"text": "first"})
+        queued = await queue.submit({"text": "second"})
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return discarded, await backend.load(running["jobId"]), await backend.load(queued["jobId"])
+
+    discarded, running, queued = asyncio.run(scenario())
+    # The running job's handler owns its payload; only the never-started one is discarded
+    assert discarded == [{"text": "second"}]
+    assert running["status"] == queued["status"] == "failed"
+    assert queued["error"] == {"detail": "Service shutting down"}
+
+
+def test_payload_of_a_job_that_could_not_start_is_discarded():
+    async def scenario():
+        discarded = []
+        backend = FlakyBackend()
+        queue = ParseJobQueue(echo, backend=backend, discard=discarded.append)
+        queue.start = lambda: None
+        await queue.submit({"text": "resume"})
+        backend.failing = {"save"}
+        with pytest.raises(QueueUnavailableError):
+            await queue._process_next()
+        return discarded
+
+    assert asyncio.run(scenario()) == [{"text": "resume"}]
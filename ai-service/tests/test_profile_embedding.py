@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from profile_embedding import SECTION_WEIGHTS, chunk_text, combine_sections, experience_phrase, profile_sections
+
+
+def profile(**fields):
+    return SimpleNamespace(**{"fullName": "Jane Doe", "skills": [], "experience": "", "resumeText": "", **fields})
+
+
+def test_experience_phrase():
+    assert experience_phrase("5") == "5 years of experience"
+    assert experience_phrase("5+") == "5 years of experience"
+    assert experience_phrase("2.5 yrs") == "2.5 years of experience"
+    assert experience_phrase("Led a team of five engineers") == ""
+
+
+def test_year_count_is_folded_into_the_skills_section():
+    texts, weights = profile_sections(profile(skills=["Python", " SQL "], experience="5"))
+    assert texts == ["Skills: Python, SQL. 5 years of experience"]
+    assert weights == [SECTION_WEIGHTS["skills"]]
+
+
+def test_year_count_alone_is_not_embedded():
+    texts, _ = profile_sections(profile(experience="7 years"))
+    assert texts == ["Jane Doe"]
+
+
+def test_descriptive_experience_keeps_a_small_weight():
+    texts, weights = profile_sections(profile(skills=["Python"], experience="Backend engineer at Acme"))
+    assert texts == ["Skills: Python", "Backend engineer at Acme"]
+    assert weights == [SECTION_WEIGHTS["skills"], SECTION_WEIGHTS["experience"]]
+    assert SECTION_WEIGHTS["experience"] < SECTION_WEIGHTS["skills"]
+
+
+def test_resume_chunks_share_the_resume_weight():
+    resume = "Experience\n" + " ".join(["word"] * 25) + "\nSkills\nPython"
+    texts, weights = profile_sections(profile(resumeText=resume), max_words=10)
+    assert len(texts) == 5
+    assert sum(weights) == SECTION_WEIGHTS["resume"]
+
+
+def test_chunks_do_not_cross_section_headings():
+    assert chunk_text("Experience\nBuilt APIs\nSkills\nPython", max_words=50) == ["Experience Built APIs", "Skills Python"]
+
+
+def test_combine_sections_is_normalized():
+    vector = combine_sections(np.array([[1.0, 0.0], [0.0, 1.0]]), [3.0, 1.0])
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert vector[0] > vector[1]
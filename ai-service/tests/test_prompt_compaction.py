@@ -0,0 +1,94 @@
+import fitz
+
+from extraction import extract_pdf_text
+from prompt_compaction import count_tokens, normalize_text, truncate_sections
+
+
+def test_normalize_text_fixes_characters_and_hyphenation():
+    text, removed = normalize_text("ﬁnancial  analy-\nsis • Excel")
+    assert text == "financial analysis - Excel"
+    assert removed == 0
+
+
+def test_normalize_text_drops_page_numbers_and_running_headers():
+    text, removed = normalize_text("Jane Doe\nResume\nPage 1 of 2\nExperience\n\n\n\fJane Doe\nResume\n- 2 -\nSkills")
+    assert text == "Jane Doe\nResume\nExperience\n\nSkills"
+    assert removed == 4
+
+
+def test_normalize_text_keeps_repeated_job_titles_under_different_companies():
+    resume = ("Jane Doe\nExperience\nSoftware Engineer\nAcme\n- Built payment APIs\n"
+              "Software Engineer\nGlobex\n- Built payment APIs\nEducation\nBSc")
+    text, removed = normalize_text(resume)
+    assert (text, removed) == (resume, 0)
+
+    # Across pages, only lines repeated at the page edges are headers or footers
+    pages = ["Jane Doe - CV", "Software Engineer", "Acme", "- Built APIs", "Lead", "Confidential"], \
+            ["Jane Doe - CV", "Senior", "Software Engineer", "Globex", "- Built APIs", "- Led a team", "x", "Confidential"]
+    text, removed = normalize_text("\f".join("\n".join(page) for page in pages))
+    assert text.count("Software Engineer") == 2
+    assert text.count("- Built APIs") == 2
+    assert text.count("Jane Doe - CV") == 1 and text.count("Confidential") == 1
+    assert removed == 2
+
+
+def test_normalize_text_drops_consecutive_duplicates():
+    text, removed = normalize_text("Skills\nPython\nPython\n\npython\nDocker")
+    assert text == "Skills\nPython\n\nDocker"
+    assert removed == 2
+
+
+def test_normalize_text_keeps_repeated_labels():
+    text, _ = normalize_text("Acme\nResponsibilities:\nBuilt things\nGlobex\nResponsibilities:\nSold things")
+    assert text.count("Responsibilities:") == 2
+
+
+def budget(*lines):
+    """Tokens ``truncate_sections`` counts for these lines, newlines included"""
+    return sum(count_tokens(line) + 1 for line in lines)
+
+
+def test_truncate_sections_within_budget_is_unchanged():
+    text = "Jane Doe\nSkills\nPython"
+    assert truncate_sections(text, 1000) == (text, [])
+
+
+def test_truncate_sections_trims_low_priority_sections_first():
+    lines = [
+        "Jane Doe",
+        "Experience",
+        "Engineer at Acme building payment systems",
+        "Hobbies",
+        "Chess, hiking, photography and cooking",
+        "References",
+        "Available on request from former managers",
+    ]
+    truncated, trimmed = truncate_sections("\n".join(lines), budget(*lines[:-1]))
+    assert trimmed == ["References"]
+    assert "Engineer at Acme building payment systems" in truncated
+    assert "Chess, hiking, photography and cooking" in truncated
+    assert "Available on request" not in truncated
+
+
+def test_truncate_sections_reaches_experience_last():
+    text = "Jane Doe\nExperience\nEngineer at Acme\nHobbies\nChess\nReferences\nOn request"
+    truncated, trimmed = truncate_sections(text, budget("Jane Doe", "Experience", "Engineer at Acme"))
+    assert trimmed == ["References", "Hobbies"]
+    assert truncated == "Jane Doe\nExperience\nEngineer at Acme"
+
+
+def test_running_headers_of_extracted_pdf_pages_are_dropped():
+    doc = fitz.open()
+    for number, company in enumerate(("Acme", "Globex", "Initech")):
+        page = doc.new_page()
+        page.insert_text((72, 40), "Jane Doe - Curriculum Vitae")
+        body = [f"Project {number}.{i}" for i in range(number + 3)] + ["Software Engineer", company]
+        body += [f"Built service {number}.{i}" for i in range(3)]
+        for i, line in enumerate(body):
+            page.insert_text((72, 100 + 15 * i), line)
+        page.insert_text((72, 800), "jane@example.com")
+    text, _ = normalize_text(extract_pdf_text(doc.tobytes()))
+
+    assert text.count("Jane Doe - Curriculum Vitae") == 1
+    assert text.count("jane@example.com") == 1
+    assert text.count("Software Engineer") == 3
@@ -0,0 +1,87 @@
+import asyncio
+
+from quiz_bank import QuizBank, QuizService, validate_question
+
+
+def question(text, answer=0):
+    return {"question": text, "options": ["A", "B", "C", "D"], "correctAnswer": answer, "explanation": "Because"}
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_json(self, **kwargs):
+        self.calls += 1
+        return {"questions": [question(f"Question {self.calls}.{index}?") for index in range(10)]}
+
+
+def test_validate_question():
+    assert validate_question(question(" What? ", "2"), "Python") == {
+        "skill": "Python", "question": "What?", "options": ["A", "B", "C", "D"], "correctAnswer": 2,
+        "explanation": "Because",
+    }
+    assert validate_question({**question("What?"), "options": ["A", "a", "B", "C"]}, "Python") is None
+    assert validate_question({**question("What?"), "options": ["A", "B", "C"]}, "Python") is None
+    assert validate_question(question("What?", 4), "Python") is None
+    assert validate_question(question("  "), "Python") is None
+
+
+def test_aliases_share_a_bucket_and_sample_uses_the_canonical_name():
+    async def scenario():
+        bank = QuizBank()
+        added = await bank.add("js", "beginner", [question("What is a closure?"), question("what is a  closure?")])
+        return added, bank.sample("JavaScript", "beginner", 5)
+
+    added, sampled = asyncio.run(scenario())
+    assert added == 1
+    assert [q["skill"] for q in sampled] == ["JavaScript"]
+
+
+def test_persistent_bank_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "quiz.sqlite")
+
+    async def scenario():
+        first, second = QuizBank(path), QuizBank(path)
+        await first.add("Python", "advanced", [question("What is the GIL?")])
+        before = second.fresh("Python", "advanced")
+        await second.refresh("Python", "advanced")
+        return before, second.fresh("Python", "advanced")
+
+    before, after = asyncio.run(scenario())
+    assert before == []
+    assert [q["question"] for q in after] == ["What is the GIL?"]
+
+
+def test_request_counts_are_batched(tmp_path):
+    path = str(tmp_path / "quiz.sqlite")
+
+    async def scenario():
+        bank = QuizBank(path, flush_interval=3600)
+        await bank.record_request(["Python", "Docker"])
+        await bank.record_request(["python"])
+        unflushed = QuizBank(path).top_skills(5)
+        await bank.flush_requests(force=True)
+        return bank.top_skills(5), unflushed, QuizBank(path).top_skills(5)
+
+    local, unflushed, flushed = asyncio.run(scenario())
+    assert local == ["Python", "Docker"]
+    assert unflushed == []
+    assert flushed == ["Python", "Docker"]
+
+
+def test_worker_uses_questions_another_worker_generated(tmp_path):
+    path = str(tmp_path / "quiz.sqlite")
+
+    async def scenario():
+        llm = FakeLLM()
+        first = QuizService(llm, QuizBank(path))
+        second = QuizService(llm, QuizBank(path))
+        generated = await first.quiz(["Python"], per_skill=3)
+        reused = await second.quiz(["Python"], per_skill=3)
+        return llm.calls, generated, reused
+
+    calls, generated, reused = asyncio.run(scenario())
+    assert calls == 1
+    assert not generated["cached"] and len(generated["quiz"]) == 3
+    assert len(reused["quiz"]) == 3
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from resume_parser import ResumeParser, parse_match_score
+
+
+class FakeLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+        self.messages = None
+
+    async def chat_cached(self, **kwargs):
+        self.calls += 1
+        self.messages = kwargs["messages"]
+        return self.reply, False
+
+
+def analyze(reply, resume, job, **kwargs):
+    llm = FakeLLM(reply)
+    return asyncio.run(ResumeParser(llm=llm).analyze_resume_for_job(resume, job, **kwargs)), llm.calls
+
+
+def system_prompt(resume, job):
+    llm = FakeLLM({"matchScore": 50, "recommendations": []})
+    asyncio.run(ResumeParser(llm=llm).analyze_resume_for_job(resume, job))
+    return llm.messages[0]["content"]
+
+
+def test_match_score_is_the_skill_overlap():
+    analysis, _ = analyze({"matchScore": 90, "recommendations": ["Mention Kubernetes"]},
+                          "Python and Docker developer", "We need Python and Kubernetes")
+    assert analysis["matchScore"] == analysis["skillOverlapScore"] == 50.0
+    assert analysis["matchingSkills"] == ["Python"]
+    assert analysis["missingSkills"] == ["Kubernetes"]
+    assert analysis["recommendations"] == ["Mention Kubernetes"]
+
+
+def test_match_score_falls_back_to_the_llm_without_known_job_skills():
+    analysis, _ = analyze({"matchScore": 72, "recommendations": []}, "Python developer", "A friendly team player")
+    assert analysis["skillOverlapScore"] is None
+    assert analysis["matchScore"] == 72.0
+
+
+def test_llm_is_skipped_when_the_overlap_scores_the_match():
+    analysis, calls = analyze({}, "Python developer", "Python", include_recommendations=False)
+    assert calls == 0
+    assert analysis["matchScore"] == 100.0
+
+
+def test_llm_still_scores_when_recommendations_are_off():
+    analysis, calls = analyze({"matchScore": 40, "recommendations": ["x"]}, "Python developer", "A team player",
+                              include_recommendations=False)
+    assert calls == 1
+    assert analysis["matchScore"] == 40.0
+    assert analysis["recommendations"] == []
+
+
+def test_prompt_asks_for_a_score_only_without_overlap_data():
+    assert "matchScore" not in system_prompt("Python developer", "We need Python and Kubernetes")
+    assert "matchScore" in system_prompt("Python developer", "A friendly team player")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (85, 85.0), (72.5, 72.5), ("85", 85.0), ("85%", 85.0), ("85/100", 85.0), ("Score: 4/5", 80.0),
+    (None, None), ("high", None), ("", None), (True, None), (150, None), ([85], None),
+])
+def test_parse_match_score_is_lenient(value, expected):
+    assert parse_match_score(value) == expected
+
+
+def test_unreadable_llm_score_is_none():
+    analysis, _ = analyze({"matchScore": "strong match", "recommendations": []}, "Python developer", "A team player")
+    assert analysis["matchScore"] is None
+    analysis, _ = analyze({"matchScore": "85%", "recommendations": []}, "Python developer", "A team player")
+    assert analysis["matchScore"] == 85.0
@@ -0,0 +1,86 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+import httpx
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A tiny ASGI app answering with the pid of the worker that served the request
+SERVER_SCRIPT = textwrap.dedent("""
+    import os, sys
+    from server import PreforkServer
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+
+    PreforkServer(app, host="127.0.0.1", port=int(sys.argv[1]), workers=2, graceful_timeout=2,
+                  log_level="warning").run()
+""")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return {int(child) for child in f.read().split()}
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            value = predicate()
+            if value:
+                return value
+        except (httpx.HTTPError, OSError):
+            pass
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+@pytest.mark.skipif(not os.path.exists(f"/proc/{os.getpid()}/task/{os.getpid()}/children"),
+                    reason="needs /proc child listings")
+def test_workers_share_the_socket_and_a_dead_worker_is_replaced():
+    port = free_port()
+    master = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port)], cwd=SERVICE_DIR)
+    try:
+        url = f"http://127.0.0.1:{port}/"
+        workers = wait_for(lambda: len(children(master.pid)) == 2 and children(master.pid))
+        served = int(wait_for(lambda: httpx.get(url, timeout=2).text))
+        assert served in workers
+
+        os.kill(served, signal.SIGKILL)
+        replaced = wait_for(lambda: (lambda now: len(now) == 2 and served not in now and now)(children(master.pid)))
+        assert len(replaced - workers) == 1
+        assert int(wait_for(lambda: httpx.get(url, timeout=2).text)) in replaced
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=15) == 0
+        for pid in replaced:
+            with pytest.raises(ProcessLookupError):
+                os.kill(pid, 0)
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+
+
+def test_several_workers_need_the_redis_parse_queue():
+    env = {key: value for key, value in os.environ.items() if key != "PARSE_QUEUE_BACKEND"}
+    result = subprocess.run([sys.executable, "server.py", "--workers", "2"], cwd=SERVICE_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 2
+    assert "PARSE_QUEUE_BACKEND=redis" in result.stderr
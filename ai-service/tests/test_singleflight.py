@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, content_hash
+
+
+def test_concurrent_callers_share_one_computation():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"items": [1]}
+
+        first, second = await asyncio.gather(flight.do("parse", "k", work), flight.do("parse", "k", work))
+        second["items"].append(2)
+        return calls, first, flight.stats()
+
+    calls, first, stats = asyncio.run(scenario())
+    assert calls == 1
+    # Followers get a copy, so mutating one result leaves the other alone
+    assert first == {"items": [1]}
+    assert stats == {"in_flight": 0, "namespaces": {"parse": {"executed": 1, "deduplicated": 1}}}
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("bad input")
+
+        results = await asyncio.gather(flight.do("parse", "k", failing), flight.do("parse", "k", failing),
+                                       return_exceptions=True)
+        in_flight = flight.stats()["in_flight"]
+        # The failure is not remembered: the next call runs again
+        with pytest.raises(ValueError):
+            await flight.do("parse", "k", failing)
+        return calls, results, in_flight
+
+    calls, results, in_flight = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert in_flight == 0
+    assert calls == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flight.do("parse", "k", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("parse", "k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_content_hash_separates_parts():
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+    assert content_hash(None, b"x") == content_hash("", "x")
@@ -0,0 +1,59 @@
+from skill_taxonomy import SkillAutomaton, SkillTaxonomy, get_skill_taxonomy, skill_overlap
+
+
+def taxonomy():
+    return SkillTaxonomy(
+        {
+            "React": ["react.js", "reactjs"],
+            "React Native": [],
+            "Java": [],
+            "JavaScript": ["js", "es6"],
+            "Go": ["golang"],
+            "Machine Learning": ["ml"],
+        },
+        alias_only=["Go"],
+    )
+
+
+def test_leftmost_longest_match_wins():
+    assert taxonomy().extract("Built apps in React Native") == ["React Native"]
+
+
+def test_matches_are_non_overlapping_and_in_text_order():
+    automaton = SkillAutomaton([("react", "React"), ("react native", "React Native"), ("native code", "Native")])
+    assert automaton.find("react native code") == [(0, 12, "React Native")]
+
+
+def test_matches_only_whole_words():
+    assert taxonomy().extract("JavaScript, not Java") == ["JavaScript", "Java"]
+    assert taxonomy().extract("javascripting") == []
+
+
+def test_aliases_map_to_canonical_names_in_order_of_first_mention():
+    text = "ES6 and ReactJS; some ML.\nMore JS."
+    assert taxonomy().extract(text) == ["JavaScript", "React", "Machine Learning"]
+
+
+def test_alias_only_skills_need_an_alias():
+    assert taxonomy().extract("Let's go to Golang meetups") == ["Go"]
+    assert taxonomy().extract("ready to go") == []
+
+
+def test_normalize_keeps_unknown_skills_and_drops_duplicates():
+    assert taxonomy().normalize(["reactjs", "React", " Cobol ", "", "js"]) == ["React", "Cobol", "JavaScript"]
+
+
+def test_bundled_taxonomy_loads():
+    bundled = get_skill_taxonomy()
+    assert bundled.canonicalize("k8s") == "Kubernetes"
+    assert "Python" in bundled.extract("Senior Python developer")
+
+
+def test_skill_overlap():
+    overlap = skill_overlap(["python", "Docker"], ["Python", "Kubernetes", "Docker", "Python"])
+    assert overlap == {"matchingSkills": ["Python", "Docker"], "missingSkills": ["Kubernetes"],
+                       "skillOverlapScore": 66.7}
+
+
+def test_skill_overlap_without_job_skills_has_no_score():
+    assert skill_overlap(["Python"], [])["skillOverlapScore"] is None
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import os
+import time
+from io import BytesIO
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from uploads import UploadSizeLimitMiddleware, detect_file_type, spool_upload, sweep_spooled_uploads
+
+PDF = b"%PDF-1.7\n" + b"x" * 200_000
+
+
+def test_detect_file_type_uses_magic_bytes():
+    assert detect_file_type(b"%PDF-1.4 ...") == "pdf"
+    assert detect_file_type(b"\r\n junk %PDF-1.4") == "pdf"
+    assert detect_file_type(b"PK\x03\x04rest") == "docx"
+    assert detect_file_type(b"GIF89a") is None
+
+
+def test_spool_upload_copies_file_and_hashes_it(tmp_path):
+    upload = UploadFile(BytesIO(PDF), filename="resume.txt")
+    spooled = asyncio.run(spool_upload(upload, max_bytes=len(PDF), directory=str(tmp_path)))
+
+    assert spooled.kind == "pdf"
+    assert spooled.size == len(PDF)
+    assert spooled.sha256 == hashlib.sha256(PDF).hexdigest()
+    with open(spooled.path, "rb") as f:
+        assert f.read() == PDF
+    spooled.cleanup()
+    assert os.listdir(tmp_path) == []
+    spooled.cleanup()
+
+
+@pytest.mark.parametrize("data, max_bytes, status", [
+    (PDF, len(PDF) - 1, 413),
+    (b"plain text resume", 1_000, 400),
+])
+def test_rejected_uploads_leave_no_temp_file(tmp_path, data, max_bytes, status):
+    upload = UploadFile(BytesIO(data), filename="resume.pdf")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(spool_upload(upload, max_bytes=max_bytes, directory=str(tmp_path)))
+    assert error.value.status_code == status
+    assert os.listdir(tmp_path) == []
+
+
+def make_client(max_bytes):
+    app = FastAPI()
+
+    @app.post("/upload/")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/other/")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=max_bytes, paths=["/upload"])
+    return TestClient(app)
+
+
+def test_middleware_limits_only_upload_routes():
+    client = make_client(max_bytes=100)
+    assert client.post("/upload/", content=b"x" * 100).json() == {"size": 100}
+
+    response = client.post("/upload/", content=b"x" * 101)
+    assert response.status_code == 413
+    assert "100 byte" in response.json()["detail"]
+
+    assert client.post("/other/", content=b"x" * 500).json() == {"size": 500}
+
+
+def test_middleware_counts_streamed_bodies():
+    client = make_client(max_bytes=100)
+
+    def chunks():
+        for _ in range(5):
+            yield b"x" * 40
+
+    assert client.post("/upload/", content=chunks()).status_code == 413
+
+
+def test_sweep_removes_only_old_spooled_uploads(tmp_path):
+    old, fresh, other = tmp_path / "upload-old", tmp_path / "upload-fresh", tmp_path / "notes.txt"
+    for path in (old, fresh, other):
+        path.write_bytes(b"x")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    os.utime(other, (time.time() - 7200, time.time() - 7200))
+
+    assert sweep_spooled_uploads(str(tmp_path), max_age=3600) == 1
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "upload-fresh"]
+    assert sweep_spooled_uploads(str(tmp_path / "missing"), max_age=3600) == 0
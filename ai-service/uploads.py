@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, UploadFile
+
+COPY_CHUNK_BYTES = 64 * 1024
+SPOOL_PREFIX = "upload-"
+
+# DOCX files are ZIP containers; PDFs may carry a little junk before the header
+_ZIP_MAGIC = b"PK\x03\x04"
+_PDF_MAGIC = b"%PDF-"
+
+
+def detect_file_type(head: bytes) -> Optional[str]:
+    """Identify a resume file from its first bytes: 'pdf', 'docx' or None"""
+    if _PDF_MAGIC in head[:1024]:
+        return "pdf"
+    if head.startswith(_ZIP_MAGIC):
+        return "docx"
+    return None
+
+
+class SpooledUpload:
+    """An uploaded file copied to a private temporary file on disk"""
+
+    def __init__(self, path: str, size: int, sha256: str, kind: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.kind = kind
+
+    def cleanup(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _spool(source, max_bytes: int, directory: Optional[str]) -> SpooledUpload:
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            head = source.read(COPY_CHUNK_BYTES)
+            kind = detect_file_type(head)
+            if kind is None:
+                raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PDF or DOCX file.")
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                target.write(chunk)
+                chunk = source.read(COPY_CHUNK_BYTES)
+        return SpooledUpload(path, size, digest.hexdigest(), kind)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int, directory: Optional[str] = None) -> SpooledUpload:
+    """
+    Copy an upload to a temporary file in fixed-size chunks, off the event loop.
+
+    The file type comes from the magic bytes, not the filename, and the copy is
+    abandoned with a 413 as soon as it passes ``max_bytes``. Extraction workers
+    then open the file by path, so the upload is never held in memory whole.
+    """
+    await upload.seek(0)
+    return await asyncio.to_thread(_spool, upload.file, max_bytes, directory)
+
+
+def sweep_spooled_uploads(directory: Optional[str], max_age: float) -> int:
+    """
+    Delete spooled uploads older than ``max_age`` seconds, left behind by a
+    crashed process or by jobs that never ran.
+
+    Younger files may still belong to a request or queued job in another
+    worker sharing the directory, so they are kept.
+
+    Returns:
+        int: Number of files removed
+    """
+    directory = directory or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.startswith(SPOOL_PREFIX) and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by its owner or another worker's sweep meanwhile
+            pass
+    return removed
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies above ``max_bytes`` on upload routes.
+
+    A declared Content-Length over the limit is refused before any of the body is
+    read. Otherwise the body is counted as it streams in, and the request fails
+    with a 413 the moment the limit is crossed rather than after buffering it all.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"Request body exceeds the {self.max_bytes} byte upload limit"}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the route's body parsing, so FastAPI turns it into a 413 response
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds the {self.max_bytes} byte upload limit")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -11,6 +11,35 @@ import axios from 'axios';
 // Configuration
 const UPLOAD_DIR = path.join(process.cwd(), 'public', 'uploads', 'resumes');
 const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:8000';
+const PARSE_JOB_TIMEOUT_MS = 120000;
+
+// Submit the resume as a parse job and long-poll for the result, so no single
+// request to the AI service stays open for the whole extraction and GPT call
+async function parseResumeWithAiService(resumeFile: File) {
+  const aiFormData = new FormData();
+  aiFormData.append('file', resumeFile);
+  
+  const submitResponse = await axios.post(`${AI_SERVICE_URL}/parse-resume/jobs`, aiFormData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+  const { jobId } = submitResponse.data;
+  
+  const deadline = Date.now() + PARSE_JOB_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    const { data: job } = await axios.get(`${AI_SERVICE_URL}/parse-resume/jobs/${jobId}`, {
+      params: { wait: 25 },
+    });
+    if (job.status === 'done') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error?.detail || 'Failed to parse resume');
+    }
+  }
+  throw new Error('Timed out waiting for resume parsing');
+}
 
 // POST endpoint to upload and parse a resume
 export async function POST(request: NextRequest) {
@@ -52,22 +81,12 @@ export async function POST(request: NextRequest) {
     const fileUrl = `/uploads/resumes/${fileName}`;
     
     // Send file to AI service for parsing
-    const aiFormData = new FormData();
-    aiFormData.append('file', resumeFile);
-    
-    const aiResponse = await axios.post(`${AI_SERVICE_URL}/parse-resume/`, aiFormData, {
-      headers: {
-        'Content-Type': 'multipart/form-data',
-      },
-    });
+    const parsedData = await parseResumeWithAiService(resumeFile);
     
-    if (!aiResponse.data) {
+    if (!parsedData) {
       throw new Error('Failed to parse resume');
     }
     
-    // Extract parsed data
-    const parsedData = aiResponse.data;
-    
     // Connect to database
     const db = await connectToDatabase();
     
@@ -136,6 +155,13 @@ export async function POST(request: NextRequest) {
       message: 'Resume uploaded and parsed successfully'
     });
   } catch (error) {
+    // A full parse queue is passed on instead of retried, so load is not multiplied
+    if (axios.isAxiosError(error) && [429, 503].includes(error.response?.status ?? 0)) {
+      return NextResponse.json(
+        { error: 'Resume parsing is busy, please try again shortly' },
+        { status: 503, headers: { 'Retry-After': String(error.response?.headers['retry-after'] ?? 5) } }
+      );
+    }
     console.error('Error uploading resume:', error);
     return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
   }
@@ -0,0 +1,197 @@
+"""
+Async MongoDB access for the analytics backend.
+
+Queries go through Motor, so handlers await them instead of blocking the
+event loop. The shared client's pool size and timeouts come from the
+environment. The query helpers take a field list that is turned into a
+projection, so only the fields a handler uses cross the network. ``/health``
+reads the result of a background ping instead of pinging on the request.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from metrics import stage
+
+# Server-side limit for a single query (maxTimeMS), so a slow aggregation cannot hold a pooled connection forever
+DEFAULT_MAX_TIME_MS = int(os.getenv("MONGODB_MAX_TIME_MS", "5000"))
+
+
+def client_options() -> Dict[str, Any]:
+    """
+    Pool and timeout options from MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE,
+    MONGODB_MAX_IDLE_TIME_MS, MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS, MONGODB_CONNECT_TIMEOUT_MS and
+    MONGODB_SOCKET_TIMEOUT_MS
+    """
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000")),
+        # Fail fast with an error instead of queueing indefinitely when the pool is exhausted
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "3000")),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "3000")),
+        "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000")),
+        "appname": "zirak-hr-analytics",
+    }
+
+
+class Database:
+    """Process-wide Motor client and database handle"""
+
+    client: Optional[AsyncIOMotorClient] = None
+    db: Optional[AsyncIOMotorDatabase] = None
+
+    @classmethod
+    def get_database(cls) -> AsyncIOMotorDatabase:
+        """Connect on first use to MONGODB_URI and return the MONGODB_DB database"""
+        if cls.db is None:
+            cls.client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"), **client_options())
+            cls.db = cls.client[os.getenv("MONGODB_DB", "zirak-hr")]
+        return cls.db
+
+    @classmethod
+    def close_connection(cls):
+        if cls.client is not None:
+            cls.client.close()
+        cls.client = None
+        cls.db = None
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    """FastAPI dependency returning the shared database handle"""
+    return Database.get_database()
+
+
+def projection(fields: Optional[Iterable[str]], include_id: bool = True) -> Optional[Dict[str, int]]:
+    """
+    A find projection for ``fields``; None (every field) when no fields are given.
+
+    Args:
+        fields (Iterable[str], optional): Field names, dotted paths allowed
+        include_id (bool): Keep ``_id`` in the result
+    """
+    if fields is None:
+        return None
+    spec = {field: 1 for field in fields}
+    if not include_id:
+        spec["_id"] = 0
+    return spec
+
+
+async def find(db: AsyncIOMotorDatabase, collection: str, query: Optional[Dict[str, Any]] = None,
+               fields: Optional[Iterable[str]] = None, sort: Optional[Sequence[Tuple[str, int]]] = None,
+               limit: int = 0, max_time_ms: int = DEFAULT_MAX_TIME_MS) -> List[Dict[str, Any]]:
+    """
+    Documents matching ``query``, with only ``fields`` returned.
+
+    Args:
+        db (AsyncIOMotorDatabase): Database handle
+        collection (str): Collection name
+        query (Dict[str, Any], optional): Filter
+        fields (Iterable[str], optional): Fields to return; all when omitted
+        sort (Sequence[Tuple[str, int]], optional): Sort specification
+        limit (int): Maximum documents, 0 for no limit
+        max_time_ms (int): Server-side time limit
+
+    Returns:
+        List[Dict[str, Any]]: The matching documents
+    """
+    with stage("db"):
+        cursor = db[collection].find(query or {}, projection(fields), limit=limit, max_time_ms=max_time_ms)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        return await cursor.to_list(length=None)
+
+
+async def find_one(db: AsyncIOMotorDatabase, collection: str, query: Dict[str, Any],
+                   fields: Optional[Iterable[str]] = None,
+                   max_time_ms: int = DEFAULT_MAX_TIME_MS) -> Optional[Dict[str, Any]]:
+    """The first document matching ``query``, with only ``fields`` returned"""
+    with stage("db"):
+        return await db[collection].find_one(query, projection(fields), max_time_ms=max_time_ms)
+
+
+async def count(db: AsyncIOMotorDatabase, collection: str, query: Optional[Dict[str, Any]] = None,
+                max_time_ms: int = DEFAULT_MAX_TIME_MS) -> int:
+    with stage("db"):
+        return await db[collection].count_documents(query or {}, maxTimeMS=max_time_ms)
+
+
+async def aggregate(db: AsyncIOMotorDatabase, collection: str, pipeline: List[Dict[str, Any]],
+                    max_time_ms: int = DEFAULT_MAX_TIME_MS) -> List[Dict[str, Any]]:
+    """
+    Run an aggregation pipeline; put a ``$project`` stage early so documents
+    are slimmed down before they are grouped
+    """
+    with stage("db"):
+        cursor = db[collection].aggregate(pipeline, maxTimeMS=max_time_ms)
+        return await cursor.to_list(length=None)
+
+
+class PingMonitor:
+    """
+    Pings the database in the background and keeps the latest result, so health
+    probes answer immediately and never wait for a pooled connection
+    """
+
+    def __init__(self, interval: float = 10, timeout: float = 2):
+        """
+        Args:
+            interval (float): Seconds between pings
+            timeout (float): Seconds before a ping counts as failed
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self._task: Optional[asyncio.Task] = None
+        self._result: Dict[str, Any] = {"database": "unknown", "latencyMs": None, "checkedAt": None}
+
+    @classmethod
+    def from_env(cls) -> "PingMonitor":
+        """Reads MONGODB_HEALTH_INTERVAL and MONGODB_HEALTH_TIMEOUT (seconds)"""
+        return cls(
+            interval=float(os.getenv("MONGODB_HEALTH_INTERVAL", "10")),
+            timeout=float(os.getenv("MONGODB_HEALTH_TIMEOUT", "2")),
+        )
+
+    async def ping(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            with stage("db_ping"):
+                await asyncio.wait_for(Database.get_database().command("ping"), self.timeout)
+            status = "connected"
+        except asyncio.TimeoutError:
+            status = f"error: ping timed out after {self.timeout}s"
+        except Exception as e:
+            status = f"error: {str(e)}"
+        self._result = {
+            "database": status,
+            "latencyMs": round((time.perf_counter() - started) * 1000, 1),
+            "checkedAt": time.time(),
+        }
+        return self._result
+
+    async def _loop(self):
+        while True:
+            await self.ping()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start pinging; call from the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """The latest ping result and its age in seconds"""
+        checked_at = self._result["checkedAt"]
+        return {**self._result, "ageSeconds": round(time.time() - checked_at, 1) if checked_at else None}
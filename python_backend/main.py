@@ -1,8 +1,9 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo.database import Database
-from database import get_db, Database as DB
-from routes.analytics import router as analytics_router
+from fastapi.responses import Response
+from database import Database as DB, PingMonitor
+from routes.analytics import router as analytics_router, response_cache as analytics_cache, rollups
+from metrics import MetricsMiddleware, get_metrics
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -26,17 +27,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics on /metrics and optional Server-Timing headers (METRICS_ENABLED, SERVER_TIMING)
+metrics = get_metrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+metrics.register_stats("analytics_cache", analytics_cache.stats)
+
 # Include routers
 app.include_router(analytics_router)
 
+# /health reports the latest background ping (MONGODB_HEALTH_INTERVAL, MONGODB_HEALTH_TIMEOUT)
+db_ping = PingMonitor.from_env()
+
 @app.on_event("startup")
 async def startup_db_client():
     """Initialize database connection on startup"""
     DB.get_database()
+    db_ping.start()
+    # Analytics rollups refresh in the background (ANALYTICS_REFRESH_INTERVAL)
+    rollups.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on shutdown"""
+    await rollups.stop()
+    await db_ping.stop()
     DB.close_connection()
 
 @app.get("/")
@@ -49,20 +64,20 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Database = Depends(get_db)):
-    """Health check endpoint"""
-    try:
-        # Check if database is connected
-        db.command("ping")
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
-    
+async def health_check():
+    """Health check endpoint; the database status comes from the background ping, not from this request"""
     return {
         "status": "healthy",
-        "database": db_status
+        **db_ping.status()
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics: stage and request latency histograms and in-flight gauges"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=await metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     # Get port from environment variable or use default
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,231 @@
+"""
+Prometheus metrics and Server-Timing headers for the analytics backend.
+
+``stage("db")`` times one hot-path stage: its latency histogram, an
+in-flight gauge and an error counter. ``MetricsMiddleware`` records request
+latency per route and, with SERVER_TIMING=true, adds the stages a request
+went through to a ``Server-Timing`` response header. Subsystems that already
+keep counters (the analytics response cache) are registered with
+``register_stats`` and read only when ``/metrics`` is scraped, so they add
+nothing to the hot path.
+
+With METRICS_ENABLED=false, prometheus_client is never imported, ``stage``
+returns a shared no-op context manager and the middleware passes requests
+straight through.
+
+When the backend runs several worker processes (``uvicorn main:app --workers
+N``), set PROMETHEUS_MULTIPROC_DIR to an empty directory first. Every worker
+then writes its samples there and ``/metrics`` on any worker reports the sum
+over all of them. ``register_stats`` gauges stay per process and carry a
+``pid`` label.
+"""
+import contextvars
+import inspect
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Seconds; analytics requests span sub-millisecond response cache hits to
+# multi-second full rollup rebuilds, with MongoDB queries in between
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_NOOP = nullcontext()
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]+")
+
+# Stage timings of the current request, for its Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{key}", item, out)
+    elif isinstance(value, (int, float)):
+        out[_NAME_RE.sub("_", prefix).strip("_").lower()] = float(value)
+
+
+class Metrics:
+    """Stage timers, request metrics and stats gauges for one service"""
+
+    def __init__(self, namespace: str = "zirak", enabled: bool = True, server_timing: bool = False,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, multiprocess_dir: Optional[str] = None):
+        """
+        Args:
+            namespace (str): Prefix of every metric name
+            enabled (bool): Record metrics; when false every call is a no-op
+            server_timing (bool): Add a Server-Timing header to responses
+            buckets (Tuple[float, ...]): Latency histogram buckets in seconds
+            multiprocess_dir (str, optional): PROMETHEUS_MULTIPROC_DIR; ``render`` then
+                aggregates the samples of every worker process
+        """
+        self.namespace = namespace
+        self.enabled = enabled
+        self.multiprocess_dir = multiprocess_dir
+        self.server_timing = enabled and server_timing
+        self._stats: Dict[str, Callable[[], Any]] = {}
+        self._stage_metrics: Dict[str, Tuple[Any, Any, Any]] = {}
+        if not enabled:
+            return
+
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+        self.registry = CollectorRegistry()
+        self.stage_seconds = Histogram(f"{namespace}_stage_seconds", "Duration of hot-path stages",
+                                       ["stage"], buckets=buckets, registry=self.registry)
+        # In multiprocess mode, in-flight gauges sum over the live workers
+        self.stage_in_flight = Gauge(f"{namespace}_stage_in_flight", "Stages currently running",
+                                     ["stage"], registry=self.registry, multiprocess_mode="livesum")
+        self.stage_errors = Counter(f"{namespace}_stage_errors", "Stages that raised an exception",
+                                    ["stage"], registry=self.registry)
+        self.request_seconds = Histogram(f"{namespace}_http_request_seconds", "HTTP request duration",
+                                         ["method", "route", "status"], buckets=buckets, registry=self.registry)
+        self.requests_in_flight = Gauge(f"{namespace}_http_requests_in_flight", "HTTP requests being served",
+                                        registry=self.registry, multiprocess_mode="livesum")
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        """
+        Reads METRICS_ENABLED (default true), SERVER_TIMING (default false),
+        METRICS_NAMESPACE and PROMETHEUS_MULTIPROC_DIR
+        """
+        return cls(
+            namespace=os.getenv("METRICS_NAMESPACE", "zirak"),
+            enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true",
+            server_timing=os.getenv("SERVER_TIMING", "false").lower() == "true",
+            multiprocess_dir=os.getenv("PROMETHEUS_MULTIPROC_DIR") or None,
+        )
+
+    def stage(self, name: str):
+        """Context manager timing one stage, e.g. ``with metrics.stage("db"): ...``"""
+        if not self.enabled:
+            return _NOOP
+        return self._timed(name)
+
+    def _stage_children(self, name: str):
+        # labels() takes a lock and hashes the label values; resolve each stage once
+        children = self._stage_metrics.get(name)
+        if children is None:
+            children = self._stage_metrics[name] = (
+                self.stage_seconds.labels(name), self.stage_in_flight.labels(name), self.stage_errors.labels(name)
+            )
+        return children
+
+    @contextmanager
+    def _timed(self, name: str):
+        seconds, in_flight, errors = self._stage_children(name)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            seconds.observe(elapsed)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.append((name, elapsed))
+
+    def register_stats(self, name: str, stats: Callable[[], Any]):
+        """
+        Export the numeric fields of a ``stats()`` dict (sync or async) as gauges
+        named ``<namespace>_<name>_<field>``, read at scrape time.
+        """
+        self._stats[name] = stats
+
+    async def render(self) -> bytes:
+        """The Prometheus text exposition of all metrics"""
+        from prometheus_client import CollectorRegistry, generate_latest
+
+        registry = self.registry
+        label = ""
+        if self.multiprocess_dir:
+            from prometheus_client import multiprocess
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=self.multiprocess_dir)
+            # Subsystem stats describe the worker that answered the scrape
+            label = f'{{pid="{os.getpid()}"}}'
+        lines = []
+        for name, stats in self._stats.items():
+            try:
+                value = stats()
+                if inspect.isawaitable(value):
+                    value = await value
+            except Exception:
+                continue
+            flat: Dict[str, float] = {}
+            _flatten(f"{self.namespace}_{name}", value, flat)
+            for metric, number in flat.items():
+                lines.append(f"# TYPE {metric} gauge\n{metric}{label} {number!r}\n")
+        return generate_latest(registry) + "".join(lines).encode("utf-8")
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> bytes:
+    """Server-Timing value with the summed duration of each stage and the request total"""
+    summed: Dict[str, float] = {}
+    for name, seconds in timings:
+        summed[name] = summed.get(name, 0.0) + seconds
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in summed.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request latency and adding Server-Timing headers"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if metrics.server_timing:
+                    header = server_timing_header(timings, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        metrics.requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            metrics.requests_in_flight.dec()
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.request_seconds.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+            _request_timings.reset(token)
+
+
+_shared_metrics: Optional[Metrics] = None
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics, configured from the environment on first use"""
+    global _shared_metrics
+    if _shared_metrics is None:
+        _shared_metrics = Metrics.from_env()
+    return _shared_metrics
+
+
+def stage(name: str):
+    """``get_metrics().stage(name)``, for library modules"""
+    return get_metrics().stage(name)
@@ -0,0 +1,82 @@
+"""
+In-process TTL cache for JSON responses, with ETag / If-None-Match support.
+
+A dashboard polling an unchanged endpoint gets a 304 without a body, and
+within the TTL the response is not even recomputed.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def request_key(request: Request) -> str:
+    """Cache key of a request: its path and sorted query parameters"""
+    return request.url.path + "?" + "&".join(f"{key}={value}" for key, value in sorted(request.query_params.items()))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as If-None-Match requires
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class ResponseCache:
+    """Rendered JSON bodies and their ETags, per request key"""
+
+    def __init__(self, ttl: float = 30, max_entries: int = 512):
+        """
+        Args:
+            ttl (float): Seconds a rendered response is reused
+            max_entries (int): Responses kept; the least recently used are evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires at, version, body, etag)
+        self._entries: "OrderedDict[str, Tuple[float, Any, bytes, str]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    async def respond(self, request: Request, compute: Callable[[], Awaitable[Any]], version: Any = None,
+                      key: Optional[str] = None) -> Response:
+        """
+        The response for ``request``, computed with ``compute`` on a miss.
+
+        Args:
+            request (Request): Incoming request; its If-None-Match header is honoured
+            compute (Callable): Coroutine function returning the JSON-serializable body
+            version: Data version; a cached response for another version is recomputed
+            key (str, optional): Cache key, by default the path and query parameters
+        """
+        key = key or request_key(request)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now and entry[1] == version:
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            _, _, body, etag = entry
+        else:
+            self._counters["misses"] += 1
+            body = json.dumps(await compute(), default=str, separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            self._entries[key] = (now + self.ttl, version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        headers = {"ETag": etag, "Cache-Control": f"private, max-age={int(self.ttl)}"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self._counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "entries": len(self._entries), "ttl": self.ttl}
@@ -0,0 +1,489 @@
+"""
+Materialized analytics rollups.
+
+Dashboard endpoints read small precomputed collections instead of
+aggregating the raw ``applications``, ``jobs`` and ``users`` collections on
+every page load:
+
+- ``analytics_daily``: per day, applications by status and source, and hires
+  with their summed time to hire
+- ``analytics_jobs``: per job, applications by status
+- ``analytics_skills``: per skill, active jobs requiring it (demand) and
+  talents listing it (supply)
+- ``analytics_meta``: collection totals, the refresh watermarks, the rollup
+  version and the refresh lease
+- ``analytics_keys``: per raw document, the days, jobs and skills it counted
+  towards at the last refresh
+
+A refresh reads the raw documents whose ``updatedAt`` is past the watermark,
+collects the days, jobs and skills they touch now and touched at the last
+refresh (from ``analytics_keys``), and recomputes only those keys from the raw
+data, so its cost follows the amount of change rather than the size of the
+collections. A skill removed from a job or an application moved to another
+day or job is therefore taken off the old key too. Recomputing a key is
+idempotent, so the watermark is read with a small overlap to tolerate writes
+that commit out of order. Deletes and documents without ``updatedAt`` are not
+seen by the watermark; the periodic full rebuild picks them up.
+
+Every rollup row carries the ``generation`` of the full rebuild that wrote it
+(incremental refreshes write the current one). A full rebuild writes every
+key with a new generation and then deletes the rows of older generations.
+
+The first refresh creates the indexes these queries need: ``updatedAt`` on the
+raw collections, for the watermark reads, and ``generation`` on the rollup
+collections, for the deletes after a full rebuild.
+
+Each backend worker runs the refresh loop, but only the holder of the lease
+in ``analytics_meta`` refreshes; the others follow the shared rollup version,
+so their response caches are invalidated by the holder's refreshes.
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from database import Database, aggregate, find, find_one, projection
+from metrics import stage
+
+DAILY = "analytics_daily"
+JOBS = "analytics_jobs"
+SKILLS = "analytics_skills"
+META = "analytics_meta"
+KEYS = "analytics_keys"
+
+DAY_FORMAT = "%Y-%m-%d"
+# Keys recomputed per aggregation; keeps each $match small
+KEY_BATCH = 200
+# Key records written per bulk write during a full rebuild
+RECORD_BATCH = 1000
+
+# Raw collections a refresh watches, and the fields it reads from their changed documents
+SOURCE_FIELDS = {
+    "applications": ["jobId", "applicationDate", "hireDate"],
+    "jobs": ["skills"],
+    "users": ["skills", "role"],
+}
+
+# Collection -> indexed field, created on the first refresh
+INDEXES = {
+    **{collection: "updatedAt" for collection in SOURCE_FIELDS},
+    **{collection: "generation" for collection in (DAILY, JOBS, SKILLS, KEYS)},
+}
+# An index on the same key already exists under another name, or with other options
+_INDEX_EXISTS_CODES = (85, 86)
+
+
+def _day(value: Any) -> Optional[str]:
+    return value.strftime(DAY_FORMAT) if isinstance(value, datetime) else None
+
+
+def _day_ranges(days: Iterable[str]) -> List[Dict[str, Any]]:
+    ranges = []
+    for day in days:
+        start = datetime.strptime(day, DAY_FORMAT)
+        ranges.append({"$gte": start, "$lt": start + timedelta(days=1)})
+    return ranges
+
+
+def _empty_day(day: str) -> Dict[str, Any]:
+    return {"_id": day, "applications": 0, "byStatus": {}, "bySource": {}, "hired": 0, "timeToHireDays": 0}
+
+
+def _empty_job(job_id: str) -> Dict[str, Any]:
+    return {"_id": job_id, "title": "", "status": None, "applications": 0, "byStatus": {}, "lastApplicationAt": None}
+
+
+def _id_forms(job_id: str) -> List[Any]:
+    """A job id as a string and, when it is one, as an ObjectId; applications store either"""
+    forms: List[Any] = [job_id]
+    if ObjectId.is_valid(job_id):
+        forms.append(ObjectId(job_id))
+    return forms
+
+
+def _source_keys(collection: str, doc: Dict[str, Any]) -> Dict[str, List[str]]:
+    """The days, jobs and skills a raw document counts towards"""
+    if collection == "applications":
+        days = [day for day in (_day(doc.get("applicationDate")), _day(doc.get("hireDate"))) if day]
+        jobs = [str(doc["jobId"])] if doc.get("jobId") is not None else []
+        return {"days": sorted(set(days)), "jobs": jobs, "skills": []}
+    skills = sorted({skill for skill in doc.get("skills") or [] if isinstance(skill, str)})
+    return {"days": [], "jobs": [str(doc["_id"])] if collection == "jobs" else [], "skills": skills}
+
+
+def _key_record(collection: str, doc: Dict[str, Any], generation: int) -> Dict[str, Any]:
+    return {"_id": f"{collection}:{doc['_id']}", **_source_keys(collection, doc), "generation": generation}
+
+
+def _batches(keys: Iterable[Any]) -> Iterable[List[Any]]:
+    keys = list(keys)
+    for start in range(0, len(keys), KEY_BATCH):
+        yield keys[start:start + KEY_BATCH]
+
+
+class RollupStore:
+    """Builds and refreshes the rollup collections"""
+
+    def __init__(self, refresh_interval: float = 60, full_rebuild_interval: float = 24 * 3600,
+                 max_incremental: int = 10000, overlap: float = 5, lease_ttl: float = 600):
+        """
+        Args:
+            refresh_interval (float): Seconds between incremental refreshes
+            full_rebuild_interval (float): Seconds between full rebuilds
+            max_incremental (int): Changed documents above which a refresh rebuilds everything
+            overlap (float): Seconds the watermark is read back, for out-of-order writes
+            lease_ttl (float): Seconds the refresh lease is held without being renewed; keep it
+                above the longest full rebuild
+        """
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+        self.max_incremental = max_incremental
+        self.overlap = overlap
+        self.lease_ttl = lease_ttl
+        self.owner = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.version = 0
+        self.last_refresh: Dict[str, Any] = {}
+        self._indexed = False
+
+    @classmethod
+    def from_env(cls) -> "RollupStore":
+        """
+        Reads ANALYTICS_REFRESH_INTERVAL, ANALYTICS_FULL_REBUILD_INTERVAL, ANALYTICS_MAX_INCREMENTAL
+        and ANALYTICS_LEASE_TTL
+        """
+        return cls(
+            refresh_interval=float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "60")),
+            full_rebuild_interval=float(os.getenv("ANALYTICS_FULL_REBUILD_INTERVAL", str(24 * 3600))),
+            max_incremental=int(os.getenv("ANALYTICS_MAX_INCREMENTAL", "10000")),
+            lease_ttl=float(os.getenv("ANALYTICS_LEASE_TTL", "600")),
+        )
+
+    # Recomputing rollup keys from the raw collections
+
+    async def _rebuild_daily(self, db, days: Optional[Set[str]], generation: int):
+        """Recompute the given days, or every day when ``days`` is None"""
+        for batch in [None] if days is None else _batches(sorted(days)):
+            if batch is None:
+                applied_match = {"applicationDate": {"$type": "date"}}
+                hired_match = {"status": "hired", "hireDate": {"$type": "date"}}
+            else:
+                applied_match = {"$or": [{"applicationDate": r} for r in _day_ranges(batch)]}
+                hired_match = {"status": "hired", "$or": [{"hireDate": r} for r in _day_ranges(batch)]}
+
+            # Days without any data left are written as zeros, not skipped
+            docs = {day: _empty_day(day) for day in batch or []}
+            applied = await aggregate(db, "applications", [
+                {"$match": applied_match},
+                {"$group": {
+                    "_id": {
+                        "day": {"$dateToString": {"format": DAY_FORMAT, "date": "$applicationDate"}},
+                        "status": {"$ifNull": ["$status", "unknown"]},
+                        "source": {"$ifNull": ["$source", "Other"]},
+                    },
+                    "count": {"$sum": 1},
+                }},
+            ])
+            for row in applied:
+                key = row["_id"]
+                doc = docs.setdefault(key["day"], _empty_day(key["day"]))
+                doc["applications"] += row["count"]
+                doc["byStatus"][key["status"]] = doc["byStatus"].get(key["status"], 0) + row["count"]
+                doc["bySource"][key["source"]] = doc["bySource"].get(key["source"], 0) + row["count"]
+
+            hired = await aggregate(db, "applications", [
+                {"$match": hired_match},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": DAY_FORMAT, "date": "$hireDate"}},
+                    "hired": {"$sum": 1},
+                    # Whole days from application to hire, as the dashboard has always counted them
+                    "timeToHireDays": {"$sum": {"$floor": {
+                        "$divide": [{"$subtract": ["$hireDate", "$applicationDate"]}, 86400000]
+                    }}},
+                }},
+            ])
+            for row in hired:
+                doc = docs.setdefault(row["_id"], _empty_day(row["_id"]))
+                doc["hired"] = row["hired"]
+                doc["timeToHireDays"] = row["timeToHireDays"] or 0
+
+            await self._replace(db, DAILY, docs.values(), generation, full=batch is None)
+
+    async def _rebuild_jobs(self, db, job_ids: Optional[Set[str]], generation: int):
+        """Recompute the given jobs (ids as strings), or every job when ``job_ids`` is None"""
+        for batch in [None] if job_ids is None else _batches(sorted(job_ids)):
+            ids = None if batch is None else [form for job_id in batch for form in _id_forms(job_id)]
+            docs = {job_id: _empty_job(job_id) for job_id in batch or []}
+            rows = await aggregate(db, "applications", [
+                {"$match": {"jobId": {"$ne": None}} if ids is None else {"jobId": {"$in": ids}}},
+                {"$group": {
+                    "_id": {"job": "$jobId", "status": {"$ifNull": ["$status", "unknown"]}},
+                    "count": {"$sum": 1},
+                    "lastApplicationAt": {"$max": "$applicationDate"},
+                }},
+            ])
+            for row in rows:
+                job_id = str(row["_id"]["job"])
+                doc = docs.setdefault(job_id, _empty_job(job_id))
+                doc["applications"] += row["count"]
+                status = row["_id"]["status"]
+                doc["byStatus"][status] = doc["byStatus"].get(status, 0) + row["count"]
+                last = row.get("lastApplicationAt")
+                if isinstance(last, datetime) and (doc["lastApplicationAt"] is None or last > doc["lastApplicationAt"]):
+                    doc["lastApplicationAt"] = last
+
+            jobs = await find(db, "jobs", {} if ids is None else {"_id": {"$in": ids}}, fields=["title", "status"])
+            for job in jobs:
+                doc = docs.setdefault(str(job["_id"]), _empty_job(str(job["_id"])))
+                doc["title"] = job.get("title", "")
+                doc["status"] = job.get("status")
+            await self._replace(db, JOBS, docs.values(), generation, full=batch is None)
+
+    async def _rebuild_skills(self, db, skills: Optional[Set[str]], generation: int):
+        """Recompute the given skills, or every skill when ``skills`` is None"""
+        for batch in [None] if skills is None else _batches(sorted(skills)):
+            docs: Dict[str, Dict[str, Any]] = {skill: {"_id": skill, "demand": 0, "supply": 0} for skill in batch or []}
+            for collection, match, field in (
+                ("jobs", {"status": "active"}, "demand"),
+                ("users", {"role": "talent"}, "supply"),
+            ):
+                skill_match = {} if batch is None else {"skills": {"$in": batch}}
+                rows = await aggregate(db, collection, [
+                    {"$match": {**match, **skill_match}},
+                    {"$project": {"skills": 1}},
+                    {"$unwind": "$skills"},
+                    {"$match": {"skills": {"$type": "string"}, **skill_match}},
+                    {"$group": {"_id": "$skills", "count": {"$sum": 1}}},
+                ])
+                for row in rows:
+                    docs.setdefault(row["_id"], {"_id": row["_id"], "demand": 0, "supply": 0})[field] = row["count"]
+            await self._replace(db, SKILLS, docs.values(), generation, full=batch is None)
+
+    async def _replace(self, db, collection: str, docs: Iterable[Dict[str, Any]], generation: int, full: bool):
+        docs = [{**doc, "generation": generation} for doc in docs]
+        with stage("db"):
+            if docs:
+                await db[collection].bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+                                                ordered=False)
+            if full:
+                # Keys that no longer exist in the raw data were not rewritten by this rebuild
+                await db[collection].delete_many({"generation": {"$ne": generation}})
+
+    # Keys each raw document counted towards at the last refresh
+
+    async def _previous_keys(self, db, changed: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        ids = [f"{collection}:{doc['_id']}" for collection, docs in changed.items() for doc in docs]
+        records = []
+        for batch in _batches(ids):
+            records.extend(await find(db, KEYS, {"_id": {"$in": batch}}))
+        return records
+
+    async def _write_keys(self, db, records: List[Dict[str, Any]]):
+        if records:
+            with stage("db"):
+                await db[KEYS].bulk_write([ReplaceOne({"_id": r["_id"]}, r, upsert=True) for r in records],
+                                          ordered=False)
+
+    async def _record_all_keys(self, db, generation: int):
+        """Record the keys of every raw document, then drop the records of documents that are gone"""
+        for collection, fields in SOURCE_FIELDS.items():
+            records = []
+            async for doc in db[collection].find({}, projection(fields)):
+                record = _key_record(collection, doc, generation)
+                # A document that counts towards nothing has nothing to take off later
+                if record["days"] or record["jobs"] or record["skills"]:
+                    records.append(record)
+                if len(records) >= RECORD_BATCH:
+                    await self._write_keys(db, records)
+                    records = []
+            await self._write_keys(db, records)
+        with stage("db"):
+            await db[KEYS].delete_many({"generation": {"$ne": generation}})
+
+    async def _refresh_totals(self, db):
+        with stage("db"):
+            totals = {
+                "totalJobs": await db["jobs"].estimated_document_count(),
+                "activeJobs": await db["jobs"].count_documents({"status": "active"}),
+                "totalCandidates": await db["applications"].estimated_document_count(),
+            }
+            await db[META].update_one({"_id": "totals"}, {"$set": totals}, upsert=True)
+
+    # Refresh lease, so only one worker refreshes
+
+    async def _acquire_lease(self, db) -> bool:
+        """Take or renew the refresh lease; False while another worker holds an unexpired one"""
+        now = time.time()
+        try:
+            with stage("db"):
+                await db[META].update_one(
+                    {"_id": "lease", "$or": [{"owner": self.owner}, {"expiresAt": {"$lt": now}}]},
+                    {"$set": {"owner": self.owner, "expiresAt": now + self.lease_ttl}},
+                    upsert=True,
+                )
+            return True
+        except DuplicateKeyError:
+            # The lease document exists and is held by another worker, so the upsert collided
+            return False
+
+    async def _release_lease(self, db):
+        with stage("db"):
+            await db[META].delete_one({"_id": "lease", "owner": self.owner})
+
+    # Change detection
+
+    async def ensure_indexes(self, db) -> List[str]:
+        """
+        Create the ``INDEXES`` that do not exist yet; creating an existing index is a no-op.
+
+        Returns:
+            List[str]: ``collection.field`` of the indexes that could not be created
+        """
+        failed = []
+        with stage("db"):
+            for collection, field in INDEXES.items():
+                try:
+                    await db[collection].create_index(field)
+                except OperationFailure as e:
+                    if e.code not in _INDEX_EXISTS_CODES:
+                        failed.append(f"{collection}.{field}")
+        self._indexed = True
+        return failed
+
+    async def _changes(self, db, collection: str, since: Optional[datetime], fields: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Documents updated since the watermark, or None when there are too many for an incremental refresh"""
+        query = {"updatedAt": {"$gt": since - timedelta(seconds=self.overlap)}} if since else {"updatedAt": {"$type": "date"}}
+        docs = await find(db, collection, query, fields=fields + ["updatedAt"], limit=self.max_incremental + 1)
+        return None if len(docs) > self.max_incremental else docs
+
+    async def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Bring the rollups up to date, when this worker holds the refresh lease.
+
+        Without the lease the refresh is skipped and the shared rollup version is
+        picked up instead; a requested full rebuild is left to the lease holder.
+
+        Args:
+            full (bool): Rebuild every key instead of only those touched since the watermark
+
+        Returns:
+            Dict[str, Any]: What the refresh did
+        """
+        async with self._lock:
+            db = Database.get_database()
+            if not await self._acquire_lease(db):
+                with stage("db"):
+                    if full:
+                        # Due on the lease holder's next refresh
+                        await db[META].update_one({"_id": "watermarks"}, {"$set": {"rebuiltAt": 0}})
+                    meta = await find_one(db, META, {"_id": "watermarks"}, fields=["version"]) or {}
+                self.version = meta.get("version", self.version)
+                self.last_refresh = {"mode": "skipped", "reason": "another worker holds the refresh lease",
+                                     "fullRequested": full, "finishedAt": time.time(), "version": self.version}
+                return self.last_refresh
+
+            started = time.perf_counter()
+            # Without them every refresh scans the raw collections; a failure is reported, not retried
+            index_errors = [] if self._indexed else await self.ensure_indexes(db)
+            meta = await find_one(db, META, {"_id": "watermarks"}) or {}
+            full = full or not meta or time.time() - meta.get("rebuiltAt", 0) > self.full_rebuild_interval
+
+            watermarks = {}
+            changed = {collection: [] for collection in SOURCE_FIELDS}
+            if not full:
+                for collection, fields in SOURCE_FIELDS.items():
+                    docs = await self._changes(db, collection, meta.get(collection), fields)
+                    if docs is None:
+                        full = True
+                        break
+                    changed[collection] = docs
+
+            if full:
+                generation = meta.get("generation", 0) + 1
+                # Watermarks are taken before the rebuild so writes made during it are refreshed next time
+                for collection in changed:
+                    latest = await find(db, collection, {"updatedAt": {"$type": "date"}}, fields=["updatedAt"],
+                                        sort=[("updatedAt", -1)], limit=1)
+                    watermarks[collection] = latest[0]["updatedAt"] if latest else None
+                await self._record_all_keys(db, generation)
+                await self._rebuild_daily(db, None, generation)
+                await self._rebuild_jobs(db, None, generation)
+                await self._rebuild_skills(db, None, generation)
+                touched = {"mode": "full", "generation": generation}
+            else:
+                generation = meta.get("generation", 0)
+                records = [_key_record(collection, doc, generation)
+                           for collection, docs in changed.items() for doc in docs]
+                # The keys documents count towards now, and those they counted towards before they changed
+                keys = records + await self._previous_keys(db, changed)
+                days = {day for record in keys for day in record.get("days", [])}
+                job_ids = {job_id for record in keys for job_id in record.get("jobs", [])}
+                skills = {skill for record in keys for skill in record.get("skills", [])}
+                if days:
+                    await self._rebuild_daily(db, days, generation)
+                if job_ids:
+                    await self._rebuild_jobs(db, job_ids, generation)
+                if skills:
+                    await self._rebuild_skills(db, skills, generation)
+                await self._write_keys(db, records)
+                for collection, docs in changed.items():
+                    watermarks[collection] = max((doc["updatedAt"] for doc in docs), default=meta.get(collection))
+                touched = {"mode": "incremental", "days": len(days), "jobs": len(job_ids), "skills": len(skills)}
+
+            await self._refresh_totals(db)
+            update = {**watermarks, "generation": generation}
+            if full:
+                update["rebuiltAt"] = time.time()
+            if full or any(changed.values()):
+                update["version"] = max(meta.get("version", 0), self.version) + 1
+            with stage("db"):
+                await db[META].update_one({"_id": "watermarks"}, {"$set": update}, upsert=True)
+
+            self.version = update.get("version", meta.get("version", self.version))
+            self.last_refresh = {**touched, "seconds": round(time.perf_counter() - started, 3),
+                                 "finishedAt": time.time(), "version": self.version}
+            if index_errors:
+                self.last_refresh["indexErrors"] = index_errors
+            return self.last_refresh
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.last_refresh = {"error": str(e), "finishedAt": time.time(), "version": self.version}
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Refresh in the background every ``refresh_interval`` seconds; call from the running event loop"""
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop refreshing and hand the lease over, so another worker takes it without waiting for it to expire"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            try:
+                await self._release_lease(Database.get_database())
+            except Exception:
+                pass
+
+
+_shared_store: Optional[RollupStore] = None
+
+
+def get_rollup_store() -> RollupStore:
+    """Return the process-wide rollup store, configured from the environment on first use"""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = RollupStore.from_env()
+    return _shared_store
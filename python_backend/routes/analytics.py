@@ -0,0 +1,142 @@
+"""
+Dashboard analytics.
+
+Every read endpoint is served from the rollup collections maintained by
+``rollups.RollupStore``, so its cost grows with the number of days, jobs or
+skills shown, not with the raw applications, jobs and talents. Responses are
+cached in process for ANALYTICS_CACHE_TTL seconds and carry an ETag.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException, Request
+
+from database import find, find_one, get_db
+from response_cache import ResponseCache
+from rollups import DAILY, DAY_FORMAT, JOBS, META, SKILLS, get_rollup_store
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+response_cache = ResponseCache(ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "30")))
+rollups = get_rollup_store()
+
+TIME_RANGES = {"week": 7, "month": 30, "quarter": 91, "year": 365}
+STAGES = ["applied", "screening", "interview", "assessment", "offer", "hired"]
+SOURCES = ["LinkedIn", "Website", "Referrals", "Job Boards", "Other"]
+SKILL_SORTS = ("demand", "supply")
+
+
+def range_start(time_range: str) -> str:
+    """First day, as stored in the daily rollup, of a week/month/quarter/year range"""
+    if time_range not in TIME_RANGES:
+        raise HTTPException(status_code=400, detail=f"timeRange must be one of {', '.join(TIME_RANGES)}")
+    return (datetime.utcnow() - timedelta(days=TIME_RANGES[time_range])).strftime(DAY_FORMAT)
+
+
+async def daily_rollups(time_range: str) -> List[Dict[str, Any]]:
+    return await find(get_db(), DAILY, {"_id": {"$gte": range_start(time_range)}}, sort=[("_id", 1)])
+
+
+def summed(days: List[Dict[str, Any]], field: str) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for day in days:
+        for key, count in day.get(field, {}).items():
+            totals[key] = totals.get(key, 0) + count
+    return totals
+
+
+@router.get("/overview")
+async def overview(request: Request, timeRange: str = "month"):
+    """Headline hiring numbers for the dashboard"""
+    async def compute():
+        days = await daily_rollups(timeRange)
+        totals = await find_one(get_db(), META, {"_id": "totals"}) or {}
+        applications = sum(day["applications"] for day in days)
+        hired = sum(day["hired"] for day in days)
+        return {
+            "totalJobs": totals.get("totalJobs", 0),
+            "activeJobs": totals.get("activeJobs", 0),
+            "totalCandidates": totals.get("totalCandidates", 0),
+            "applications": applications,
+            "timeToHire": round(sum(day["timeToHireDays"] for day in days) / hired) if hired else 0,
+            "conversionRate": round(hired / applications * 100, 1) if applications else 0,
+        }
+
+    return await response_cache.respond(request, compute, version=rollups.version)
+
+
+@router.get("/applications")
+async def applications(request: Request, timeRange: str = "month"):
+    """Applications per day"""
+    async def compute():
+        days = await daily_rollups(timeRange)
+        return {"labels": [day["_id"] for day in days], "data": [day["applications"] for day in days]}
+
+    return await response_cache.respond(request, compute, version=rollups.version)
+
+
+@router.get("/stages")
+async def stages(request: Request, timeRange: str = "year"):
+    """Applications by recruitment stage"""
+    async def compute():
+        counts = summed(await daily_rollups(timeRange), "byStatus")
+        return {"labels": [stage.capitalize() for stage in STAGES], "data": [counts.get(stage, 0) for stage in STAGES]}
+
+    return await response_cache.respond(request, compute, version=rollups.version)
+
+
+@router.get("/sources")
+async def sources(request: Request, timeRange: str = "month"):
+    """Applications by source"""
+    async def compute():
+        counts = summed(await daily_rollups(timeRange), "bySource")
+        known = {source: counts.pop(source, 0) for source in SOURCES}
+        known["Other"] += sum(counts.values())
+        return {"labels": SOURCES, "data": [known[source] for source in SOURCES]}
+
+    return await response_cache.respond(request, compute, version=rollups.version)
+
+
+@router.get("/jobs")
+async def jobs(request: Request, limit: int = 10):
+    """Jobs with the most applications"""
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+    async def compute():
+        rows = await find(get_db(), JOBS, {}, fields=["title", "status", "applications", "byStatus", "lastApplicationAt"],
+                          sort=[("applications", -1)], limit=limit)
+        return {"jobs": [{"jobId": row.pop("_id"), **row} for row in rows]}
+
+    return await response_cache.respond(request, compute, version=rollups.version)
+
+
+@router.get("/skills")
+async def skills(request: Request, sort: str = "demand", limit: int = 10):
+    """Skills by demand (active jobs requiring them) or supply (talents listing them)"""
+    if sort not in SKILL_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SKILL_SORTS)}")
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+    async def compute():
+        rows = await find(get_db(), SKILLS, {}, sort=[(sort, -1)], limit=limit)
+        return {"skills": [{"skill": row["_id"], "demand": row["demand"], "supply": row["supply"]} for row in rows]}
+
+    return await response_cache.respond(request, compute, version=rollups.version)
+
+
+@router.get("/rollups/status")
+async def rollup_status():
+    """The last rollup refresh and the response cache counters"""
+    return {"version": rollups.version, "lastRefresh": rollups.last_refresh, "cache": response_cache.stats()}
+
+
+@router.post("/rollups/refresh")
+async def refresh_rollups(full: bool = False):
+    """Refresh the rollups now, incrementally unless ``full`` is set"""
+    try:
+        return await rollups.refresh(full=full)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error refreshing analytics rollups: {str(e)}")
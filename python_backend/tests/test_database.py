@@ -0,0 +1,53 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from database import PingMonitor, aggregate, count, find, find_one, projection
+
+
+def test_projection():
+    assert projection(None) is None
+    assert projection(["status", "job.title"]) == {"status": 1, "job.title": 1}
+    assert projection(["status"], include_id=False) == {"status": 1, "_id": 0}
+
+
+def test_query_helpers_return_only_the_requested_fields():
+    async def scenario():
+        db = AsyncMongoMockClient()["test"]
+        await db.applications.insert_many([
+            {"status": "hired", "jobId": "a", "notes": "x" * 100},
+            {"status": "pending", "jobId": "b", "notes": "y"},
+            {"status": "hired", "jobId": "c", "notes": "z"},
+        ])
+        found = await find(db, "applications", {"status": "hired"}, fields=["jobId"], sort=[("jobId", -1)])
+        first = await find_one(db, "applications", {"jobId": "b"}, fields=["status"])
+        total = await count(db, "applications", {"status": "hired"})
+        grouped = await aggregate(db, "applications", [
+            {"$project": {"status": 1}},
+            {"$group": {"_id": "$status", "n": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ])
+        return found, first, total, grouped
+
+    found, first, total, grouped = asyncio.run(scenario())
+    assert [{k: v for k, v in doc.items() if k != "_id"} for doc in found] == [{"jobId": "c"}, {"jobId": "a"}]
+    assert set(first) == {"_id", "status"}
+    assert total == 2
+    assert grouped == [{"_id": "hired", "n": 2}, {"_id": "pending", "n": 1}]
+
+
+class FailingDatabase:
+    async def command(self, name):
+        raise ConnectionError("no primary")
+
+
+def test_ping_monitor_keeps_the_latest_result(monkeypatch):
+    monitor = PingMonitor(timeout=0.5)
+    assert monitor.status()["database"] == "unknown" and monitor.status()["ageSeconds"] is None
+
+    monkeypatch.setattr(database.Database, "get_database", classmethod(lambda cls: FailingDatabase()))
+    asyncio.run(monitor.ping())
+    status = monitor.status()
+    assert status["database"] == "error: no primary"
+    assert status["latencyMs"] is not None and status["ageSeconds"] is not None
@@ -0,0 +1,85 @@
+import asyncio
+
+from fastapi import Request
+
+from response_cache import ResponseCache, etag_matches, request_key
+
+
+def request(path="/analytics/overview", query=b"timeRange=month", if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": headers})
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"applications": 3}
+
+
+def test_request_key_sorts_query_parameters():
+    assert request_key(request(query=b"b=2&a=1")) == request_key(request(query=b"a=1&b=2"))
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+
+
+def test_cached_response_is_reused_within_the_ttl():
+    async def scenario():
+        cache, compute = ResponseCache(ttl=30), Counter()
+        first = await cache.respond(request(), compute)
+        second = await cache.respond(request(), compute)
+        return compute.calls, first, second, cache.stats()
+
+    calls, first, second, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert first.status_code == second.status_code == 200
+    assert first.body == second.body == b'{"applications":3}'
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "private, max-age=30"
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_matching_if_none_match_gets_304_without_a_body():
+    async def scenario():
+        cache = ResponseCache()
+        etag = (await cache.respond(request(), Counter())).headers["etag"]
+        return etag, await cache.respond(request(if_none_match=etag), Counter()), cache.stats()
+
+    etag, response, stats = asyncio.run(scenario())
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert stats["not_modified"] == 1
+
+
+def test_new_version_is_recomputed():
+    async def scenario():
+        cache, compute = ResponseCache(), Counter()
+        await cache.respond(request(), compute, version=1)
+        await cache.respond(request(), compute, version=2)
+        return compute.calls
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_expired_and_evicted_entries_are_recomputed():
+    async def scenario():
+        compute = Counter()
+        expired = ResponseCache(ttl=0)
+        await expired.respond(request(), compute)
+        await expired.respond(request(), compute)
+        small = ResponseCache(max_entries=1)
+        await small.respond(request(query=b"a=1"), compute)
+        await small.respond(request(query=b"a=2"), compute)
+        await small.respond(request(query=b"a=1"), compute)
+        return compute.calls, small.stats()["entries"]
+
+    assert asyncio.run(scenario()) == (5, 1)
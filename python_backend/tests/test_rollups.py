@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from database import Database
+from rollups import DAILY, JOBS, KEYS, META, SKILLS, RollupStore
+
+NOW = datetime(2026, 10, 1, 12)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(Database, "get_database", classmethod(lambda cls: database))
+    return database
+
+
+async def seed(db):
+    await db.jobs.insert_one({"_id": "j1", "title": "Backend", "status": "active", "skills": ["Python", "Go"],
+                              "updatedAt": NOW})
+    await db.users.insert_one({"_id": "u1", "role": "talent", "skills": ["Python"], "updatedAt": NOW})
+    await db.applications.insert_one({"_id": "a1", "jobId": "j1", "status": "applied", "source": "LinkedIn",
+                                      "applicationDate": NOW, "updatedAt": NOW})
+
+
+async def rows(db, collection):
+    return {row["_id"]: row for row in await db[collection].find().to_list(None)}
+
+
+def test_first_refresh_is_a_full_rebuild(db):
+    async def scenario():
+        await seed(db)
+        result = await RollupStore().refresh()
+        return result, await rows(db, DAILY), await rows(db, JOBS), await rows(db, SKILLS), await rows(db, KEYS)
+
+    result, daily, jobs, skills, keys = asyncio.run(scenario())
+    assert result["mode"] == "full" and result["version"] == 1
+    assert daily["2026-10-01"]["byStatus"] == {"applied": 1}
+    assert daily["2026-10-01"]["bySource"] == {"LinkedIn": 1}
+    assert jobs["j1"]["applications"] == 1 and jobs["j1"]["title"] == "Backend"
+    assert (skills["Python"]["demand"], skills["Python"]["supply"]) == (1, 1)
+    assert keys["applications:a1"]["days"] == ["2026-10-01"]
+
+
+def test_incremental_refresh_clears_keys_a_document_left(db):
+    async def scenario():
+        await seed(db)
+        store = RollupStore()
+        await store.refresh()
+        later = NOW + timedelta(minutes=5)
+        await db.jobs.update_one({"_id": "j1"}, {"$set": {"skills": ["Python"], "updatedAt": later}})
+        await db.applications.update_one({"_id": "a1"}, {"$set": {
+            "jobId": "j2", "applicationDate": NOW + timedelta(days=1), "updatedAt": later}})
+        result = await store.refresh()
+        return result, await rows(db, DAILY), await rows(db, JOBS), await rows(db, SKILLS)
+
+    result, daily, jobs, skills = asyncio.run(scenario())
+    assert result["mode"] == "incremental"
+    assert skills["Go"]["demand"] == 0
+    assert daily["2026-10-01"]["applications"] == 0
+    assert daily["2026-10-02"]["applications"] == 1
+    assert jobs["j1"]["applications"] == 0 and jobs["j2"]["applications"] == 1
+
+
+def test_full_rebuild_deletes_rows_of_older_generations(db):
+    async def scenario():
+        await seed(db)
+        store = RollupStore()
+        await store.refresh()
+        await db.applications.delete_one({"_id": "a1"})
+        result = await store.refresh(full=True)
+        return result, await rows(db, DAILY), await rows(db, KEYS)
+
+    result, daily, keys = asyncio.run(scenario())
+    assert result["generation"] == 2
+    assert daily == {}
+    assert "applications:a1" not in keys
+    assert all(key["generation"] == 2 for key in keys.values())
+
+
+def test_only_the_lease_holder_refreshes(db):
+    async def scenario():
+        await seed(db)
+        holder, other = RollupStore(), RollupStore()
+        await holder.refresh()
+        skipped = await other.refresh(full=True)
+        meta = await db[META].find_one({"_id": "watermarks"})
+        rebuilt = await holder.refresh()
+        holder._task = asyncio.ensure_future(asyncio.sleep(0))
+        await holder.stop()
+        taken_over = await other.refresh()
+        return skipped, meta, rebuilt, taken_over
+
+    skipped, meta, rebuilt, taken_over = asyncio.run(scenario())
+    assert skipped["mode"] == "skipped" and skipped["version"] == 1
+    # The requested full rebuild is left to the lease holder
+    assert meta["rebuiltAt"] == 0
+    assert rebuilt["mode"] == "full"
+    # Once the holder stops and releases the lease, another worker takes over
+    assert taken_over["mode"] == "incremental"
+    assert taken_over["version"] == rebuilt["version"] + 1
+
+
+def test_first_refresh_creates_the_indexes(db):
+    async def scenario():
+        await seed(db)
+        store = RollupStore()
+        await store.refresh()
+        await store.refresh()
+        return {collection: await db[collection].index_information()
+                for collection in ("applications", "jobs", "users", DAILY, JOBS, SKILLS, KEYS)}
+
+    indexes = asyncio.run(scenario())
+    for collection in ("applications", "jobs", "users"):
+        assert indexes[collection]["updatedAt_1"]["key"] == [("updatedAt", 1)]
+    for collection in (DAILY, JOBS, SKILLS, KEYS):
+        assert indexes[collection]["generation_1"]["key"] == [("generation", 1)]
+
+
+def test_index_conflicts_are_tolerated_and_other_failures_reported(db, monkeypatch):
+    async def create_index(self, field):
+        code = 85 if self.name == "jobs" else 13 if self.name == "users" else None
+        if code:
+            raise OperationFailure("cannot create index", code=code)
+
+    monkeypatch.setattr(type(db.jobs), "create_index", create_index)
+
+    async def scenario():
+        await seed(db)
+        return await RollupStore().refresh()
+
+    assert asyncio.run(scenario())["indexErrors"] == ["users.updatedAt"]